@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Move conversations idle for N days into zstd-packed cold storage.
+
+For each hot conversation whose last activity is older than --idle-days:
+1. Read all its messages
+2. Pack them into one zstd-compressed JSON blob
+3. In one transaction: store the blob, delete the rows, mark the conversation
+
+Conversations that become active while the job runs are skipped, as are
+ones with no messages (pre-created by /chat/prefetch and never used).
+Opening a cold conversation (history or chat) restores its messages
+automatically. Full-text search only covers hot messages.
+Run nightly from cron.
+
+Usage:
+    cd ai-tutor-api && ./venv/bin/python scripts/archive_conversations.py
+    cd ai-tutor-api && ./venv/bin/python scripts/archive_conversations.py --dry-run
+    cd ai-tutor-api && ./venv/bin/python scripts/archive_conversations.py --idle-days 180 --max 5000
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from supabase import create_client  # noqa: E402
+
+from src.config import settings  # noqa: E402
+from src.services.cold_storage import freeze_conversation, idle_conversations  # noqa: E402
+
+BATCH_SIZE = 200
+
+
+def _get_supabase():
+    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive idle conversations to cold storage")
+    parser.add_argument(
+        "--idle-days", type=int, default=settings.cold_storage_idle_days,
+        help=f"Days without activity (default {settings.cold_storage_idle_days})",
+    )
+    parser.add_argument("--max", type=int, default=0, help="Stop after this many (0 = all)")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be done")
+    args = parser.parse_args()
+
+    sb = _get_supabase()
+
+    if args.dry_run:
+        candidates = idle_conversations(sb, args.idle_days, args.max or BATCH_SIZE)
+        print(f"{len(candidates)} conversations idle for {args.idle_days}+ days (first batch)")
+        print("(dry run — no database changes made)")
+        return
+
+    frozen = skipped = failed = 0
+    after = None
+    while not args.max or frozen + skipped + failed < args.max:
+        batch = idle_conversations(sb, args.idle_days, BATCH_SIZE, after=after)
+        if not batch:
+            break
+        for conv in batch:
+            try:
+                if freeze_conversation(sb, conv["id"], conv["last_active_at"]):
+                    frozen += 1
+                else:
+                    skipped += 1
+            except Exception as e:
+                failed += 1
+                print(f"{conv['id']} — FAILED: {e}")
+        # Page past this batch: skipped and failed conversations stay hot
+        after = (batch[-1]["last_active_at"], batch[-1]["id"])
+        print(f"Batch done — {frozen} frozen so far")
+
+    print(f"\nDone — {frozen} frozen, {skipped} skipped, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Backfill rag.exam_questions from existing documents' key_points.
+
+For every completed past paper / mark scheme / sample paper:
+1. Read key_points (produced by document enrichment)
+2. Load the document's chunks
+3. Locate each question's chunk range
+4. Replace the document's rows in rag.exam_questions
+
+Idempotent — each document's rows are replaced, never appended.
+
+Usage:
+    cd ai-tutor-api && ./venv/bin/python scripts/backfill_exam_questions.py
+    cd ai-tutor-api && ./venv/bin/python scripts/backfill_exam_questions.py --dry-run
+    cd ai-tutor-api && ./venv/bin/python scripts/backfill_exam_questions.py --subject-id <UUID>
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from supabase import create_client  # noqa: E402
+
+from src.config import settings  # noqa: E402
+from src.services.exam_questions import (  # noqa: E402
+    QUESTION_DOC_TYPES,
+    build_exam_question_rows,
+    store_exam_questions,
+)
+
+
+def _get_supabase():
+    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill rag.exam_questions from key_points")
+    parser.add_argument("--subject-id", help="Only process documents for this subject")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be done")
+    args = parser.parse_args()
+
+    sb = _get_supabase()
+
+    # 1. Find question-bearing documents
+    print("Querying documents...")
+    query = (
+        sb.schema("rag")
+        .table("documents")
+        .select("id, title, doc_type, subject_id, year, session, paper_number, key_points")
+        .eq("status", "completed")
+        .in_("doc_type", sorted(QUESTION_DOC_TYPES))
+        .order("created_at")
+    )
+    if args.subject_id:
+        query = query.eq("subject_id", args.subject_id)
+
+    docs = query.execute().data or []
+    print(f"Found {len(docs)} papers/mark schemes")
+
+    total_questions = 0
+    total_located = 0
+
+    for i, doc in enumerate(docs, 1):
+        key_points = doc.get("key_points") or []
+        print(f"\n[{i}/{len(docs)}] {doc['title']} ({doc['doc_type']}) — {len(key_points)} key points")
+
+        if not key_points:
+            print("  No key_points, skipping (run backfill_enrichment.py first)")
+            continue
+
+        # 2. Load chunks in order
+        chunks_result = (
+            sb.schema("rag")
+            .table("chunks")
+            .select("chunk_index, content")
+            .eq("document_id", doc["id"])
+            .order("chunk_index")
+            .execute()
+        )
+        chunks = [(c["chunk_index"], c["content"]) for c in (chunks_result.data or [])]
+
+        # 3. Build rows with chunk ranges
+        rows = build_exam_question_rows(
+            document_id=doc["id"],
+            key_points=key_points,
+            chunks=chunks,
+            subject_id=doc.get("subject_id"),
+            doc_type=doc["doc_type"],
+            year=doc.get("year"),
+            session=doc.get("session"),
+            paper_number=doc.get("paper_number"),
+        )
+        located = sum(1 for r in rows if r["chunk_start"] is not None)
+        print(f"  Questions: {len(rows)} ({located} linked to chunks)")
+        total_questions += len(rows)
+        total_located += located
+
+        # 4. Store
+        if not args.dry_run:
+            store_exam_questions(doc["id"], rows)
+
+    print(f"\nDone — {total_questions} questions indexed, {total_located} linked to chunks")
+    if args.dry_run:
+        print("(dry run — no database changes made)")
+
+
+if __name__ == "__main__":
+    main()
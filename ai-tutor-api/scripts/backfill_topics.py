@@ -3,7 +3,8 @@
 
 Finds chunks where topic_id IS NULL, groups them by document, loads the
 subject taxonomy, runs extraction, and updates each chunk in place.
-Idempotent — skips chunks that already have a topic_id.
+Idempotent — skips chunks that already have a topic_id. Topic packs for
+every topic that gained chunks are refreshed at the end.
 
 Usage:
     cd ai-tutor-api && ./venv/bin/python scripts/backfill_topics.py
@@ -23,6 +24,7 @@ from supabase import create_client  # noqa: E402
 from src.config import settings  # noqa: E402
 from src.services.metadata_extractor import extract_topics_for_chunks  # noqa: E402
 from src.services.taxonomy import load_taxonomy  # noqa: E402
+from src.services.topic_packs import refresh_topic_packs  # noqa: E402
 
 
 def _get_supabase():
@@ -68,6 +70,7 @@ async def main():
     # 3. Process each document
     total_classified = 0
     total_skipped = 0
+    touched_topics: set[str] = set()
 
     for doc_id, doc_chunk_list in doc_chunks.items():
         subject_id = doc_chunk_list[0].get("subject_id")
@@ -144,10 +147,17 @@ async def main():
                 sb.schema("rag").table("chunks").update({
                     "topic_id": topic_id,
                 }).eq("id", chunk_id).execute()
+                touched_topics.add(topic_id)
 
     print(f"\nDone — {total_classified} chunks classified, {total_skipped} skipped")
     if args.dry_run:
         print("(dry run — no database changes made)")
+        return
+
+    if touched_topics:
+        print(f"Refreshing topic packs for {len(touched_topics)} topics...")
+        changed = refresh_topic_packs(touched_topics)
+        print(f"{changed} topic packs rebuilt")
 
 
 if __name__ == "__main__":
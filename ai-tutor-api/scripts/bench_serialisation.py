@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: JSON serialisation CPU per streamed chat answer.
+
+Encodes the events of one typical answer the way chat_stream does —
+a sources event, one token event per streamed token, a done event — each
+framed as SSE by sse_starlette. Compares the stdlib json module (the old
+path) with src.serialization (orjson plus pre-serialised fragments) and
+reports CPU microseconds per answer. Needs no database or API keys.
+
+Usage:
+    cd ai-tutor-api && ./venv/bin/python scripts/bench_serialisation.py
+    cd ai-tutor-api && ./venv/bin/python scripts/bench_serialisation.py --tokens 400 --sources 8
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sse_starlette.sse import ServerSentEvent  # noqa: E402
+
+from src import serialization  # noqa: E402
+from src.serialization import sources_event_data, token_event_data  # noqa: E402
+
+
+def _answer(tokens: int, sources: int) -> tuple[list[str], list[dict], dict]:
+    words = "Photosynthesis converts light energy into chemical energy – glucose (C₆H₁₂O₆) and oxygen".split()
+    token_texts = [(" " if i else "") + words[i % len(words)] for i in range(tokens)]
+    source_rows = [
+        {
+            "chunk_id": str(uuid.uuid4()),
+            "document_title": f"AQA Biology Paper {i % 2 + 1} — June 2023",
+            "source_type": "past_paper",
+            "similarity": 0.812,
+            "year": 2023,
+            "session": "June",
+            "doc_type": "question_paper",
+            "file_key": f"aqa/biology/2023/paper-{i}.pdf",
+            "url": f"https://example.supabase.co/storage/v1/object/sign/exam-documents/paper-{i}.pdf?token=abc",
+        }
+        for i in range(sources)
+    ]
+    done = {"conversation_id": str(uuid.uuid4()), "message_id": str(uuid.uuid4())}
+    return token_texts, source_rows, done
+
+
+def encode_stdlib(token_texts: list[str], source_rows: list[dict], done: dict) -> int:
+    size = 0
+    size += len(ServerSentEvent(event="sources", data=json.dumps({"sources": source_rows})).encode())
+    for text in token_texts:
+        size += len(ServerSentEvent(event="token", data=json.dumps({"content": text})).encode())
+    size += len(ServerSentEvent(event="done", data=json.dumps(done)).encode())
+    return size
+
+
+def encode_fast(token_texts: list[str], source_rows: list[dict], done: dict) -> int:
+    size = 0
+    size += len(ServerSentEvent(event="sources", data=sources_event_data(source_rows)).encode())
+    for text in token_texts:
+        size += len(ServerSentEvent(event="token", data=token_event_data(text)).encode())
+    size += len(ServerSentEvent(event="done", data=serialization.dumps(done)).encode())
+    return size
+
+
+def tokens_stdlib(token_texts: list[str], _source_rows, _done) -> list[str]:
+    return [json.dumps({"content": text}) for text in token_texts]
+
+
+def tokens_fast(token_texts: list[str], _source_rows, _done) -> list[str]:
+    return [token_event_data(text) for text in token_texts]
+
+
+def _cpu_per_answer(encode, answer, answers: int, repeat: int) -> float:
+    """Best-of-`repeat` CPU microseconds per answer."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        for _ in range(answers):
+            encode(*answer)
+        best = min(best, time.process_time() - start)
+    return best / answers * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialisation CPU per streamed answer")
+    parser.add_argument("--tokens", type=int, default=250, help="Token events per answer (default 250)")
+    parser.add_argument("--sources", type=int, default=5, help="Sources per answer (default 5)")
+    parser.add_argument("--answers", type=int, default=1000, help="Answers per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs (best is reported)")
+    args = parser.parse_args()
+
+    answer = _answer(args.tokens, args.sources)
+    print(f"One answer: {args.tokens} token events, {args.sources} sources, SSE-framed")
+
+    stdlib = _cpu_per_answer(encode_stdlib, answer, args.answers, args.repeat)
+    fast = _cpu_per_answer(encode_fast, answer, args.answers, args.repeat)
+    tokens_before = _cpu_per_answer(tokens_stdlib, answer, args.answers, args.repeat)
+    tokens_after = _cpu_per_answer(tokens_fast, answer, args.answers, args.repeat)
+
+    print(f"  stdlib json            {stdlib:8.1f} µs CPU per answer")
+    print(f"  orjson + fragments     {fast:8.1f} µs CPU per answer  ({stdlib / fast:.2f}x)")
+    print(
+        f"  token payloads alone   {tokens_before:8.1f} → {tokens_after:.1f} µs"
+        f"  ({tokens_before / tokens_after:.2f}x)"
+    )
+
+if __name__ == "__main__":
+    main()
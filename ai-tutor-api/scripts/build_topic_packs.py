@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Build rag.topic_packs for every topic that has ingested chunks.
+
+For each topic:
+1. Load its chunks from completed documents
+2. Skip if the candidate chunk set is unchanged (fingerprint match)
+3. Rank chunks, merge key points, render the packed context
+4. Upsert the topic's row in rag.topic_packs
+
+Ingestion refreshes packs incrementally; run this once after deploying the
+migration, or with --force after changing the ranking.
+
+Usage:
+    cd ai-tutor-api && ./venv/bin/python scripts/build_topic_packs.py
+    cd ai-tutor-api && ./venv/bin/python scripts/build_topic_packs.py --dry-run
+    cd ai-tutor-api && ./venv/bin/python scripts/build_topic_packs.py --subject-id <UUID> --force
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from supabase import create_client  # noqa: E402
+
+from src.config import settings  # noqa: E402
+from src.services.topic_packs import build_topic_pack  # noqa: E402
+
+PAGE_SIZE = 1000
+
+
+def _get_supabase():
+    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+
+
+def _topic_ids(sb, subject_id: str | None) -> list[str]:
+    """Distinct topic IDs referenced by chunks, paged to stay under row limits."""
+    topic_ids: set[str] = set()
+    offset = 0
+    while True:
+        query = (
+            sb.schema("rag")
+            .table("chunks")
+            .select("topic_id")
+            .not_.is_("topic_id", "null")
+            .range(offset, offset + PAGE_SIZE - 1)
+        )
+        if subject_id:
+            query = query.eq("subject_id", subject_id)
+        rows = query.execute().data or []
+        topic_ids.update(r["topic_id"] for r in rows)
+        if len(rows) < PAGE_SIZE:
+            return sorted(topic_ids)
+        offset += PAGE_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build rag.topic_packs")
+    parser.add_argument("--subject-id", help="Only build packs for this subject")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be done")
+    args = parser.parse_args()
+
+    sb = _get_supabase()
+
+    print("Querying topics with chunks...")
+    topic_ids = _topic_ids(sb, args.subject_id)
+    print(f"Found {len(topic_ids)} topics")
+
+    if args.dry_run:
+        print("(dry run — no database changes made)")
+        return
+
+    changed = failed = 0
+    for i, topic_id in enumerate(topic_ids, 1):
+        try:
+            if build_topic_pack(topic_id, force=args.force):
+                changed += 1
+                print(f"[{i}/{len(topic_ids)}] {topic_id} — built")
+        except Exception as e:
+            failed += 1
+            print(f"[{i}/{len(topic_ids)}] {topic_id} — FAILED: {e}")
+
+    print(f"\nDone — {changed} packs built, {len(topic_ids) - changed - failed} unchanged, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,91 @@
 # ai-tutor-api/src/api/chat.py
 
 import asyncio
-import json
 import logging
+import time
 import uuid
-from datetime import datetime, timezone
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TypeVar
 
-from fastapi import APIRouter, Depends
+import anyio
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sse_starlette.sse import EventSourceResponse
 from langsmith.wrappers import wrap_openai
 from openai import AsyncOpenAI
 from supabase import create_client
 
+from .. import serialization
 from ..auth import get_current_user
 from ..config import settings
-from ..models.chat import ChatRequest
-from ..services.embedder import embed_query
+from ..models.chat import ChatRequest, PrefetchRequest, PrefetchResponse
+from ..serialization import sources_event_data, token_event_data
+from ..services import metrics
+from ..services.admission import AdmissionRejected, Slot, admit, role_cache
+from ..services.cold_storage import rehydrate_conversation
+from ..services.conversation_cache import conversation_list_cache
+from ..services.embedder import embed_query, warm_embedding_client
+from ..services.followup import (
+    LastTurn,
+    decide_reuse,
+    last_assistant_message,
+    turn_cache,
+    turn_from_sources,
+)
+from ..services.hedging import embed_hedger, search_hedger
 from ..services.memory import trim_history
-from ..services.retrieval import format_retrieval_context, search_chunks
+from ..services.model_router import RouteDecision, route_model
+from ..services.providers import ProviderConfig, get_pool, is_provider_fault
+from ..services.scope_inference import ensure_scope_index, infer_scope
+from ..services.signed_urls import signed_urls
+from ..services.singleflight import (
+    StreamCancelled,
+    StreamFanout,
+    coalesce_key,
+    embed_flight,
+    llm_fanout,
+    messages_key,
+    search_flight,
+)
+from ..services.taxonomy import load_taxonomy
+from ..services.topic_packs import get_topic_pack, is_generic_topic_query
+from ..services.resilience import (
+    DeadlineExceeded,
+    embedding_breaker,
+    history_breaker,
+    is_database_fault,
+    llm_breaker,
+    search_breaker,
+    stage_timeout,
+    start_deadline,
+)
+from ..services.retrieval import (
+    QuestionReference,
+    RetrievedChunk,
+    fetch_chunks,
+    format_retrieval_context,
+    lookup_exam_question,
+    parse_question_reference,
+    search_chunks,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Running and recently finished turns, keyed by (user_id, stream_id). A turn
+# keeps generating for stream_resume_grace_seconds after its connection drops
+# so a reconnect with Last-Event-ID can pick it up; a client that closes the
+# turn on purpose cancels it at once (POST /chat/stream/{id}/cancel, or a
+# normal WebSocket close).
+chat_turns = StreamFanout(
+    "chat_turn",
+    linger_seconds=settings.stream_resume_grace_seconds,
+    retain_seconds=settings.stream_resume_retain_seconds,
+)
+
 PARENT_SYSTEM_PROMPT = """You are an AI revision tutor helping a GCSE parent understand their child's subjects.
 
 Rules:
@@ -56,20 +120,52 @@ def _get_supabase():
 
 
 async def _load_history(conversation_id: str | None) -> list[dict]:
-    """Load previous messages for an existing conversation."""
+    """Load previous messages for an existing conversation.
+
+    Each dict carries id, role, content and sources — strip to role/content
+    before sending to the LLM. A conversation in cold storage is restored
+    first, so resuming an old chat is transparent.
+    """
     if not conversation_id:
         return []
 
     sb = _get_supabase()
-    result = (
-        sb.schema("rag")
-        .table("messages")
-        .select("role, content")
-        .eq("conversation_id", conversation_id)
-        .order("created_at")
-        .execute()
+
+    def _query() -> list[dict]:
+        result = (
+            sb.schema("rag")
+            .table("messages")
+            .select("id, role, content, sources")
+            .eq("conversation_id", conversation_id)
+            .order("created_at")
+            .execute()
+        )
+        return result.data or []
+
+    def _read() -> list[dict]:
+        rows = _query()
+        # A cold conversation has no rows here beyond, at most, the user
+        # message this turn is saving concurrently
+        if not any(r["role"] == "assistant" for r in rows):
+            if rehydrate_conversation(sb, conversation_id):
+                rows = _query()
+        return rows
+
+    # In a worker thread so the history breaker's timeout can actually fire
+    rows = await history_breaker.call(
+        lambda: anyio.to_thread.run_sync(_read),
+        timeout=stage_timeout(settings.history_stage_timeout_seconds),
+        is_failure=is_database_fault,
     )
-    return [{"role": m["role"], "content": m["content"]} for m in (result.data or [])]
+    return [
+        {
+            "id": m.get("id"),
+            "role": m["role"],
+            "content": m["content"],
+            "sources": m.get("sources") or [],
+        }
+        for m in rows
+    ]
 
 
 async def _create_conversation(user_id: str, child_id: str | None, subject_id: str | None) -> str:
@@ -88,6 +184,63 @@ async def _create_conversation(user_id: str, child_id: str | None, subject_id: s
     return conv_id
 
 
+async def _start_conversation(
+    conversation_id: str,
+    user_id: str,
+    child_id: str | None,
+    subject_id: str | None,
+    content: str,
+) -> str:
+    """Insert a new conversation and its first user message in one RPC.
+
+    The conversation ID is generated by the caller, so this write can run
+    alongside embedding and retrieval. Returns the message ID.
+    """
+    sb = _get_supabase()
+    msg_id = str(uuid.uuid4())
+    sb.schema("rag").rpc(
+        "start_conversation",
+        {
+            "p_conversation_id": conversation_id,
+            "p_user_id": user_id,
+            "p_child_id": child_id,
+            "p_subject_id": subject_id,
+            "p_message_id": msg_id,
+            "p_content": content,
+        },
+    ).execute()
+    conversation_list_cache.invalidate(user_id)
+    return msg_id
+
+
+async def _reuse_or_create_conversation(
+    user_id: str, child_id: str | None, subject_id: str | None
+) -> str:
+    """Return a recent empty conversation for this scope, or create one.
+
+    Prefetch runs every time the tutor panel opens; reusing the latest
+    unused row keeps repeated opens from leaving a trail of empty conversations.
+    """
+    sb = _get_supabase()
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        minutes=settings.prefetch_reuse_empty_conversation_minutes
+    )
+    query = (
+        sb.schema("rag")
+        .table("conversations")
+        .select("id")
+        .eq("user_id", user_id)
+        .eq("message_count", 0)
+        .gte("created_at", cutoff.isoformat())
+    )
+    query = query.eq("child_id", child_id) if child_id else query.is_("child_id", "null")
+    query = query.eq("subject_id", subject_id) if subject_id else query.is_("subject_id", "null")
+    result = query.order("created_at", desc=True).limit(1).execute()
+    if result.data:
+        return result.data[0]["id"]
+    return await _create_conversation(user_id, child_id, subject_id)
+
+
 async def _save_message(
     conversation_id: str,
     role: str,
@@ -95,6 +248,8 @@ async def _save_message(
     model_name: str | None = None,
     token_count: int | None = None,
     latency_ms: int | None = None,
+    interrupted: bool = False,
+    route: RouteDecision | None = None,
 ) -> str:
     """Save a message to the rag.messages table. Returns the message ID.
 
@@ -111,13 +266,65 @@ async def _save_message(
         "model_name": model_name,
         "token_count": token_count,
         "latency_ms": latency_ms,
+        "interrupted": interrupted,
+        "model_tier": route.tier if route else None,
+        "routing": {"score": route.score, "reasons": route.reasons} if route else None,
         "created_at": datetime.now(timezone.utc).isoformat(),
     }).execute()
     return msg_id
 
 
-async def _update_conversation_metadata(conversation_id: str) -> None:
-    """Update conversation last_active_at and message_count. Non-critical — run after stream."""
+async def _save_interrupted_answer(
+    conversation_id: str,
+    user_id: str,
+    partial: str,
+    token_count: int,
+    latency_ms: int,
+    sources_payload: list[dict],
+    route: RouteDecision,
+    model_name: str,
+) -> None:
+    """Persist whatever was streamed before the client went away."""
+    try:
+        msg_id = await _save_message(
+            conversation_id,
+            "assistant",
+            partial,
+            model_name=model_name,
+            token_count=token_count,
+            latency_ms=latency_ms,
+            interrupted=True,
+            route=route,
+        )
+        if sources_payload:
+            sb = _get_supabase()
+            sb.schema("rag").table("messages").update({
+                "sources": sources_payload,
+            }).eq("id", msg_id).execute()
+        await _update_conversation_metadata(conversation_id, user_id)
+    except Exception:
+        logger.exception("Failed to save interrupted answer for %s", conversation_id)
+
+
+def _record_tokens_saved(token_count: int) -> None:
+    """Estimate the tokens a cancelled answer didn't generate.
+
+    The remainder is the mean length of completed answers so far, less what
+    was already streamed — not max_response_tokens, which most answers never
+    reach. Nothing is recorded before the first answer completes.
+    """
+    expected = metrics.summary_mean("chat_response_tokens")
+    if expected is None:
+        return
+    remainder = min(expected, settings.max_response_tokens) - token_count
+    metrics.increment("llm_tokens_saved_total", max(0.0, remainder))
+
+
+async def _update_conversation_metadata(conversation_id: str, user_id: str) -> None:
+    """Update conversation last_active_at and message_count. Non-critical — run after stream.
+
+    Drops the owner's cached sidebar page, whose order and counts just changed.
+    """
     sb = _get_supabase()
     count = (
         sb.schema("rag")
@@ -130,10 +337,12 @@ async def _update_conversation_metadata(conversation_id: str) -> None:
     sb.schema("rag").table("conversations").update({
         "last_active_at": datetime.now(timezone.utc).isoformat(),
         "message_count": count,
+        "archived_at": None,  # a new message brings an archived conversation back
     }).eq("id", conversation_id).execute()
+    conversation_list_cache.invalidate(user_id)
 
 
-async def _generate_title(conversation_id: str, user_message: str) -> None:
+async def _generate_title(conversation_id: str, user_id: str, user_message: str) -> None:
     """Generate an AI title for a new conversation in the background.
 
     Fires after the first exchange completes. Uses the configured chat model.
@@ -170,51 +379,515 @@ async def _generate_title(conversation_id: str, user_message: str) -> None:
     sb.schema("rag").table("conversations").update({"title": title}).eq(
         "id", conversation_id
     ).execute()
+    conversation_list_cache.invalidate(user_id)
 
 
-@router.post("/stream")
-async def chat_stream(req: ChatRequest, user: dict = Depends(get_current_user)):
-    """Stream a chat response via SSE."""
+async def _coalesced_call(
+    flight, key, breaker, fn: Callable[[], Awaitable[T]], timeout: float, is_failure
+) -> T:
+    """fn() behind `breaker`, shared among concurrent callers with the same key.
 
-    async def event_generator():
-        import time
+    The breaker sits inside the flight, so one upstream call is one breaker
+    verdict however many callers share it. Each caller still waits no
+    longer than its own stage timeout.
+    """
+
+    def _guarded():
+        return breaker.call(fn, timeout=timeout, is_failure=is_failure)
+
+    if not settings.coalesce_requests_enabled:
+        return await _guarded()
+    if timeout <= 0:
+        raise DeadlineExceeded(breaker.name)
+    return await asyncio.wait_for(flight.do(key, _guarded), timeout)
+
+
+async def _embed_message(message: str) -> list[float]:
+    """embed_query behind the embedding breaker, sharing one (possibly hedged)
+    call among concurrent identical messages."""
+    return await _coalesced_call(
+        embed_flight,
+        coalesce_key(message),
+        embedding_breaker,
+        lambda: embed_hedger.run(lambda: embed_query(message)),
+        timeout=stage_timeout(settings.embedding_stage_timeout_seconds),
+        is_failure=is_provider_fault,
+    )
+
+
+async def _search(
+    req: ChatRequest,
+    query_embedding: list[float],
+    subject_id: str | None,
+    topic_id: str | None,
+) -> list[RetrievedChunk]:
+    """search_chunks behind the search breaker, sharing one (possibly hedged)
+    RPC among concurrent identical message + scope."""
+
+    def _run():
+        return search_hedger.run(lambda: search_chunks(
+            query_embedding=query_embedding,
+            subject_id=subject_id,
+            topic_id=topic_id,
+            source_type=req.source_type,
+            year=req.year,
+            doc_type=req.doc_type,
+        ))
+
+    chunks = await _coalesced_call(
+        search_flight,
+        coalesce_key(req.message, subject_id, topic_id, req.source_type, req.year, req.doc_type),
+        search_breaker,
+        _run,
+        timeout=stage_timeout(settings.search_stage_timeout_seconds),
+        is_failure=is_database_fault,
+    )
+    return list(chunks)
+
+
+def _delta_content(chunk) -> str | None:
+    delta = chunk.choices[0].delta if chunk.choices else None
+    return delta.content if delta and delta.content else None
+
+
+@dataclass(frozen=True)
+class ServedModel:
+    """First item of a chat token stream: the model the chosen provider actually ran."""
+
+    name: str
+
+
+async def _open_chat_stream(provider: ProviderConfig, messages: list[dict], model: str):
+    """Open a completion stream for `model` on one provider and read up to its first content.
+
+    Returns (stream, iterator, first_content). The stream is closed here if
+    opening fails or is cancelled (first-token deadline).
+    """
+    client = wrap_openai(AsyncOpenAI(
+        api_key=provider.api_key,
+        base_url=provider.base_url,
+    ))
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        max_tokens=settings.max_response_tokens,
+    )
+    iterator = stream.__aiter__()
+    try:
+        async for chunk in iterator:
+            content = _delta_content(chunk)
+            if content:
+                return stream, iterator, content
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await stream.close()
+        raise
+    return stream, iterator, None
+
+
+async def _connect_llm(messages: list[dict], route: RouteDecision):
+    """Open a completion stream on the first provider to produce a token in time.
+
+    Providers are tried in health/latency order; one that errors or misses
+    chat_first_token_timeout_seconds (connect + first token, capped by the
+    turn's remaining deadline) is skipped for the next. Each provider runs
+    its own model for the route's tier. Returns (opened, model).
+    """
+    pool = get_pool("chat")
+    last_exc: Exception | None = None
+    for attempt, provider in enumerate(pool.candidates()):
+        timeout = stage_timeout(settings.chat_first_token_timeout_seconds)
+        if timeout <= 0:
+            raise DeadlineExceeded("llm")
+        if attempt:
+            metrics.increment("provider_failover_total", capability="chat")
+        model = provider.model_for(route.tier, route.model)
+        opened_at = time.monotonic()
+        try:
+            opened = await asyncio.wait_for(
+                _open_chat_stream(provider, messages, model), timeout
+            )
+        except asyncio.TimeoutError as exc:
+            logger.warning("Chat provider %s missed the first-token deadline", provider.name)
+            pool.record_failure(provider, "timeout")
+            last_exc = exc
+            continue
+        except Exception as exc:
+            if not is_provider_fault(exc):
+                raise
+            logger.warning("Chat provider %s failed: %s", provider.name, exc)
+            pool.record_failure(provider, "error")
+            last_exc = exc
+            continue
+        pool.record_success(provider, (time.monotonic() - opened_at) * 1000)
+        return opened, model
+    raise last_exc or RuntimeError("No chat providers configured")
+
+
+async def _llm_tokens(messages: list[dict], route: RouteDecision):
+    """Stream content deltas from the chat LLM, after a ServedModel naming the model used.
+
+    Connecting goes through the LLM circuit breaker, so while every
+    provider is down turns fail immediately instead of waiting out the
+    first-token deadlines. Once tokens flow the answer stays on that provider.
+    """
+    (stream, iterator, first), model = await llm_breaker.call(
+        lambda: _connect_llm(messages, route), is_failure=is_provider_fault
+    )
+    try:
+        yield ServedModel(model)
+        if first:
+            yield first
+        async for chunk in iterator:
+            content = _delta_content(chunk)
+            if content:
+                yield content
+    finally:
+        # Closing the response is what stops the provider generating (and
+        # billing) further tokens. Shielded: on disconnect we run inside a
+        # cancelled scope.
+        with anyio.CancelScope(shield=True):
+            await stream.close()
+
+
+async def _search_with_scope(req: ChatRequest, query_embedding: list[float]) -> list:
+    """Vector search, inferring a subject/topic filter when the request has none.
+
+    An inferred scope that returns no chunks falls back to the full corpus so
+    a wrong guess never costs the student an answer.
+    """
+    subject_id, topic_id = req.subject_id, req.topic_id
+    inferred = None
+    if settings.scope_inference_enabled and not subject_id and not topic_id:
+        inferred = infer_scope(query_embedding, req.message)
+        metrics.increment("scope_inference_total", method=inferred.method)
+        if inferred.method != "none":
+            subject_id, topic_id = inferred.subject_id, inferred.topic_id
+            logger.info(
+                "Inferred scope subject=%s topic=%s (method=%s, confidence=%.3f)",
+                subject_id, topic_id, inferred.method, inferred.confidence,
+            )
+
+    # Vector search (scoped by subject/topic/filters if provided)
+    chunks = await _search(req, query_embedding, subject_id, topic_id)
+
+    if not chunks and inferred and inferred.method != "none":
+        metrics.increment("scope_inference_fallback_total")
+        chunks = await _search(req, query_embedding, None, None)
+    return chunks
+
+
+def _wants_topic_pack(req: ChatRequest) -> bool:
+    """Topic-page requests about the topic as a whole, with no extra filters."""
+    return (
+        settings.topic_pack_enabled
+        and bool(req.topic_id)
+        and not (req.source_type or req.year or req.doc_type)
+        and is_generic_topic_query(req.message)
+    )
 
+
+async def _fast_path_lookup(
+    req: ChatRequest,
+    question_ref: QuestionReference | None,
+    use_pack: bool,
+) -> tuple[list[RetrievedChunk], str | None]:
+    """Answer from an index instead of a vector search.
+
+    Returns (chunks, precomputed_context). Empty chunks mean the caller
+    should fall back to embed_query + search.
+    """
+    if question_ref:
+        chunks = await lookup_exam_question(question_ref, req.subject_id)
+        metrics.increment("exam_question_lookup_total", result="hit" if chunks else "miss")
+        if chunks:
+            return chunks, None
+
+    if use_pack:
+        pack = await get_topic_pack(req.topic_id)
+        metrics.increment("topic_pack_total", result="hit" if pack else "miss")
+        if pack:
+            logger.info("Serving topic pack for %s (%d chunks)", req.topic_id, len(pack.chunks))
+            return pack.chunks, pack.packed_context
+
+    return [], None
+
+
+async def _rebuild_previous_turn(
+    raw_history: list[dict], query_embedding: list[float],
+) -> LastTurn | None:
+    """Rebuild the previous turn from its persisted sources when the turn cache misses.
+
+    The cache is per process, so a turn answered by another worker (or before
+    a restart) is only recoverable from rag.messages. Best-effort: a failed
+    fetch means a normal search.
+    """
+    last = last_assistant_message(raw_history)
+    chunk_ids = [s["chunk_id"] for s in (last or {}).get("sources") or [] if s.get("chunk_id")]
+    if not chunk_ids:
+        return None
+    try:
+        chunks = await fetch_chunks(chunk_ids, query_embedding)
+    except Exception as exc:
+        logger.warning("Could not rebuild previous turn from sources: %s", exc)
+        return None
+    return turn_from_sources(last, chunks)
+
+
+async def _retrieve_for_turn(
+    req: ChatRequest,
+    conversation_id: str,
+    is_new_conversation: bool,
+    query_embedding: list[float],
+    raw_history: list[dict],
+    scope: tuple,
+) -> list:
+    """Reuse the previous turn's chunks for close follow-ups, else search."""
+    if settings.followup_reuse_enabled and not is_new_conversation:
+        previous_turn = turn_cache.get(conversation_id)
+        if previous_turn is None:
+            previous_turn = await _rebuild_previous_turn(raw_history, query_embedding)
+        decision = decide_reuse(
+            previous_turn,
+            raw_history,
+            query_embedding,
+            req.message,
+            scope,
+        )
+        metrics.increment("retrieval_reuse_total", reason=decision.reason)
+        logger.info(
+            "Follow-up reuse for %s: %s (reason=%s, similarity=%s)",
+            conversation_id,
+            "hit" if decision.reuse else "miss",
+            decision.reason,
+            f"{decision.similarity:.3f}" if decision.similarity is not None else "n/a",
+        )
+        if decision.reuse:
+            return previous_turn.chunks
+
+    return await _search_with_scope(req, query_embedding)
+
+
+async def _degrade(stage: str, work: Awaitable[T], fallback: T, degraded: list[str]) -> T:
+    """Await an optional pipeline stage; if it fails, note it and carry on with `fallback`.
+
+    Covers open circuits and spent deadlines as well as plain errors, so a
+    degraded dependency costs the turn its context, not its answer.
+    """
+    try:
+        return await work
+    except Exception as exc:
+        logger.warning("Turn continues without %s: %s", stage, exc)
+        metrics.increment("chat_degraded_total", stage=stage, reason=type(exc).__name__)
+        degraded.append(stage)
+        return fallback
+
+
+async def _warm_scope_index() -> None:
+    """Start the scope index build (taxonomy + ingested subjects) if not ready."""
+    ensure_scope_index()
+
+
+@router.post("/prefetch", response_model=PrefetchResponse)
+async def chat_prefetch(req: PrefetchRequest, user: dict = Depends(get_current_user)):
+    """Warm caches and connections for the scope the tutor panel just opened.
+
+    Every step is best-effort and runs concurrently: the subject taxonomy and
+    scope index, the embedding connection pool, the topic's pack, and the
+    conversation row. The frontend passes the returned conversation_id to
+    the first /chat/stream call.
+    """
+    start = time.monotonic()
+    steps = {
+        "scope_index": _warm_scope_index(),
+        "embedding_connection": warm_embedding_client(),
+    }
+    if req.subject_id:
+        steps["taxonomy"] = asyncio.to_thread(load_taxonomy, req.subject_id)
+    if settings.topic_pack_enabled and req.topic_id:
+        steps["topic_pack"] = get_topic_pack(req.topic_id)
+    if req.create_conversation and not req.conversation_id:
+        steps["conversation"] = _reuse_or_create_conversation(
+            user["user_id"], req.child_id, req.subject_id
+        )
+
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+
+    warmed, failed = [], []
+    conversation_id = req.conversation_id
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            logger.warning("Prefetch step %s failed: %s", name, result)
+            failed.append(name)
+            continue
+        warmed.append(name)
+        if name == "conversation":
+            conversation_id = result
+
+    metrics.increment("chat_prefetch_total", result="partial" if failed else "ok")
+    metrics.observe("chat_prefetch_ms", (time.monotonic() - start) * 1000)
+    return PrefetchResponse(conversation_id=conversation_id, warmed=warmed, failed=failed)
+
+
+async def numbered_events(stream_id: str, events, start_at: int = 0):
+    """Give each SSE event a resumable id "<stream_id>:<n>" (n counts from 1).
+
+    A turn cancelled while followed (POST .../cancel) just ends the stream:
+    the client asked for it, and the partial answer is already saved.
+    """
+    seq = start_at
+    try:
+        async for event in events:
+            seq += 1
+            yield {**event, "id": f"{stream_id}:{seq}"}
+    except StreamCancelled:
+        return
+    finally:
+        await events.aclose()
+
+
+def resume_turn(user_id: str, last_event_id: str):
+    """Events after `last_event_id` for one of this user's turns, or None if gone."""
+    stream_id, _, seq = last_event_id.rpartition(":")
+    if not stream_id or not seq.isdigit():
+        return None
+    events = chat_turns.attach((user_id, stream_id), int(seq))
+    metrics.increment("chat_stream_resume_total", result="hit" if events else "miss")
+    if events is None:
+        return None
+    logger.info("Resuming stream %s after event %s", stream_id, seq)
+    return numbered_events(stream_id, events, int(seq))
+
+
+def _profile_role(user_id: str) -> str:
+    """The user's role from public.profiles ("parent" without a profile row)."""
+    result = (
+        _get_supabase()
+        .table("profiles")
+        .select("role")
+        .eq("id", user_id)
+        .limit(1)
+        .execute()
+    )
+    return result.data[0]["role"] if result.data else "parent"
+
+
+async def _verified_role(user_id: str) -> str:
+    """Role for rate limiting, from the cached profile — never from the request.
+
+    A failed lookup falls back to the stricter child limits and is retried
+    on the next turn.
+    """
+    role = role_cache.get(user_id)
+    if role is not None:
+        return role
+    try:
+        role = await asyncio.to_thread(_profile_role, user_id)
+    except Exception as exc:
+        logger.warning("Profile role lookup failed for %s: %s", user_id, exc)
+        return "child"
+    role_cache.put(user_id, role)
+    return role
+
+
+async def admit_turn(user: dict) -> Slot | None:
+    """Admission for one chat turn (None when admission control is off).
+
+    Runs before any embedding or retrieval work so rejected requests cost a
+    bucket lookup (plus a profile read once per user per role-cache TTL).
+    Raises AdmissionRejected.
+    """
+    if not settings.admission_enabled:
+        return None
+    return await admit(user["user_id"], await _verified_role(user["user_id"]))
+
+
+def start_turn(req: ChatRequest, user: dict, slot: Slot | None) -> str:
+    """Run one chat turn in its own task under chat_turns; returns its stream id.
+
+    Transports follow the turn with chat_turns.attach((user_id, stream_id)).
+    """
+
+    async def event_generator():
         start = time.monotonic()
+        # Each turn runs in its own task, so the deadline covers exactly this
+        # turn's stages (and the tasks it starts) up to the first LLM token.
+        start_deadline(settings.chat_deadline_seconds)
+        degraded: list[str] = []
 
         try:
-            # Resolve or create conversation
+            # New conversations get their ID here; the row is written together
+            # with the first message in the parallel phase below.
             conversation_id = req.conversation_id
             is_new_conversation = not conversation_id
-            if not conversation_id:
-                conversation_id = await _create_conversation(
-                    user["user_id"], req.child_id, req.subject_id
+            if is_new_conversation:
+                conversation_id = str(uuid.uuid4())
+
+            # Fast paths skip embedding + vector search: named past-paper
+            # questions hit the exam question index, generic topic-page
+            # requests use the topic's precomputed pack.
+            question_ref = parse_question_reference(req.message)
+            use_pack = _wants_topic_pack(req)
+
+            # --- Parallel phase: embed (or lookup) + load history + save user message ---
+            # All three are independent — run concurrently. A new conversation
+            # has no history to load and saves its row + message in one write.
+            # Embedding, search and history degrade to "without" on failure.
+            if question_ref or use_pack:
+                first_task = asyncio.create_task(_fast_path_lookup(req, question_ref, use_pack))
+            else:
+                first_task = asyncio.create_task(
+                    _degrade("retrieval", _embed_message(req.message), None, degraded)
+                )
+            history_task = asyncio.create_task(_degrade(
+                "history",
+                _load_history(None if is_new_conversation else conversation_id),
+                [],
+                degraded,
+            ))
+            if is_new_conversation:
+                save_task = asyncio.create_task(_start_conversation(
+                    conversation_id, user["user_id"], req.child_id, req.subject_id, req.message,
+                ))
+            else:
+                save_task = asyncio.create_task(
+                    _save_message(conversation_id, "user", req.message)
                 )
 
-            # --- Parallel phase: embed + load history + save user message ---
-            # All three are independent — run concurrently
-            embed_task = asyncio.create_task(embed_query(req.message))
-            history_task = asyncio.create_task(_load_history(conversation_id))
-            save_task = asyncio.create_task(
-                _save_message(conversation_id, "user", req.message)
+            first_result, raw_history, _ = await asyncio.gather(
+                first_task, history_task, save_task
             )
 
-            query_embedding, raw_history, _ = await asyncio.gather(
-                embed_task, history_task, save_task
-            )
+            scope = (req.subject_id, req.topic_id, req.source_type, req.year, req.doc_type)
+            query_embedding: list[float] | None = None
+            chunks = None
+            retrieval_context = None
+            if question_ref or use_pack:
+                chunks, retrieval_context = first_result
+                if not chunks:
+                    query_embedding = await _degrade(
+                        "retrieval", _embed_message(req.message), None, degraded
+                    )
+            else:
+                query_embedding = first_result
 
-            # Vector search (scoped by subject/topic/filters if provided)
-            chunks = await search_chunks(
-                query_embedding=query_embedding,
-                subject_id=req.subject_id,
-                topic_id=req.topic_id,
-                source_type=req.source_type,
-                year=req.year,
-                doc_type=req.doc_type,
-            )
+            if not chunks and query_embedding is not None:
+                chunks = await _degrade(
+                    "retrieval",
+                    _retrieve_for_turn(
+                        req, conversation_id, is_new_conversation,
+                        query_embedding, raw_history, scope,
+                    ),
+                    [],
+                    degraded,
+                )
+            chunks = chunks or []
 
             # Send sources to frontend via SSE (before streaming response)
             sources_payload = [
                 {
+                    "chunk_id": c.id,
                     "document_title": c.document_title,
                     "source_type": c.source_type,
                     "similarity": round(c.similarity, 3),
@@ -225,10 +898,23 @@ async def chat_stream(req: ChatRequest, user: dict = Depends(get_current_user)):
                 }
                 for c in chunks
             ]
-            if sources_payload:
-                yield {
+            # Signed links ride along in the event only: they expire, so the
+            # persisted sources keep just the file_key. Signing runs while the
+            # LLM connects and the event goes out ahead of the first token;
+            # signed_urls gives up after source_url_timeout_seconds and the
+            # sources are then sent without URLs.
+            urls_task = (
+                asyncio.create_task(signed_urls(_get_supabase(), [c.file_key for c in chunks]))
+                if sources_payload else None
+            )
+
+            def _sources_event(urls: dict[str, str]) -> dict:
+                return {
                     "event": "sources",
-                    "data": json.dumps({"sources": sources_payload}),
+                    "data": sources_event_data([
+                        {**source, "url": urls.get(source["file_key"])}
+                        for source in sources_payload
+                    ]),
                 }
 
             # Build messages array with retrieval context + trimmed history
@@ -237,40 +923,103 @@ async def chat_stream(req: ChatRequest, user: dict = Depends(get_current_user)):
 
             messages = [{"role": "system", "content": system_prompt}]
             if chunks:
-                messages.append(
-                    {"role": "system", "content": format_retrieval_context(chunks)}
-                )
-            messages.extend(m for m in trimmed if m["role"] != "system")
+                messages.append({
+                    "role": "system",
+                    "content": retrieval_context or format_retrieval_context(chunks),
+                })
+            messages.extend(
+                {"role": m["role"], "content": m["content"]}
+                for m in trimmed
+                if m["role"] != "system"
+            )
             # Ensure the latest user message is included
             # (it was just saved, so history might not have it yet)
             if not trimmed or trimmed[-1]["content"] != req.message:
                 messages.append({"role": "user", "content": req.message})
 
-            # Stream from chat LLM
-            client = wrap_openai(AsyncOpenAI(
-                api_key=settings.chat_api_key,
-                base_url=settings.chat_base_url,
-            ))
-
-            stream = await client.chat.completions.create(
-                model=settings.chat_model,
-                messages=messages,
-                stream=True,
-                max_tokens=settings.max_response_tokens,
+            # Pick the model tier for this turn from cheap signals
+            if settings.model_routing_enabled:
+                route = route_model(req.message, chunks, req.subject_id, req.role)
+            else:
+                route = RouteDecision(tier="default", model=settings.chat_model, score=0)
+            metrics.increment("chat_model_route_total", tier=route.tier)
+            logger.info(
+                "Routed turn to %s (%s, score=%d, reasons=%s)",
+                route.model, route.tier, route.score, ",".join(route.reasons) or "-",
             )
 
+            # Stream from chat LLM. Identical prompts in flight at the same
+            # time (a class asking the same opening question) share one
+            # upstream stream; history makes prompts unique, so in practice
+            # only first turns coalesce.
+            if settings.coalesce_llm_streams:
+                tokens = llm_fanout.subscribe(
+                    messages_key(f"{route.tier}:{route.model}", messages),
+                    lambda: _llm_tokens(messages, route),
+                )
+            else:
+                tokens = _llm_tokens(messages, route)
+
             full_response = ""
             token_count = 0
+            model_name = route.model
 
-            async for chunk in stream:
-                delta = chunk.choices[0].delta if chunk.choices else None
-                if delta and delta.content:
-                    full_response += delta.content
+            try:
+                async for content in tokens:
+                    if isinstance(content, ServedModel):
+                        model_name = content.name
+                        continue
+                    if urls_task is not None:
+                        yield _sources_event(await urls_task)
+                        urls_task = None
+                    full_response += content
                     token_count += 1
                     yield {
                         "event": "token",
-                        "data": json.dumps({"content": delta.content}),
+                        "data": token_event_data(content),
                     }
+            except BaseException as exc:
+                # The turn is cancelled once its client has been gone for the
+                # resume grace period; stop the upstream stream and keep the
+                # partial answer. A coalesced stream cancelled under this
+                # subscriber arrives as StreamCancelled: also interrupted.
+                if isinstance(exc, StreamCancelled):
+                    reason = "upstream_cancelled"
+                elif isinstance(exc, Exception):
+                    reason = "error"
+                else:
+                    reason = "disconnect"
+                if urls_task is not None:
+                    if reason != "disconnect":
+                        # Failed before the first token: the client still
+                        # gets the sources ahead of the error event
+                        yield _sources_event(await urls_task)
+                    else:
+                        urls_task.cancel()
+                with anyio.CancelScope(shield=True):
+                    await tokens.aclose()
+                    metrics.increment("chat_stream_interrupted_total", reason=reason)
+                    if reason == "disconnect":
+                        _record_tokens_saved(token_count)
+                    if full_response:
+                        await _save_interrupted_answer(
+                            conversation_id,
+                            user["user_id"],
+                            full_response,
+                            token_count,
+                            int((time.monotonic() - start) * 1000),
+                            sources_payload,
+                            route,
+                            model_name,
+                        )
+                logger.info(
+                    "Stream for %s interrupted (%s) after %d tokens",
+                    conversation_id, reason, token_count,
+                )
+                raise
+            if urls_task is not None:  # an empty answer still gets its sources
+                yield _sources_event(await urls_task)
+            metrics.observe("chat_response_tokens", token_count)
 
             # --- Post-stream saves (non-blocking where possible) ---
             elapsed_ms = int((time.monotonic() - start) * 1000)
@@ -278,10 +1027,13 @@ async def chat_stream(req: ChatRequest, user: dict = Depends(get_current_user)):
                 conversation_id,
                 "assistant",
                 full_response,
-                model_name=settings.chat_model,
+                model_name=model_name,
                 token_count=token_count,
                 latency_ms=elapsed_ms,
+                route=route,
             )
+            if query_embedding is not None:
+                turn_cache.put(conversation_id, msg_id, query_embedding, chunks, scope)
 
             # Save sources + update conversation metadata in background
             async def _post_stream_saves():
@@ -291,29 +1043,85 @@ async def chat_stream(req: ChatRequest, user: dict = Depends(get_current_user)):
                         sb.schema("rag").table("messages").update({
                             "sources": sources_payload,
                         }).eq("id", msg_id).execute()
-                    await _update_conversation_metadata(conversation_id)
+                    await _update_conversation_metadata(conversation_id, user["user_id"])
                 except Exception:
                     logger.exception("Background save failed for conversation %s", conversation_id)
 
             asyncio.create_task(_post_stream_saves())
 
+            done = {"conversation_id": conversation_id, "message_id": msg_id}
+            if degraded:
+                done["degraded"] = sorted(set(degraded))
             yield {
                 "event": "done",
-                "data": json.dumps({
-                    "conversation_id": conversation_id,
-                    "message_id": msg_id,
-                }),
+                "data": serialization.dumps(done),
             }
 
-            # Generate title asynchronously for new conversations
-            if is_new_conversation:
-                asyncio.create_task(_generate_title(conversation_id, req.message))
+            # Generate title asynchronously for new conversations (including
+            # ones pre-created by /chat/prefetch, which have no replies yet)
+            history_loaded = "history" not in degraded
+            if is_new_conversation or (
+                history_loaded and not any(m["role"] == "assistant" for m in raw_history)
+            ):
+                asyncio.create_task(
+                    _generate_title(conversation_id, user["user_id"], req.message)
+                )
 
         except Exception as exc:
             logger.exception("SSE stream error: %s", exc)
             yield {
                 "event": "error",
-                "data": json.dumps({"error": str(exc)}),
+                "data": serialization.dumps({"error": str(exc)}),
             }
 
-    return EventSourceResponse(event_generator())
+    # The admission slot is held for the life of the turn, not the connection
+    stream_id = uuid.uuid4().hex
+    key = (user["user_id"], stream_id)
+    chat_turns.start(key, event_generator, on_done=slot.release if slot else None)
+    return stream_id
+
+
+@router.post("/stream")
+async def chat_stream(
+    req: ChatRequest,
+    user: dict = Depends(get_current_user),
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+):
+    """Stream a chat response via SSE.
+
+    The turn runs in its own task and every event carries an id. A client
+    that reconnects with Last-Event-ID gets the rest of the same turn —
+    replayed from the buffer, then live — instead of a new retrieval and
+    generation.
+    """
+    if last_event_id:
+        resumed = resume_turn(user["user_id"], last_event_id)
+        if resumed is not None:
+            return EventSourceResponse(resumed)
+
+    try:
+        slot = await admit_turn(user)
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many requests ({exc.reason}), retry shortly",
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+
+    stream_id = start_turn(req, user, slot)
+    return EventSourceResponse(
+        numbered_events(stream_id, chat_turns.attach((user["user_id"], stream_id)))
+    )
+
+
+@router.post("/stream/{stream_id}/cancel")
+async def cancel_stream(stream_id: str, user: dict = Depends(get_current_user)):
+    """Stop one of the user's turns now, e.g. the Stop button or closing the chat.
+
+    stream_id is the part of any event id before the ":". Dropping the SSE
+    connection instead keeps the turn generating for the resume grace period,
+    since the client may reconnect; the partial answer is saved either way.
+    """
+    cancelled = chat_turns.cancel((user["user_id"], stream_id))
+    metrics.increment("chat_stream_cancel_total", result="cancelled" if cancelled else "not_running")
+    return {"cancelled": cancelled}
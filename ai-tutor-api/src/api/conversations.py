@@ -1,19 +1,33 @@
 # ai-tutor-api/src/api/conversations.py
 # CRUD endpoints for conversation history.
 
+import asyncio
+import base64
 import logging
+import uuid
+from datetime import date, datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from supabase import create_client
 
 from ..auth import get_current_user
 from ..config import settings
 from ..models.chat import (
+    BulkConversationRequest,
+    BulkConversationResponse,
     ConversationDetail,
     ConversationListResponse,
     ConversationSummary,
+    MessageSearchHit,
+    MessageSearchResponse,
     MessageSummary,
 )
+from ..services import metrics
+from ..services.cold_storage import rehydrate_conversation
+from ..services.conversation_cache import conversation_list_cache
+from ..services.conversation_export import export_ndjson, gzip_stream
+from ..services.followup import turn_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -22,26 +36,86 @@ def _get_supabase():
     return create_client(settings.supabase_url, settings.supabase_service_role_key)
 
 
-@router.get("", response_model=ConversationListResponse)
-async def list_conversations(
-    limit: int = Query(default=20, ge=1, le=50),
-    offset: int = Query(default=0, ge=0),
-    user: dict = Depends(get_current_user),
-):
-    """List the current user's conversations, most recent first."""
+def _encode_cursor(last_active_at: str, conversation_id: str) -> str:
+    """Opaque keyset cursor for the row a page ended on."""
+    raw = f"{last_active_at}|{conversation_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
     try:
-        sb = _get_supabase()
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        last_active_at, conversation_id = raw.split("|", 1)
+        datetime.fromisoformat(last_active_at)
+        uuid.UUID(conversation_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+    return last_active_at, conversation_id
+
+
+def _fetch_page(
+    sb, user_id: str, limit: int, cursor: str | None, offset: int, archived: bool
+) -> list[dict]:
+    """Up to limit + 1 rows, so the caller can tell whether another page exists."""
+    if offset and cursor is None and not archived:
+        # Legacy offset paging for clients that predate cursors
         result = (
             sb.schema("rag")
             .table("conversations")
             .select("id, title, message_count, last_active_at, created_at, subject_id")
-            .eq("user_id", user["user_id"])
+            .eq("user_id", user_id)
+            .gt("message_count", 0)  # hide rows pre-created by /chat/prefetch and never used
+            .is_("archived_at", "null")
             .order("last_active_at", desc=True)
             .range(offset, offset + limit)
             .execute()
         )
+        return result.data or []
+
+    before_active_at, before_id = _decode_cursor(cursor) if cursor else (None, None)
+    result = sb.schema("rag").rpc(
+        "list_conversations",
+        {
+            "p_user_id": user_id,
+            "p_limit": limit + 1,
+            "p_before_active_at": before_active_at,
+            "p_before_id": before_id,
+            "p_archived": archived,
+        },
+    ).execute()
+    return result.data or []
+
+
+@router.get("", response_model=ConversationListResponse)
+async def list_conversations(
+    limit: int = Query(default=20, ge=1, le=50),
+    cursor: str | None = Query(default=None, description="next_cursor of the previous page"),
+    offset: int = Query(default=0, ge=0, deprecated=True),
+    archived: bool = Query(default=False, description="List archived conversations instead"),
+    user: dict = Depends(get_current_user),
+):
+    """List the current user's conversations, most recent first.
+
+    Pages are keyset-paginated on (last_active_at, id): pass the previous
+    page's next_cursor to continue. The first page is served from a per-user
+    cache until one of the user's conversations changes.
+    """
+    user_id = user["user_id"]
+    first_page = cursor is None and offset == 0 and not archived
+    if first_page:
+        cached = conversation_list_cache.get(user_id, limit)
+        if cached is not None:
+            metrics.increment("conversation_list_cache_total", result="hit")
+            return cached
+        metrics.increment("conversation_list_cache_total", result="miss")
+
+    ticket = conversation_list_cache.begin()
+    try:
+        rows = _fetch_page(_get_supabase(), user_id, limit, cursor, offset, archived)
+    except HTTPException:
+        raise
     except Exception as exc:
-        logger.exception("Failed to list conversations for user %s", user["user_id"])
+        logger.exception("Failed to list conversations for user %s", user_id)
         raise HTTPException(status_code=502, detail=f"Database error: {exc}") from exc
 
     conversations = [
@@ -53,49 +127,177 @@ async def list_conversations(
             created_at=c["created_at"],
             subject_id=c.get("subject_id"),
         )
-        for c in (result.data or [])
+        for c in rows
     ]
 
     has_more = len(conversations) > limit
     if has_more:
         conversations = conversations[:limit]
 
-    return ConversationListResponse(conversations=conversations, has_more=has_more)
+    next_cursor = None
+    if has_more:
+        last = conversations[-1]
+        next_cursor = _encode_cursor(last.last_active_at, last.id)
+
+    page = ConversationListResponse(
+        conversations=conversations, has_more=has_more, next_cursor=next_cursor
+    )
+    if first_page:
+        conversation_list_cache.put(user_id, limit, page, ticket)
+    return page
+
+
+@router.get("/search", response_model=MessageSearchResponse)
+async def search_conversations(
+    q: str = Query(min_length=2, max_length=200),
+    limit: int = Query(default=20, ge=1, le=50),
+    offset: int = Query(default=0, ge=0, le=1000),
+    user: dict = Depends(get_current_user),
+):
+    """Full-text search over the current user's messages, best matches first.
+
+    One indexed query (tsvector on rag.messages.content, scoped through the
+    conversation's user_id) returns the page with highlighted snippets.
+    Messages in cold storage aren't indexed and aren't searched — thawing
+    every archive per query would defeat it. The first page reports how
+    many conversations that leaves out; reopening one makes it searchable.
+    """
+    try:
+        result = _get_supabase().schema("rag").rpc(
+            "search_messages",
+            {
+                "p_user_id": user["user_id"],
+                "p_query": q,
+                "p_limit": limit + 1,
+                "p_offset": offset,
+            },
+        ).execute()
+    except Exception as exc:
+        logger.exception("Conversation search failed for user %s", user["user_id"])
+        raise HTTPException(status_code=502, detail=f"Database error: {exc}") from exc
+
+    hits = [
+        MessageSearchHit(
+            message_id=row["message_id"],
+            conversation_id=row["conversation_id"],
+            conversation_title=row.get("conversation_title"),
+            role=row["role"],
+            created_at=row["created_at"],
+            rank=row["rank"],
+            snippet=row["snippet"],
+        )
+        for row in result.data or []
+    ]
+    metrics.increment("conversation_search_total", result="hit" if hits else "empty")
+
+    has_more = len(hits) > limit
+    return MessageSearchResponse(
+        results=hits[:limit],
+        has_more=has_more,
+        next_offset=offset + limit if has_more else None,
+        cold_conversations=_cold_conversation_count(user["user_id"]) if offset == 0 else 0,
+    )
+
+
+def _cold_conversation_count(user_id: str) -> int:
+    """How many of the user's conversations are in cold storage (not searchable)."""
+    try:
+        result = (
+            _get_supabase()
+            .schema("rag")
+            .table("conversations")
+            .select("id", count="exact")
+            .eq("user_id", user_id)
+            .not_.is_("cold_stored_at", "null")
+            .limit(1)
+            .execute()
+        )
+    except Exception as exc:
+        logger.warning("Cold conversation count failed for user %s: %s", user_id, exc)
+        return 0
+    return result.count or 0
+
+
+@router.get("/export")
+async def export_conversations(
+    gzip: bool = Query(default=False, description="Compress the download with gzip"),
+    user: dict = Depends(get_current_user),
+):
+    """Download the current user's complete chat history as NDJSON.
+
+    Streamed in keyset batches straight from the database, so memory stays
+    flat however many messages there are. Archived and cold-stored
+    conversations are included; the last line is {"type": "end", ...}.
+    """
+    body = export_ndjson(_get_supabase(), user["user_id"])
+    filename = f"conversations-{date.today().isoformat()}.ndjson"
+    headers = {"Cache-Control": "no-store"}
+    if gzip:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.gz"'
+        return StreamingResponse(gzip_stream(body), media_type="application/gzip", headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
+
+
+def _parse_if_none_match(header: str | None) -> list[str] | None:
+    """Entity tags from an If-None-Match header, without quotes or W/ prefixes."""
+    if not header:
+        return None
+    tags = [t.strip().removeprefix("W/").strip('"') for t in header.split(",")]
+    return [t for t in tags if t] or None
 
 
 @router.get("/{conversation_id}/messages", response_model=ConversationDetail)
 async def get_conversation_messages(
     conversation_id: str,
+    response: Response,
+    before: str | None = Query(default=None, description="Return messages older than this message id"),
+    limit: int | None = Query(default=None, ge=1, le=200, description="Omit for the whole conversation"),
+    if_none_match: str | None = Header(default=None),
     user: dict = Depends(get_current_user),
 ):
-    """Load full message history for a conversation."""
-    sb = _get_supabase()
+    """Load a conversation's messages, newest page first, oldest-first within the page.
 
-    # Verify the user owns this conversation
-    conv_result = (
-        sb.schema("rag")
-        .table("conversations")
-        .select("id, user_id, title")
-        .eq("id", conversation_id)
-        .execute()
-    )
+    Ownership, the conditional check and the page read are one RPC
+    (two, plus the restore, for a conversation in cold storage). The
+    ETag follows the stored messages — their count and the newest one's
+    created_at — plus the title and page parameters, so it changes as soon
+    as a message is saved and reopening an unchanged conversation costs a 304.
+    Pass next_before as `before` to load the page of older messages.
+    """
+    if before is not None:
+        try:
+            uuid.UUID(before)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="Invalid before") from exc
 
-    if not conv_result.data:
+    sb = _get_supabase()
+    params = {
+        "p_conversation_id": conversation_id,
+        "p_user_id": user["user_id"],
+        "p_before_id": before,
+        "p_limit": limit,
+        "p_if_none_match": _parse_if_none_match(if_none_match),
+    }
+    page = sb.schema("rag").rpc("conversation_messages_page", params).execute().data
+    if page and page.get("cold"):
+        # Idle conversation in cold storage: restore its messages, then read
+        await asyncio.to_thread(rehydrate_conversation, sb, conversation_id)
+        page = sb.schema("rag").rpc("conversation_messages_page", params).execute().data
+
+    if not page:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    conv = conv_result.data[0]
-    if conv["user_id"] != user["user_id"]:
+    if page.get("forbidden"):
         raise HTTPException(status_code=403, detail="Not your conversation")
+    if page.get("bad_cursor"):
+        raise HTTPException(status_code=400, detail="Unknown message in before")
 
-    # Fetch messages ordered chronologically
-    messages_result = (
-        sb.schema("rag")
-        .table("messages")
-        .select("id, role, content, created_at")
-        .eq("conversation_id", conversation_id)
-        .neq("role", "system")
-        .order("created_at")
-        .execute()
-    )
+    headers = {"ETag": f'"{page["etag"]}"', "Cache-Control": "private, no-cache"}
+    if page.get("not_modified"):
+        metrics.increment("conversation_messages_total", result="not_modified")
+        return Response(status_code=304, headers=headers)
+    metrics.increment("conversation_messages_total", result="ok")
+    response.headers.update(headers)
 
     messages = [
         MessageSummary(
@@ -103,14 +305,64 @@ async def get_conversation_messages(
             role=m["role"],
             content=m["content"],
             created_at=m["created_at"],
+            interrupted=m.get("interrupted") or False,
         )
-        for m in (messages_result.data or [])
+        for m in page.get("messages") or []
     ]
+    has_more = bool(page.get("has_more"))
 
     return ConversationDetail(
         conversation_id=conversation_id,
-        title=conv.get("title"),
+        title=page.get("title"),
         messages=messages,
+        has_more=has_more,
+        next_before=messages[0].id if has_more and messages else None,
+    )
+
+
+def _bulk_action(user_id: str, action: str, conversation_ids: list[str]) -> dict:
+    """Ownership check + cascading delete/archive of many conversations in one RPC."""
+    result = _get_supabase().schema("rag").rpc(
+        "bulk_conversation_action",
+        {
+            "p_user_id": user_id,
+            "p_conversation_ids": conversation_ids,
+            "p_action": action,
+        },
+    ).execute()
+    outcome = result.data or {}
+    affected = outcome.get("affected") or []
+    if affected:
+        conversation_list_cache.invalidate(user_id)
+        for conversation_id in affected:
+            turn_cache.discard(conversation_id)
+    metrics.increment("conversation_bulk_total", action=action)
+    metrics.increment("conversation_bulk_affected_total", len(affected), action=action)
+    return outcome
+
+
+@router.post("/bulk", response_model=BulkConversationResponse)
+async def bulk_conversations(
+    req: BulkConversationRequest,
+    user: dict = Depends(get_current_user),
+):
+    """Delete (with all messages) or archive many conversations in one transaction.
+
+    Conversations that belong to someone else are reported in `forbidden`
+    and left untouched; unknown IDs are reported in `not_found`.
+    """
+    ids = list(dict.fromkeys(str(i) for i in req.conversation_ids))
+    try:
+        outcome = _bulk_action(user["user_id"], req.action, ids)
+    except Exception as exc:
+        logger.exception("Bulk %s failed for user %s", req.action, user["user_id"])
+        raise HTTPException(status_code=502, detail=f"Database error: {exc}") from exc
+
+    return BulkConversationResponse(
+        action=req.action,
+        affected=outcome.get("affected") or [],
+        forbidden=outcome.get("forbidden") or [],
+        not_found=outcome.get("not_found") or [],
     )
 
 
@@ -119,29 +371,16 @@ async def delete_conversation(
     conversation_id: str,
     user: dict = Depends(get_current_user),
 ):
-    """Delete a conversation and all its messages."""
-    sb = _get_supabase()
-
-    # Verify ownership
-    conv_result = (
-        sb.schema("rag")
-        .table("conversations")
-        .select("id, user_id")
-        .eq("id", conversation_id)
-        .execute()
-    )
+    """Delete a conversation and all its messages (one RPC; messages cascade)."""
+    try:
+        uuid.UUID(conversation_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail="Conversation not found") from exc
 
-    if not conv_result.data:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    if conv_result.data[0]["user_id"] != user["user_id"]:
+    outcome = _bulk_action(user["user_id"], "delete", [conversation_id])
+    if outcome.get("forbidden"):
         raise HTTPException(status_code=403, detail="Not your conversation")
-
-    # Delete messages first (FK constraint), then conversation
-    sb.schema("rag").table("messages").delete().eq(
-        "conversation_id", conversation_id
-    ).execute()
-    sb.schema("rag").table("conversations").delete().eq(
-        "id", conversation_id
-    ).execute()
+    if not outcome.get("affected"):
+        raise HTTPException(status_code=404, detail="Conversation not found")
 
     return {"deleted": True}
@@ -0,0 +1,284 @@
+# ai-tutor-api/src/api/realtime.py
+# WebSocket transport: one authenticated connection multiplexing chat turns, prefetch and history.
+
+import asyncio
+import logging
+import time
+
+from fastapi import APIRouter, HTTPException, Response, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from ..auth import user_from_claims, verify_token
+from ..serialization import dumps, loads
+from ..config import settings
+from ..models.chat import ChatRequest, PrefetchRequest
+from ..services import metrics
+from ..services.admission import AdmissionRejected
+from .chat import admit_turn, chat_prefetch, chat_turns, numbered_events, resume_turn, start_turn
+from .conversations import get_conversation_messages, list_conversations
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# A client's deliberate close (1001 is a browser leaving the page); a
+# dropped connection arrives as 1006 instead
+CLOSE_NORMAL = 1000
+CLOSE_GOING_AWAY = 1001
+# Application close codes (4000-4999), mirroring the HTTP statuses
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+
+
+class _Session:
+    """One authenticated socket: its user, token expiry and in-flight operations.
+
+    Every frame sent carries the client's operation id, so any number of
+    turns and reads can be interleaved on the connection.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.user: dict | None = None
+        self.expires_at = 0.0
+        self.ops: dict[str, asyncio.Task] = {}
+        self.turns: dict[str, tuple[str, str]] = {}  # op id -> chat_turns key
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, op_id: str | None, event: str, data: str, event_id: str | None = None) -> None:
+        """Send one frame. `data` is already-encoded JSON — the payload SSE sends."""
+        head = f'{{"id":{dumps(op_id)},"event":{dumps(event)},'
+        if event_id is not None:
+            head += f'"event_id":{dumps(event_id)},'
+        async with self._send_lock:
+            await self.websocket.send_text(f'{head}"data":{data}}}')
+
+    async def send_error(self, op_id: str | None, status: int, detail: str, **extra) -> None:
+        await self.send(op_id, "error", dumps({"error": detail, "status": status, **extra}))
+
+    async def authenticate(self, token: str) -> None:
+        """Verify a token and bind the session to its user. Raises HTTPException.
+
+        A later auth frame (a refreshed token) extends the session; it must
+        belong to the same user.
+        """
+        claims = await verify_token(token)
+        user = user_from_claims(claims)
+        if self.user is not None and user["user_id"] != self.user["user_id"]:
+            raise HTTPException(status_code=403, detail="Token belongs to another user")
+        self.user = user
+        self.expires_at = float(claims.get("exp") or "inf")
+
+
+def _request_fields(frame: dict) -> dict:
+    """The frame's "request" object (the HTTP body); ValueError (422) if it isn't one."""
+    request = frame.get("request") or {}
+    if not isinstance(request, dict):
+        raise ValueError("request must be a JSON object")
+    return request
+
+
+async def _chat(session: _Session, op_id: str, frame: dict) -> None:
+    """Start a turn — or resume one after a reconnect — and stream its events under op_id."""
+    user_id = session.user["user_id"]
+    last_event_id = frame.get("last_event_id")
+    if last_event_id is not None and not isinstance(last_event_id, str):
+        raise ValueError("last_event_id must be a string")
+    events = resume_turn(user_id, last_event_id) if last_event_id else None
+    if events is not None:
+        stream_id = last_event_id.rpartition(":")[0]
+    else:
+        req = ChatRequest(**_request_fields(frame))
+        try:
+            slot = await admit_turn(session.user)
+        except AdmissionRejected as exc:
+            await session.send_error(
+                op_id, 429, f"Too many requests ({exc.reason}), retry shortly",
+                retry_after=exc.retry_after,
+            )
+            return
+        stream_id = start_turn(req, session.user, slot)
+        events = numbered_events(stream_id, chat_turns.attach((user_id, stream_id)))
+
+    session.turns[op_id] = (user_id, stream_id)
+    try:
+        async for event in events:
+            await session.send(op_id, event["event"], event["data"], event_id=event["id"])
+    finally:
+        session.turns.pop(op_id, None)
+        await events.aclose()
+
+
+async def _prefetch(session: _Session, op_id: str, frame: dict) -> None:
+    req = PrefetchRequest(**_request_fields(frame))
+    result = await chat_prefetch(req, session.user)
+    await session.send(op_id, "result", result.model_dump_json())
+
+
+async def _conversations(session: _Session, op_id: str, frame: dict) -> None:
+    page = await list_conversations(
+        limit=min(max(int(frame.get("limit") or 20), 1), 50),
+        cursor=frame.get("cursor"),
+        offset=0,
+        archived=bool(frame.get("archived")),
+        user=session.user,
+    )
+    await session.send(op_id, "result", page.model_dump_json())
+
+
+async def _messages(session: _Session, op_id: str, frame: dict) -> None:
+    limit = frame.get("limit")
+    page = await get_conversation_messages(
+        conversation_id=str(frame["conversation_id"]),
+        response=Response(),
+        before=frame.get("before"),
+        limit=min(max(int(limit), 1), 200) if limit is not None else None,
+        if_none_match=frame.get("if_none_match"),
+        user=session.user,
+    )
+    if isinstance(page, Response):  # 304: the client's copy is current
+        await session.send(op_id, "not_modified", dumps({"etag": page.headers["etag"]}))
+        return
+    await session.send(op_id, "result", page.model_dump_json())
+
+
+_OPERATIONS = {
+    "chat": _chat,
+    "prefetch": _prefetch,
+    "conversations": _conversations,
+    "messages": _messages,
+}
+
+
+async def _run(session: _Session, op_type: str, op_id: str, frame: dict) -> None:
+    start = time.monotonic()
+    try:
+        await _OPERATIONS[op_type](session, op_id, frame)
+        metrics.increment("websocket_operations_total", type=op_type, result="ok")
+    except asyncio.CancelledError:
+        metrics.increment("websocket_operations_total", type=op_type, result="cancelled")
+        raise
+    except HTTPException as exc:
+        metrics.increment("websocket_operations_total", type=op_type, result=str(exc.status_code))
+        await session.send_error(op_id, exc.status_code, str(exc.detail))
+    except (ValidationError, KeyError, TypeError, ValueError) as exc:
+        metrics.increment("websocket_operations_total", type=op_type, result="422")
+        await session.send_error(op_id, 422, f"Invalid {op_type} request: {exc}")
+    except Exception as exc:
+        logger.exception("WebSocket %s operation failed", op_type)
+        metrics.increment("websocket_operations_total", type=op_type, result="error")
+        await session.send_error(op_id, 500, str(exc))
+    finally:
+        session.ops.pop(op_id, None)
+        metrics.observe("websocket_operation_ms", (time.monotonic() - start) * 1000, type=op_type)
+
+
+def _cancel(session: _Session, op_id: str) -> bool:
+    """Stop an operation now. A chat turn is cancelled upstream too (partial answer kept)."""
+    key = session.turns.pop(op_id, None)
+    stopped = chat_turns.cancel(key) if key else False
+    task = session.ops.pop(op_id, None)
+    if task is not None:
+        task.cancel()
+        stopped = True
+    return stopped
+
+
+async def _authenticate_first(session: _Session) -> bool:
+    """The first frame must be {"type": "auth", "token": ...}; close the socket otherwise."""
+    websocket = session.websocket
+    try:
+        raw = await asyncio.wait_for(
+            websocket.receive_text(), settings.websocket_auth_timeout_seconds
+        )
+        frame = loads(raw)
+        if not isinstance(frame, dict) or frame.get("type") != "auth":
+            raise HTTPException(status_code=401, detail="First frame must be auth")
+        await session.authenticate(str(frame.get("token", "")))
+    except asyncio.TimeoutError:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason="Authentication timed out")
+        return False
+    except (HTTPException, ValueError) as exc:
+        detail = exc.detail if isinstance(exc, HTTPException) else "Invalid frame"
+        await session.send_error(None, 401, detail)
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason=detail)
+        return False
+    await session.send(None, "ready", dumps({"user_id": session.user["user_id"]}))
+    return True
+
+
+@router.websocket("/ws")
+async def chat_socket(websocket: WebSocket):
+    """Chat over one WebSocket: authenticate once, then multiplex operations.
+
+    Client frames are JSON objects with a "type" and a client-chosen "id":
+    auth {token}, chat {request, last_event_id?}, prefetch {request},
+    conversations {limit?, cursor?, archived?}, messages {conversation_id,
+    before?, limit?, if_none_match?} and cancel. Server frames echo the id
+    with an "event" — for chat turns the same token/sources/done/error
+    events, payloads and resumable event ids as POST /chat/stream.
+    """
+    origin = websocket.headers.get("origin")
+    if not settings.websocket_enabled or (origin and origin not in settings.cors_origin_list):
+        await websocket.close(code=CLOSE_FORBIDDEN)
+        return
+
+    await websocket.accept()
+    session = _Session(websocket)
+    if not await _authenticate_first(session):
+        return
+
+    metrics.increment("websocket_connections_total")
+    try:
+        while True:
+            try:
+                frame = loads(await websocket.receive_text())
+            except ValueError:
+                await session.send_error(None, 400, "Frames must be JSON objects")
+                continue
+            if not isinstance(frame, dict):
+                await session.send_error(None, 400, "Frames must be JSON objects")
+                continue
+
+            op_type, op_id = frame.get("type"), frame.get("id")
+            if op_type == "auth":
+                try:
+                    await session.authenticate(str(frame.get("token", "")))
+                except HTTPException as exc:
+                    await session.send_error(op_id, exc.status_code, str(exc.detail))
+                    if exc.status_code == 403:
+                        await websocket.close(code=CLOSE_FORBIDDEN, reason=str(exc.detail))
+                        return
+                    continue
+                await session.send(op_id, "ready", dumps({"user_id": session.user["user_id"]}))
+                continue
+            if not isinstance(op_id, str) or not op_id:
+                await session.send_error(None, 400, "Every operation needs a string id")
+                continue
+            if op_type == "cancel":
+                stopped = _cancel(session, op_id)
+                await session.send(op_id, "cancelled", dumps({"stopped": stopped}))
+                continue
+            if op_type not in _OPERATIONS:
+                await session.send_error(op_id, 400, f"Unknown operation type {op_type!r}")
+                continue
+            if time.time() >= session.expires_at:
+                await session.send_error(op_id, 401, "Token expired")
+                continue
+            if op_id in session.ops:
+                await session.send_error(op_id, 409, "Operation id already in use")
+                continue
+            if len(session.ops) >= settings.websocket_max_inflight:
+                await session.send_error(op_id, 429, "Too many operations in flight")
+                continue
+            session.ops[op_id] = asyncio.create_task(_run(session, op_type, op_id, frame))
+    except WebSocketDisconnect as exc:
+        if exc.code in (CLOSE_NORMAL, CLOSE_GOING_AWAY):
+            # The client closed the socket on purpose: nobody will resume
+            # its turns, so stop generating (partial answers are kept).
+            for key in list(session.turns.values()):
+                chat_turns.cancel(key)
+    finally:
+        # After a dropped connection turns keep running for the resume grace
+        # period, as after an SSE disconnect; only the forwarding stops.
+        for task in list(session.ops.values()):
+            task.cancel()
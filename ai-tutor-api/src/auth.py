@@ -1,35 +1,206 @@
 # ai-tutor-api/src/auth.py
 
-from fastapi import Header, HTTPException
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
 import jwt
+from fastapi import Header, HTTPException
 
 from .config import settings
+from .services import metrics
 
+logger = logging.getLogger(__name__)
 
-async def get_current_user(authorization: str = Header(...)) -> dict:
-    """Validate Supabase JWT and return user payload.
+# Asymmetric algorithms accepted from the project's JWKS. HS256 is only
+# ever checked against the shared secret, so a public key can't be used
+# as an HMAC secret (algorithm confusion).
+JWKS_ALGORITHMS = frozenset({"RS256", "ES256"})
 
-    Returns dict with at least: user_id (str), role (str).
+# A token signed with an unknown kid triggers at most one JWKS fetch per interval
+_UNKNOWN_KID_REFETCH_SECONDS = 30.0
+
+
+class JwksCache:
+    """The project's signing keys by kid, fetched once and refreshed in the background.
+
+    Keys older than jwks_refresh_seconds are still served while a refresh
+    runs; a failed refresh keeps the previous keys. A token whose kid is
+    unknown (keys just rotated) forces a refresh, rate-limited so forged
+    kids can't turn every request into a JWKS fetch.
     """
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
 
-    token = authorization.removeprefix("Bearer ")
+    def __init__(self):
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        self._attempted_at = float("-inf")
+        self._refresh: asyncio.Task | None = None
+
+    async def get(self, kid: str | None) -> jwt.PyJWK | None:
+        if not kid:
+            return None
+        now = time.monotonic()
+        key = self._keys.get(kid)
+        if key is None:
+            if now - self._attempted_at >= _UNKNOWN_KID_REFETCH_SECONDS:
+                await self.refresh()
+                key = self._keys.get(kid)
+        elif now - self._fetched_at >= settings.jwks_refresh_seconds:
+            self._start_refresh()
+        return key
+
+    async def refresh(self) -> None:
+        """Fetch the key set now, joining a refresh already in flight."""
+        await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> asyncio.Task:
+        task = self._refresh
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self._refresh = asyncio.ensure_future(self._fetch())
+        return task
+
+    async def _fetch(self) -> None:
+        self._attempted_at = time.monotonic()
+        try:
+            document = await _fetch_jwks(jwks_url())
+        except Exception as exc:
+            metrics.increment("jwks_refresh_total", result="error")
+            logger.warning("JWKS fetch failed, keeping %d cached keys: %s", len(self._keys), exc)
+            return
+        keys = {}
+        for entry in document.get("keys", []):
+            try:
+                key = jwt.PyJWK(entry)
+            except (jwt.PyJWKError, jwt.InvalidKeyError):
+                continue  # unsupported key type or algorithm
+            if key.key_id and key.algorithm_name in JWKS_ALGORITHMS:
+                keys[key.key_id] = key
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        metrics.increment("jwks_refresh_total", result="ok")
+
+    def clear(self) -> None:
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._attempted_at = float("-inf")
+        self._refresh = None
+
+
+class VerifiedTokenCache:
+    """LRU of verified tokens (by SHA-256) and their claims, each valid until its exp."""
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._claims: OrderedDict[bytes, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: bytes) -> dict | None:
+        with self._lock:
+            claims = self._claims.get(digest)
+            if claims is None:
+                return None
+            if time.time() >= claims["exp"]:
+                del self._claims[digest]
+                return None
+            self._claims.move_to_end(digest)
+            return claims
+
+    def put(self, digest: bytes, claims: dict) -> None:
+        if not isinstance(claims.get("exp"), (int, float)):
+            return  # never cache a token that doesn't expire
+        with self._lock:
+            self._claims[digest] = claims
+            self._claims.move_to_end(digest)
+            while len(self._claims) > self._max_size:
+                self._claims.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._claims.clear()
+
+
+jwks_cache = JwksCache()
+verified_tokens = VerifiedTokenCache(settings.auth_token_cache_size)
+
+
+def jwks_url() -> str:
+    return settings.supabase_jwks_url or (
+        f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+    )
+
+
+async def _fetch_jwks(url: str) -> dict:
+    async with httpx.AsyncClient(timeout=settings.jwks_fetch_timeout_seconds) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
+
+
+async def _signing_key(token: str) -> tuple[object, str]:
+    """The key and algorithm a token must verify against, from its header."""
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+    if alg == "HS256":
+        return settings.supabase_jwt_secret, alg
+    if alg in JWKS_ALGORITHMS:
+        key = await jwks_cache.get(header.get("kid"))
+        if key is not None and key.algorithm_name == alg:
+            return key.key, alg
+    raise jwt.InvalidTokenError(f"No key for alg={alg!r} kid={header.get('kid')!r}")
+
+
+async def verify_token(token: str) -> dict:
+    """Verify a Supabase access token and return its claims. Raises 401.
+
+    HS256 tokens are checked against the shared secret, RS256/ES256 tokens
+    against the project's JWKS. A token already verified by this process
+    is answered from cache until it expires.
+    """
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = verified_tokens.get(digest)
+    if claims is not None:
+        metrics.increment("auth_token_cache_total", result="hit")
+        return claims
+    metrics.increment("auth_token_cache_total", result="miss")
 
     try:
-        payload = jwt.decode(
-            token,
-            settings.supabase_jwt_secret,
-            algorithms=["HS256"],
-            audience="authenticated",
-        )
+        key, alg = await _signing_key(token)
+        claims = jwt.decode(token, key, algorithms=[alg], audience="authenticated")
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    verified_tokens.put(digest, claims)
+    return claims
+
+
+def user_from_claims(claims: dict) -> dict:
+    """The user dict every endpoint receives, built from verified claims."""
     return {
-        "user_id": payload["sub"],
-        "role": payload.get("role", "authenticated"),
-        "email": payload.get("email"),
+        "user_id": claims["sub"],
+        "role": claims.get("role", "authenticated"),
+        "email": claims.get("email"),
     }
+
+
+async def get_current_user(authorization: str = Header(...)) -> dict:
+    """Validate Supabase JWT and return user payload.
+
+    Returns dict with at least: user_id (str), role (str).
+    """
+    if not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Invalid authorization header")
+
+    token = authorization.removeprefix("Bearer ")
+    return user_from_claims(await verify_token(token))
+
+
+def reset_caches() -> None:
+    """Forget signing keys and verified tokens (tests, or after a secret change)."""
+    jwks_cache.clear()
+    verified_tokens.clear()
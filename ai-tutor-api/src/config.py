@@ -12,19 +12,52 @@ class Settings(BaseSettings):
 
     supabase_url: str
     supabase_service_role_key: str
-    supabase_jwt_secret: str
+    supabase_jwt_secret: str  # HS256 tokens; RS256/ES256 tokens use the JWKS
+    supabase_jwks_url: str = ""  # default <supabase_url>/auth/v1/.well-known/jwks.json
+    jwks_refresh_seconds: int = 600
+    jwks_fetch_timeout_seconds: float = 3.0
+    auth_token_cache_size: int = 10_000  # verified tokens kept until their exp
 
     # Chat LLM (defaults to OpenAI direct — fast, reliable)
     chat_api_key: str = ""
     chat_base_url: str = "https://api.openai.com/v1"
     chat_model: str = "gpt-4o-mini"
 
+    # Model routing — per-turn tier from query length, chunk mix, subject, role.
+    # Tiers missing from chat_model_tiers use chat_model, e.g.
+    # CHAT_MODEL_TIERS='{"fast": "gpt-4o-mini", "capable": "gpt-4o"}'
+    model_routing_enabled: bool = True
+    chat_model_tiers: dict[str, str] = {}
+    route_fast_max_words: int = 8
+    route_capable_min_words: int = 60
+    route_capable_subject_ids: list[str] = []
+
     # Embedding (defaults to OpenAI direct — fast query embedding)
     embedding_api_key: str = ""
     embedding_base_url: str = "https://api.openai.com/v1"
     embedding_model: str = "text-embedding-3-large"
     embedding_dimensions: int = 2000
 
+    # Query embedding micro-batching — concurrent chat queries share one API call
+    embedding_batching_enabled: bool = True
+    embedding_batch_max_wait_ms: float = 5.0
+    embedding_batch_max_size: int = 64
+
+    # Provider failover — ordered OpenAI-compatible endpoints per capability, as JSON
+    # lists of {"name", "base_url", "api_key", "model"?, "models"?, "vector_space"?}.
+    # "models" maps a route tier to the provider's model for it. Empty lists
+    # mean the single chat_*/embedding_* endpoint above. Embedding providers must
+    # serve the pinned vector space (default "<embedding_model>@<embedding_dimensions>").
+    chat_providers: list[dict] = []
+    embedding_providers: list[dict] = []
+    embedding_vector_space: str = ""
+    chat_first_token_timeout_seconds: float = 8.0
+    embedding_query_timeout_seconds: float = 3.0
+    provider_failure_threshold: int = 2
+    provider_cooldown_seconds: float = 5.0
+    provider_max_cooldown_seconds: float = 60.0
+    provider_priority_penalty_ms: float = 250.0
+
     # Chunking
     chunk_size: int = 512
     chunk_overlap: int = 64
@@ -37,6 +70,90 @@ class Settings(BaseSettings):
     retrieval_similarity_threshold: float = 0.2
     max_history_tokens: int = 4000
 
+    # Admission control — per-user token buckets + global stream cap (429 when exceeded)
+    admission_enabled: bool = True
+    rate_limit_parent_per_minute: float = 20.0
+    rate_limit_parent_burst: int = 10
+    rate_limit_child_per_minute: float = 12.0
+    rate_limit_child_burst: int = 6
+    admission_role_cache_ttl_seconds: int = 600
+    max_concurrent_streams: int = 64
+    admission_queue_size: int = 32
+    admission_queue_timeout_seconds: float = 2.0
+
+    # Resumable streams — a dropped client can reconnect with Last-Event-ID
+    stream_resume_grace_seconds: float = 15.0
+    stream_resume_retain_seconds: float = 60.0
+
+    # WebSocket transport — /chat/ws multiplexes turns, prefetch and history pages
+    websocket_enabled: bool = False
+    websocket_auth_timeout_seconds: float = 10.0
+    websocket_max_inflight: int = 8  # concurrent operations per connection
+
+    # Warm-up — POST /chat/prefetch and pooled embedding connections
+    embedding_keepalive_seconds: float = 120.0
+    prefetch_reuse_empty_conversation_minutes: int = 60
+
+    # Request coalescing — identical concurrent requests share upstream work
+    coalesce_requests_enabled: bool = True
+    coalesce_llm_streams: bool = False
+
+    # Circuit breakers and deadlines — fail fast and degrade when a dependency is down
+    circuit_breakers_enabled: bool = True
+    circuit_failure_threshold: int = 5
+    circuit_reset_seconds: float = 30.0
+    # Budget for everything before the first answer token (history, retrieval, LLM connect)
+    chat_deadline_seconds: float = 15.0
+    embedding_stage_timeout_seconds: float = 4.0
+    search_stage_timeout_seconds: float = 4.0
+    history_stage_timeout_seconds: float = 3.0
+
+    # Hedged requests — duplicate slow query embeddings / vector searches (idempotent)
+    hedging_enabled: bool = False
+    hedge_percentile: float = 95.0
+    hedge_min_delay_ms: float = 50.0
+    hedge_max_ratio: float = 0.05
+    hedge_window_size: int = 200
+    hedge_min_samples: int = 20
+
+    # Follow-up reuse — skip vector search when a turn re-asks the previous one
+    followup_reuse_enabled: bool = True
+    followup_reuse_similarity: float = 0.85
+    followup_referential_min_similarity: float = 0.5
+    followup_cache_size: int = 1024
+    followup_cache_ttl_seconds: int = 1800
+
+    # Scope inference — narrow unscoped queries to a likely subject/topic
+    scope_inference_enabled: bool = True
+    scope_inference_topic_threshold: float = 0.55
+    scope_inference_subject_threshold: float = 0.45
+    scope_inference_margin: float = 0.05
+    scope_index_ttl_seconds: int = 3600
+
+    # Topic packs — precomputed retrieval for generic topic-page requests
+    topic_pack_enabled: bool = True
+    topic_pack_size: int = 8
+    topic_pack_cache_ttl_seconds: int = 300
+
+    # Source links — signed Storage URLs sent with the sources SSE event
+    source_url_ttl_seconds: int = 3600
+    source_url_refresh_margin_seconds: int = 300  # re-sign this long before expiry
+    source_url_cache_size: int = 4096
+    source_url_timeout_seconds: float = 1.0  # past this, sources go out without URLs
+
+    # Conversation sidebar — per-user first-page cache (invalidated on change)
+    conversation_list_cache_size: int = 2048
+    conversation_list_cache_ttl_seconds: int = 30
+
+    # Cold storage — scripts/archive_conversations.py packs idle conversations
+    cold_storage_idle_days: int = 90
+    cold_storage_zstd_level: int = 10
+
+    # Conversation export — GET /conversations/export streams NDJSON in keyset batches
+    export_batch_size: int = 500
+    export_gzip_level: int = 6
+    export_cold_chunk_bytes: int = 262144  # cold archives are read in slices of this size
+
     # Metadata extraction (Module 4)
     extraction_model: str = "gpt-4o-mini"
     extraction_temperature: float = 0.0
@@ -1,12 +1,15 @@
 # ai-tutor-api/src/main.py
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import settings
 from .api.chat import router as chat_router
 from .api.conversations import router as conversations_router
 from .api.ingestion import router as ingestion_router
+from .api.realtime import router as realtime_router
+from .serialization import FastJSONResponse
+from .services import metrics
 
 app = FastAPI(
     title="Doorslam AI Tutor API",
@@ -23,6 +26,7 @@ app.add_middleware(
 )
 
 app.include_router(chat_router, prefix="/chat", tags=["chat"])
+app.include_router(realtime_router, prefix="/chat", tags=["chat"])
 app.include_router(conversations_router, prefix="/conversations", tags=["conversations"])
 app.include_router(ingestion_router, prefix="/ingestion", tags=["ingestion"])
 
@@ -30,3 +34,11 @@ app.include_router(ingestion_router, prefix="/ingestion", tags=["ingestion"])
 @app.get("/health")
 async def health():
     return {"status": "ok", "version": "0.1.0"}
+
+
+@app.get("/metrics", response_class=FastJSONResponse)
+async def get_metrics(authorization: str = Header(...)):
+    """In-process counters and timings. Requires the service_role key."""
+    if authorization.replace("Bearer ", "") != settings.supabase_service_role_key:
+        raise HTTPException(status_code=403, detail="Service role key required")
+    return metrics.snapshot()
@@ -1,8 +1,9 @@
 # ai-tutor-api/src/models/chat.py
 
 from typing import Literal
+from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ChatRequest(BaseModel):
@@ -19,6 +20,25 @@ class ChatRequest(BaseModel):
     doc_type: str | None = None
 
 
+class PrefetchRequest(BaseModel):
+    """Warm-up request sent when the tutor panel opens, before the first message."""
+
+    role: Literal["parent", "child"] = "parent"
+    child_id: str | None = None
+    subject_id: str | None = None
+    topic_id: str | None = None
+    conversation_id: str | None = None
+    create_conversation: bool = True
+
+
+class PrefetchResponse(BaseModel):
+    """Response for POST /chat/prefetch."""
+
+    conversation_id: str | None = None
+    warmed: list[str]
+    failed: list[str]
+
+
 class ChatMessage(BaseModel):
     """A single message in a conversation."""
 
@@ -60,6 +80,7 @@ class ConversationListResponse(BaseModel):
 
     conversations: list[ConversationSummary]
     has_more: bool
+    next_cursor: str | None = None
 
 
 class MessageSummary(BaseModel):
@@ -69,6 +90,7 @@ class MessageSummary(BaseModel):
     role: Literal["user", "assistant", "system"]
     content: str
     created_at: str
+    interrupted: bool = False
 
 
 class ConversationDetail(BaseModel):
@@ -77,3 +99,46 @@ class ConversationDetail(BaseModel):
     conversation_id: str
     title: str | None = None
     messages: list[MessageSummary]
+    has_more: bool = False
+    next_before: str | None = None
+
+
+class BulkConversationRequest(BaseModel):
+    """Request body for POST /conversations/bulk."""
+
+    action: Literal["delete", "archive"]
+    conversation_ids: list[UUID] = Field(min_length=1, max_length=500)
+
+
+class BulkConversationResponse(BaseModel):
+    """Outcome of a bulk action, per conversation ID."""
+
+    action: Literal["delete", "archive"]
+    affected: list[str]
+    forbidden: list[str] = []
+    not_found: list[str] = []
+
+
+class MessageSearchHit(BaseModel):
+    """One matching message, with a snippet (matches wrapped in **)."""
+
+    message_id: str
+    conversation_id: str
+    conversation_title: str | None = None
+    role: Literal["user", "assistant"]
+    created_at: str
+    rank: float
+    snippet: str
+
+
+class MessageSearchResponse(BaseModel):
+    """Response for GET /conversations/search.
+
+    cold_conversations counts the user's conversations in cold storage,
+    whose messages the search doesn't cover (first page only, else 0).
+    """
+
+    results: list[MessageSearchHit]
+    has_more: bool
+    next_offset: int | None = None
+    cold_conversations: int = 0
@@ -0,0 +1,46 @@
+# ai-tutor-api/src/serialization.py
+# orjson-backed JSON for payloads we encode ourselves: SSE events, WebSocket frames, NDJSON, cold storage.
+
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+loads = orjson.loads
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON text (UTF-8, not ASCII-escaped)."""
+    return orjson.dumps(obj).decode("utf-8")
+
+
+def dumpb(obj: Any) -> bytes:
+    """Compact JSON as UTF-8 bytes, for bodies and blobs."""
+    return orjson.dumps(obj)
+
+
+# Static parts of the chat events, encoded once. A streamed answer sends
+# hundreds of token events, so only the variable part is serialised per event.
+_TOKEN_PREFIX = '{"content":'
+_SOURCES_PREFIX = '{"sources":'
+
+
+def token_event_data(content: str) -> str:
+    """SSE data for one token event: {"content": ...}."""
+    return _TOKEN_PREFIX + orjson.dumps(content).decode("utf-8") + "}"
+
+
+def sources_event_data(sources: list[dict]) -> str:
+    """SSE data for the sources event: {"sources": [...]}."""
+    return _SOURCES_PREFIX + orjson.dumps(sources).decode("utf-8") + "}"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, for endpoints that return plain dicts.
+
+    Endpoints with a response_model don't need it: FastAPI serialises those
+    straight to bytes with Pydantic's own encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
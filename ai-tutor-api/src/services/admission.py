@@ -0,0 +1,247 @@
+# ai-tutor-api/src/services/admission.py
+# Admission control for chat streams: per-user token buckets and a global concurrency cap.
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+from ..config import settings
+from . import metrics
+
+# Idle buckets are refilled anyway; cap memory by dropping the least recently used
+_MAX_BUCKETS = 10_000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a chat request must be turned away with 429."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Request rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class TokenBucket:
+    """Classic token bucket: `capacity` burst, refilled at `rate` tokens/second."""
+
+    capacity: float
+    rate: float
+    tokens: float
+    updated_at: float
+
+    def take(self, now: float) -> float:
+        """Consume one token. Returns 0 if allowed, else seconds until one is available."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        """Return a token taken by a request that was turned away later on."""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class RateLimiter:
+    """Per-user token buckets whose size and refill rate depend on the role.
+
+    Buckets are keyed by user alone and sized by the role seen when the
+    bucket is created, so a user can't get a fresh bucket by changing role.
+    """
+
+    def __init__(self):
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _limits(role: str) -> tuple[float, float]:
+        if role == "child":
+            return settings.rate_limit_child_burst, settings.rate_limit_child_per_minute / 60
+        return settings.rate_limit_parent_burst, settings.rate_limit_parent_per_minute / 60
+
+    def check(self, user_id: str, role: str) -> None:
+        """Consume one request from the user's bucket or raise AdmissionRejected.
+
+        `role` must come from a verified source (the user's profile), never
+        from the request body.
+        """
+        now = time.monotonic()
+        key = user_id
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                capacity, rate = self._limits(role)
+                bucket = TokenBucket(capacity=capacity, rate=rate, tokens=capacity, updated_at=now)
+                self._buckets[key] = bucket
+                while len(self._buckets) > _MAX_BUCKETS:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(key)
+            wait = bucket.take(now)
+        if wait:
+            metrics.increment("chat_admission_rejected_total", reason="rate_limit", role=role)
+            raise AdmissionRejected("rate_limit", retry_after=max(1, math.ceil(wait)))
+
+    def refund(self, user_id: str) -> None:
+        """Give back the token check() took, e.g. when no stream slot was free."""
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is not None:
+                bucket.refund()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class RoleCache:
+    """Verified roles (from public.profiles) by user id, kept for a TTL.
+
+    Admission runs before any database work, so the profile lookup is only
+    paid once per user per TTL.
+    """
+
+    def __init__(self):
+        self._roles: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> str | None:
+        with self._lock:
+            entry = self._roles.get(user_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > settings.admission_role_cache_ttl_seconds:
+                del self._roles[user_id]
+                return None
+            self._roles.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id: str, role: str) -> None:
+        with self._lock:
+            self._roles[user_id] = (time.monotonic(), role)
+            self._roles.move_to_end(user_id)
+            while len(self._roles) > _MAX_BUCKETS:
+                self._roles.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._roles.clear()
+
+
+class ConcurrencyLimiter:
+    """Global cap on concurrent streams with a short, bounded wait queue.
+
+    A released slot is handed directly to the oldest waiter, so queued
+    requests are served in order and never overtaken by new arrivals.
+    """
+
+    def __init__(self):
+        self._active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("chat_streams_active", self._active)
+        metrics.set_gauge("chat_admission_queue_length", len(self._waiters))
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting briefly if all are busy. Raises AdmissionRejected."""
+        if self._active < settings.max_concurrent_streams and not self._waiters:
+            self._active += 1
+            self._publish()
+            return
+
+        if len(self._waiters) >= settings.admission_queue_size:
+            metrics.increment("chat_admission_rejected_total", reason="queue_full")
+            raise AdmissionRejected("queue_full", retry_after=1)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._publish()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(future, settings.admission_queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                return  # handed a slot at the deadline
+            metrics.increment("chat_admission_rejected_total", reason="queue_timeout")
+            raise AdmissionRejected(
+                "queue_timeout",
+                retry_after=max(1, math.ceil(settings.admission_queue_timeout_seconds)),
+            ) from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+            metrics.observe("chat_admission_wait_ms", (time.monotonic() - start) * 1000)
+            self._publish()
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # slot passes to the waiter; _active unchanged
+                self._publish()
+                return
+        self._active = max(0, self._active - 1)
+        self._publish()
+
+    def clear(self) -> None:
+        self._active = 0
+        self._waiters.clear()
+
+
+class Slot:
+    """A held concurrency slot. release() is idempotent."""
+
+    def __init__(self, limiter: ConcurrencyLimiter):
+        self._limiter = limiter
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter.release()
+
+
+rate_limiter = RateLimiter()
+role_cache = RoleCache()
+concurrency_limiter = ConcurrencyLimiter()
+
+
+async def admit(user_id: str, role: str) -> Slot:
+    """Admit one chat stream: rate limit first (cheap), then a concurrency slot.
+
+    Raises AdmissionRejected with a Retry-After hint when the request
+    should be turned away. A request the concurrency stage rejects gets its
+    rate-limit token back, so a busy server doesn't drain users' buckets.
+    """
+    rate_limiter.check(user_id, role)
+    try:
+        await concurrency_limiter.acquire()
+    except AdmissionRejected:
+        rate_limiter.refund(user_id)
+        raise
+    metrics.increment("chat_admission_admitted_total", role=role)
+    return Slot(concurrency_limiter)
+
+
+def reset() -> None:
+    """Drop all buckets, cached roles and slots (tests)."""
+    rate_limiter.clear()
+    role_cache.clear()
+    concurrency_limiter.clear()
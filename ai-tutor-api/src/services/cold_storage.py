@@ -0,0 +1,209 @@
+# ai-tutor-api/src/services/cold_storage.py
+# Move inactive conversations' messages into zstd-packed cold storage and restore them on open.
+
+import base64
+import codecs
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+import zstandard
+
+from .. import serialization
+from ..config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CODEC = "zstd+json"
+
+# Every rag.messages column except the generated content_tsv
+MESSAGE_COLUMNS = (
+    "id, role, content, sources, token_count, model_name, latency_ms, "
+    "created_at, interrupted, model_tier, routing"
+)
+
+
+def pack_messages(rows: list[dict]) -> tuple[bytes, int]:
+    """Compress message rows. Returns (blob, uncompressed size in bytes)."""
+    raw = serialization.dumpb(rows)
+    blob = zstandard.ZstdCompressor(level=settings.cold_storage_zstd_level).compress(raw)
+    return blob, len(raw)
+
+
+def unpack_messages(blob: bytes) -> list[dict]:
+    return serialization.loads(zstandard.ZstdDecompressor().decompress(blob))
+
+
+class ArchiveReader:
+    """Decode a packed archive incrementally: feed() compressed chunks, get complete rows back.
+
+    Only the undecoded tail of the JSON array is buffered between chunks,
+    so an archive can be exported without holding it whole in memory.
+    """
+
+    def __init__(self):
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._text = ""
+        self._state = "start"  # start -> first -> (value <-> next) -> end
+
+    def feed(self, chunk: bytes) -> list[dict]:
+        self._text += self._utf8.decode(self._decompressor.decompress(chunk))
+        rows: list[dict] = []
+        text, pos = self._text, 0
+        while True:
+            while pos < len(text) and text[pos].isspace():
+                pos += 1
+            if pos == len(text):
+                break
+            char = text[pos]
+            if self._state == "start":
+                if char != "[":
+                    raise ValueError("Cold storage archive is not a JSON array")
+                pos, self._state = pos + 1, "first"
+            elif self._state in ("first", "next") and char == "]":
+                pos, self._state = pos + 1, "end"
+            elif self._state == "next":
+                if char != ",":
+                    raise ValueError("Malformed cold storage archive")
+                pos, self._state = pos + 1, "value"
+            elif self._state in ("first", "value"):
+                try:
+                    row, pos = self._json.raw_decode(text, pos)
+                except json.JSONDecodeError:
+                    break  # the row continues in the next chunk
+                rows.append(row)
+                self._state = "next"
+            else:
+                raise ValueError("Trailing data after cold storage archive")
+        self._text = text[pos:]
+        return rows
+
+    def finish(self) -> None:
+        """Check the archive ended cleanly once its last chunk was fed."""
+        self._utf8.decode(b"", final=True)
+        if self._state != "end" or self._text.strip():
+            raise ValueError("Truncated cold storage archive")
+
+    def close(self) -> None:
+        """Drop the decompressor and any buffered tail. Safe to call more than once."""
+        self._decompressor = None
+        self._text = ""
+
+
+def read_archive_chunk(sb, conversation_id: str, offset: int, length: int) -> tuple[bytes, int] | None:
+    """`length` compressed bytes of a cold archive from `offset`, with the archive's size.
+
+    None if the conversation is not cold.
+    """
+    chunk = sb.schema("rag").rpc(
+        "cold_storage_chunk",
+        {"p_conversation_id": conversation_id, "p_offset": offset, "p_length": length},
+    ).execute().data
+    if not chunk:
+        return None
+    if chunk.get("codec") != CODEC:
+        raise ValueError(f"Unsupported cold storage codec {chunk.get('codec')!r}")
+    return base64.b64decode(chunk["chunk_b64"]), chunk["size"]
+
+
+def idle_conversations(
+    sb, idle_days: int, limit: int, after: tuple[str, str] | None = None
+) -> list[dict]:
+    """Hot conversations with messages whose last activity is older than `idle_days`.
+
+    Oldest first, keyset-paginated on (last_active_at, id): pass the last
+    row of the previous batch as `after`, so conversations that couldn't be
+    frozen are never selected again in the same run.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=idle_days)
+    query = (
+        sb.schema("rag")
+        .table("conversations")
+        .select("id, last_active_at")
+        .is_("cold_stored_at", "null")
+        .gt("message_count", 0)
+        .lt("last_active_at", cutoff.isoformat())
+    )
+    if after is not None:
+        last_active_at, conversation_id = after
+        query = query.or_(
+            f'last_active_at.gt."{last_active_at}",'
+            f'and(last_active_at.eq."{last_active_at}",id.gt.{conversation_id})'
+        )
+    result = query.order("last_active_at").order("id").limit(limit).execute()
+    return result.data or []
+
+
+def freeze_conversation(sb, conversation_id: str, last_active_at: str) -> bool:
+    """Pack one conversation's messages into cold storage.
+
+    Returns False if there was nothing to pack or the conversation changed
+    since it was selected (the RPC re-checks last_active_at and the message
+    set inside its transaction, so a concurrent chat turn never loses a row).
+    """
+    rows = (
+        sb.schema("rag")
+        .table("messages")
+        .select(MESSAGE_COLUMNS)
+        .eq("conversation_id", conversation_id)
+        .order("created_at")
+        .execute()
+    ).data or []
+    if not rows:
+        return False
+
+    blob, raw_bytes = pack_messages(rows)
+    frozen = sb.schema("rag").rpc(
+        "freeze_conversation",
+        {
+            "p_conversation_id": conversation_id,
+            "p_last_active_at": last_active_at,
+            "p_message_ids": [r["id"] for r in rows],
+            "p_payload_b64": base64.b64encode(blob).decode("ascii"),
+            "p_raw_bytes": raw_bytes,
+            "p_codec": CODEC,
+        },
+    ).execute().data
+    if frozen:
+        metrics.increment("cold_storage_frozen_total")
+        metrics.observe("cold_storage_compression_ratio", raw_bytes / max(1, len(blob)))
+        logger.info(
+            "Froze conversation %s: %d messages, %d -> %d bytes",
+            conversation_id, len(rows), raw_bytes, len(blob),
+        )
+    return bool(frozen)
+
+
+def load_cold_messages(sb, conversation_id: str) -> list[dict] | None:
+    """A cold conversation's archived message rows, or None if it is not cold."""
+    archive = sb.schema("rag").rpc(
+        "cold_storage_payload", {"p_conversation_id": conversation_id}
+    ).execute().data
+    if not archive:
+        return None
+    if archive.get("codec") != CODEC:
+        raise ValueError(f"Unsupported cold storage codec {archive.get('codec')!r}")
+    return unpack_messages(base64.b64decode(archive["payload_b64"]))
+
+
+def rehydrate_conversation(sb, conversation_id: str) -> int:
+    """Restore a cold conversation's messages into rag.messages.
+
+    Returns the number of rows restored (0 if the conversation was not cold).
+    Safe to call concurrently: the RPC locks the archive row and ignores
+    rows that are already back.
+    """
+    rows = load_cold_messages(sb, conversation_id)
+    if rows is None:
+        return 0
+
+    restored = sb.schema("rag").rpc(
+        "thaw_conversation",
+        {"p_conversation_id": conversation_id, "p_messages": rows},
+    ).execute().data or 0
+    metrics.increment("cold_storage_rehydrated_total")
+    logger.info("Rehydrated conversation %s: %d messages", conversation_id, restored)
+    return restored
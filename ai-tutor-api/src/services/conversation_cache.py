@@ -0,0 +1,74 @@
+# ai-tutor-api/src/services/conversation_cache.py
+# Per-user cache of the first page of the conversation sidebar.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from ..config import settings
+
+
+class ConversationListCache:
+    """Small per-process LRU of each user's first conversation page (per page size).
+
+    Entries are dropped whenever one of the user's conversations changes
+    (message saved, title set, deleted). The TTL is a backstop for changes
+    made by other worker processes and is tracked per page size, so adding a
+    size doesn't extend the life of the others. A page read before an invalidation is
+    never stored after it: callers take a ticket with begin() before
+    querying and pass it to put().
+    """
+
+    def __init__(self, max_users: int = 2048, ttl_seconds: float = 30):
+        self._max_users = max_users
+        self._ttl = ttl_seconds
+        self._pages: OrderedDict[str, dict[int, tuple[float, Any]]] = OrderedDict()
+        self._invalidated: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, limit: int) -> Any | None:
+        with self._lock:
+            pages = self._pages.get(user_id)
+            if pages is None or limit not in pages:
+                return None
+            stored_at, page = pages[limit]
+            if time.monotonic() - stored_at > self._ttl:
+                del pages[limit]
+                if not pages:
+                    del self._pages[user_id]
+                return None
+            self._pages.move_to_end(user_id)
+            return page
+
+    def begin(self) -> float:
+        """Ticket for a page about to be read from the database."""
+        return time.monotonic()
+
+    def put(self, user_id: str, limit: int, page: Any, ticket: float) -> None:
+        with self._lock:
+            if self._invalidated.get(user_id, 0.0) >= ticket:
+                return  # changed while the page was being read
+            self._pages.setdefault(user_id, {})[limit] = (time.monotonic(), page)
+            self._pages.move_to_end(user_id)
+            while len(self._pages) > self._max_users:
+                self._pages.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._pages.pop(user_id, None)
+            self._invalidated[user_id] = time.monotonic()
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > self._max_users:
+                self._invalidated.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self._invalidated.clear()
+
+
+conversation_list_cache = ConversationListCache(
+    max_users=settings.conversation_list_cache_size,
+    ttl_seconds=settings.conversation_list_cache_ttl_seconds,
+)
@@ -0,0 +1,235 @@
+# ai-tutor-api/src/services/conversation_export.py
+# Stream a user's complete chat history as NDJSON, one keyset batch at a time.
+
+import asyncio
+import logging
+import zlib
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+
+from .. import serialization
+from ..config import settings
+from . import metrics
+from .cold_storage import ArchiveReader, read_archive_chunk
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_FIELDS = ("id", "role", "content", "sources", "created_at", "interrupted", "model_name")
+
+
+def _line(record: dict) -> bytes:
+    return serialization.dumpb(record) + b"\n"
+
+
+def _rpc(sb, name: str, params: dict) -> list[dict]:
+    return sb.schema("rag").rpc(name, params).execute().data or []
+
+
+async def _conversation_batches(sb, user_id: str, batch_size: int) -> AsyncIterator[list[dict]]:
+    after_id = None
+    while True:
+        rows = await asyncio.to_thread(_rpc, sb, "export_conversations", {
+            "p_user_id": user_id,
+            "p_limit": batch_size,
+            "p_after_id": after_id,
+        })
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1]["id"]
+
+
+class _MessageCursor:
+    """Every hot message of a user in (conversation_id, created_at, id) order.
+
+    One keyset query walks all of the user's conversations, so the export
+    makes one request per batch of messages rather than one per
+    conversation. Conversations are exported in the same id order and take
+    their rows off the front; rows of conversations that are not exported
+    (created mid-export) are skipped.
+    """
+
+    def __init__(self, sb, user_id: str, batch_size: int):
+        self._sb = sb
+        self._user_id = user_id
+        self._batch_size = batch_size
+        self._rows: list[dict] = []
+        self._pos = 0
+        self._after: tuple[str, str, str] | None = None
+        self._exhausted = False
+
+    async def _fill(self) -> bool:
+        if self._pos < len(self._rows):
+            return True
+        if self._exhausted:
+            return False
+        after_conversation_id, after_created_at, after_id = self._after or (None, None, None)
+        rows = await asyncio.to_thread(_rpc, self._sb, "export_user_messages", {
+            "p_user_id": self._user_id,
+            "p_limit": self._batch_size,
+            "p_after_conversation_id": after_conversation_id,
+            "p_after_created_at": after_created_at,
+            "p_after_id": after_id,
+        })
+        self._exhausted = len(rows) < self._batch_size
+        self._rows, self._pos = rows, 0
+        if rows:
+            last = rows[-1]
+            self._after = (last["conversation_id"], last["created_at"], last["id"])
+        return bool(rows)
+
+    async def batches(self, conversation_id: str) -> AsyncIterator[list[dict]]:
+        # Lowercase UUID strings sort like Postgres compares uuids
+        while await self._fill():
+            rows, start = self._rows, self._pos
+            while start < len(rows) and rows[start]["conversation_id"] < conversation_id:
+                start += 1
+            end = start
+            while end < len(rows) and rows[end]["conversation_id"] == conversation_id:
+                end += 1
+            self._pos = end
+            if end > start:
+                yield rows[start:end]
+            if end < len(rows):
+                return  # reached a later conversation
+
+
+async def _hot_message_batches(
+    sb, user_id: str, conversation_id: str, batch_size: int
+) -> AsyncIterator[list[dict]]:
+    after_created_at = after_id = None
+    while True:
+        rows = await asyncio.to_thread(_rpc, sb, "export_messages", {
+            "p_user_id": user_id,
+            "p_conversation_id": conversation_id,
+            "p_limit": batch_size,
+            "p_after_created_at": after_created_at,
+            "p_after_id": after_id,
+        })
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        after_created_at, after_id = rows[-1]["created_at"], rows[-1]["id"]
+
+
+async def _cold_message_batches(sb, conversation_id: str, batch_size: int) -> AsyncIterator[list[dict]]:
+    """A cold conversation's archived rows, read and decoded a slice at a time.
+
+    Yields nothing if the conversation is not cold.
+    """
+    reader = ArchiveReader()
+    offset, chunk_bytes = 0, settings.export_cold_chunk_bytes
+    try:
+        while True:
+            chunk = await asyncio.to_thread(read_archive_chunk, sb, conversation_id, offset, chunk_bytes)
+            if chunk is None:
+                if offset:
+                    raise RuntimeError(f"Cold archive of {conversation_id} vanished mid-export")
+                return
+            data, size = chunk
+            rows = reader.feed(data)
+            for i in range(0, len(rows), batch_size):
+                yield rows[i : i + batch_size]
+            offset += len(data)
+            if not data or offset >= size:
+                break
+        reader.finish()
+    finally:
+        reader.close()
+
+
+async def _message_batches(
+    sb, user_id: str, conversation: dict, cursor: _MessageCursor, batch_size: int
+) -> AsyncIterator[list[dict]]:
+    """A conversation's messages, taken from the shared cursor or its cold archive.
+
+    Cold conversations are exported from their archive without being
+    restored. A conversation frozen (or thawed) after its row was read is
+    found on the other side, so it is never exported empty; only that
+    race costs an extra per-conversation query.
+    """
+    conversation_id = conversation["id"]
+    if not conversation.get("cold_stored_at"):
+        found = False
+        async for rows in cursor.batches(conversation_id):
+            found = True
+            yield rows
+        if found:
+            return
+
+    found = False
+    async with aclosing(_cold_message_batches(sb, conversation_id, batch_size)) as batches:
+        async for rows in batches:
+            found = True
+            yield rows
+    if not found and conversation.get("cold_stored_at"):
+        async for rows in _hot_message_batches(sb, user_id, conversation_id, batch_size):
+            yield rows
+
+
+async def export_ndjson(sb, user_id: str, batch_size: int | None = None) -> AsyncIterator[bytes]:
+    """All of a user's conversations and messages as NDJSON, in conversation-id order.
+
+    Emits a {"type": "conversation"} line before each conversation's
+    {"type": "message"} lines, and a final {"type": "end"} line with the
+    totals — its absence tells the reader the export was cut short. At most
+    one batch of rows (and one slice of a cold archive) is held in memory,
+    whatever the history size.
+    """
+    batch_size = batch_size or settings.export_batch_size
+    conversations = messages = 0
+    cursor = _MessageCursor(sb, user_id, batch_size)
+    try:
+        async for batch in _conversation_batches(sb, user_id, batch_size):
+            for conv in batch:
+                conversations += 1
+                yield _line({
+                    "type": "conversation",
+                    "id": conv["id"],
+                    "title": conv.get("title"),
+                    "subject_id": conv.get("subject_id"),
+                    "created_at": conv.get("created_at"),
+                    "last_active_at": conv.get("last_active_at"),
+                    "message_count": conv.get("message_count"),
+                    "archived": conv.get("archived_at") is not None,
+                })
+                # Closed promptly if the client goes away, releasing any archive reader
+                async with aclosing(
+                    _message_batches(sb, user_id, conv, cursor, batch_size)
+                ) as batches:
+                    async for rows in batches:
+                        messages += len(rows)
+                        yield b"".join(
+                            _line({
+                                "type": "message",
+                                "conversation_id": conv["id"],
+                                **{field: row.get(field) for field in MESSAGE_FIELDS},
+                            })
+                            for row in rows
+                        )
+    except Exception:
+        # Headers are long gone; all we can do is say so in-band
+        logger.exception("Conversation export failed for user %s", user_id)
+        metrics.increment("conversation_export_total", result="error")
+        yield _line({"type": "error", "detail": "Export interrupted"})
+        return
+
+    metrics.increment("conversation_export_total", result="ok")
+    metrics.observe("conversation_export_messages", messages)
+    yield _line({"type": "end", "conversations": conversations, "messages": messages})
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int | None = None) -> AsyncIterator[bytes]:
+    """Gzip an async byte stream incrementally (constant memory)."""
+    compressor = zlib.compressobj(
+        settings.export_gzip_level if level is None else level,
+        zlib.DEFLATED,
+        16 + zlib.MAX_WBITS,  # gzip container
+    )
+    async for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
@@ -1,39 +1,119 @@
 # ai-tutor-api/src/services/embedder.py
-# Batch embedding via OpenAI (text-embedding-3-large, 2000 dims).
+# Batch embedding via OpenAI-compatible providers (text-embedding-3-large, 2000 dims).
 
+import asyncio
 import logging
+import time
 
-from openai import AsyncOpenAI
-from tenacity import retry, stop_after_attempt, wait_exponential
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 from ..config import settings
+from . import metrics
+from .providers import ProviderConfig, get_pool, is_provider_fault
 
 logger = logging.getLogger(__name__)
 
 BATCH_SIZE = 100
 
+_clients: dict[str, AsyncOpenAI] = {}
 
-def _get_client() -> AsyncOpenAI:
-    """Create an async OpenAI client for embeddings."""
-    return AsyncOpenAI(
-        api_key=settings.embedding_api_key,
-        base_url=settings.embedding_base_url,
+
+def _get_client(provider: ProviderConfig | None = None) -> AsyncOpenAI:
+    """Shared async OpenAI client per embedding provider (default: the first candidate).
+
+    One client per provider per process so its HTTP connection pool (and
+    TLS sessions) is reused across queries; idle connections are kept for
+    embedding_keepalive_seconds so a warm-up survives until the first message.
+    """
+    if provider is None:
+        provider = get_pool("embedding").candidates()[0]
+    client = _clients.get(provider.name)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=provider.api_key,
+            base_url=provider.base_url,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=settings.embedding_keepalive_seconds,
+                ),
+            ),
+        )
+        _clients[provider.name] = client
+    return client
+
+
+async def warm_embedding_client() -> None:
+    """Open a pooled connection to the embedding API without spending tokens.
+
+    Retrieves the model record — any response (even an error from a
+    gateway that doesn't implement it) leaves a keep-alive connection behind.
+    """
+    client = _get_client()
+    try:
+        await client.models.retrieve(settings.embedding_model)
+    except Exception as exc:
+        logger.debug("Embedding warm-up request failed (connection still opened): %s", exc)
+
+
+async def _embed_batch(
+    client: AsyncOpenAI, texts: list[str], model: str | None = None
+) -> list[list[float]]:
+    """Embed a single batch of texts with one provider (one attempt)."""
+    response = await client.embeddings.create(
+        model=model or settings.embedding_model,
+        input=texts,
+        dimensions=settings.embedding_dimensions,
     )
+    return [item.embedding for item in response.data]
+
+
+async def _embed_with_failover(
+    texts: list[str], timeout: float | None = None
+) -> list[list[float]]:
+    """Embed via the best available provider, failing over on error or timeout.
+
+    Only providers pinned to the stored vector space are candidates (see
+    providers.embedding_vector_space), so a failover never mixes spaces.
+    Each provider gets one attempt: failing over is the query path's retry,
+    so a down provider costs one failure, not a backoff inside the deadline.
+    """
+    pool = get_pool("embedding")
+    last_exc: Exception | None = None
+    for attempt, provider in enumerate(pool.candidates()):
+        if attempt:
+            metrics.increment("provider_failover_total", capability="embedding")
+        start = time.monotonic()
+        try:
+            call = _embed_batch(_get_client(provider), texts, provider.model)
+            embeddings = await (asyncio.wait_for(call, timeout) if timeout else call)
+        except asyncio.TimeoutError as exc:
+            pool.record_failure(provider, "timeout")
+            last_exc = exc
+            continue
+        except Exception as exc:
+            if not is_provider_fault(exc):
+                raise
+            pool.record_failure(provider, "error")
+            last_exc = exc
+            continue
+        pool.record_success(provider, (time.monotonic() - start) * 1000)
+        return embeddings
+    raise last_exc or RuntimeError("No embedding providers configured")
 
 
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=1, max=10),
+    retry=retry_if_exception(is_provider_fault),
     reraise=True,
 )
-async def _embed_batch(client: AsyncOpenAI, texts: list[str]) -> list[list[float]]:
-    """Embed a single batch of texts with retry logic."""
-    response = await client.embeddings.create(
-        model=settings.embedding_model,
-        input=texts,
-        dimensions=settings.embedding_dimensions,
-    )
-    return [item.embedding for item in response.data]
+async def _embed_chunk_batch(texts: list[str]) -> list[list[float]]:
+    """One ingestion batch: the failover round is retried with backoff (no deadline here)."""
+    return await _embed_with_failover(texts)
 
 
 async def embed_chunks(texts: list[str]) -> list[list[float]]:
@@ -45,19 +125,82 @@ async def embed_chunks(texts: list[str]) -> list[list[float]]:
     if not texts:
         return []
 
-    client = _get_client()
     all_embeddings: list[list[float]] = []
 
     for i in range(0, len(texts), BATCH_SIZE):
         batch = texts[i : i + BATCH_SIZE]
         logger.info("Embedding batch %d-%d of %d texts", i, i + len(batch), len(texts))
-        embeddings = await _embed_batch(client, batch)
+        embeddings = await _embed_chunk_batch(batch)
         all_embeddings.extend(embeddings)
 
     return all_embeddings
 
 
+class QueryBatcher:
+    """Collect query embeddings that arrive within a few ms into one API call.
+
+    The first query in a window starts a max_wait timer; the batch is sent
+    when the timer fires or max_size queries are waiting, whichever comes
+    first. Identical texts in a batch are embedded once. Each caller awaits
+    its own future, so a cancelled caller never affects the others.
+    """
+
+    def __init__(self, max_wait_seconds: float, max_size: int):
+        self.max_wait_seconds = max_wait_seconds
+        self.max_size = max_size
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def embed(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._send(batch))
+
+    async def _send(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        metrics.observe("embedding_query_batch_size", len(batch))
+        try:
+            embeddings = await _embed_with_failover(
+                texts, timeout=settings.embedding_query_timeout_seconds
+            )
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        by_text = dict(zip(texts, embeddings))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+
+_query_batcher = QueryBatcher(
+    max_wait_seconds=settings.embedding_batch_max_wait_ms / 1000,
+    max_size=min(settings.embedding_batch_max_size, 2048),
+)
+
+
 async def embed_query(text: str) -> list[float]:
-    """Embed a single query string. Convenience wrapper for retrieval."""
+    """Embed a single query string. Convenience wrapper for retrieval.
+
+    Concurrent queries are micro-batched into one embeddings request
+    (see QueryBatcher) unless EMBEDDING_BATCHING_ENABLED is off.
+    """
+    if settings.embedding_batching_enabled:
+        return await _query_batcher.embed(text)
     results = await embed_chunks([text])
     return results[0]
@@ -0,0 +1,188 @@
+# ai-tutor-api/src/services/exam_questions.py
+# Expand per-question key_points from papers/mark schemes into rag.exam_questions.
+
+import logging
+import re
+
+from supabase import create_client
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Only these doc types produce per-question key_points (see document_enricher)
+QUESTION_DOC_TYPES = frozenset({"qp", "ms", "sp"})
+
+# A question rarely spans more than a few chunks; caps the last question's range
+_MAX_CHUNKS_PER_QUESTION = 3
+
+_REF_SHAPE = re.compile(r"^(\d{1,2})((?:\.\d{1,2})?)([a-h]?)((?:i{1,3}|iv|vi{0,3}|ix|x)?)$")
+_KNOWN_FIELDS = {"question", "topic", "marks", "command_word", "key_criteria"}
+
+
+def _get_supabase():
+    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+
+
+def normalise_question_ref(label: str) -> str | None:
+    """Normalise a question label to a compact lookup key.
+
+    "Q3b" → "3b", "Question 3(b)(ii)" → "3bii", "03.2" → "3.2".
+    Returns None when the label is not recognisable as a question number.
+    """
+    text = label.strip().lower()
+    text = re.sub(r"^(question|qu|q)\.?", "", text)
+    text = re.sub(r"[\s()\[\]]", "", text)
+    text = text.rstrip(".:")
+    match = _REF_SHAPE.match(text.lstrip("0"))
+    if not match:
+        return None
+    number, dotted, part, roman = match.groups()
+    if dotted:
+        dotted = "." + (dotted[1:].lstrip("0") or "0")
+    return f"{number}{dotted}{part}{roman}"
+
+
+def _ref_pattern(ref: str) -> re.Pattern:
+    """Regex that finds a question label in paper text, e.g. "3 (b)" or "03.2"."""
+    number, dotted, part, roman = _REF_SHAPE.match(ref).groups()
+    pattern = rf"(?<![\d.])0?{number}"
+    if dotted:
+        pattern += rf"\s*\.\s*0?{dotted[1:]}"
+    if part:
+        pattern += rf"\s*\(?\s*{part}\s*\)?"
+    if roman:
+        pattern += rf"\s*\(?\s*{roman}\s*\)?"
+    return re.compile(pattern + r"(?![a-z\d])", re.IGNORECASE)
+
+
+def locate_question_chunks(
+    refs: list[str],
+    chunks: list[tuple[int, str]],
+) -> dict[str, tuple[int, int]]:
+    """Map each question ref to an inclusive (chunk_start, chunk_end) range.
+
+    Questions appear in order, so each search starts at the previous
+    question's chunk. A question ends just before the next located one
+    starts, capped at _MAX_CHUNKS_PER_QUESTION chunks.
+    """
+    starts: list[tuple[str, int]] = []
+    cursor = 0
+    for ref in refs:
+        pattern = _ref_pattern(ref)
+        for pos in range(cursor, len(chunks)):
+            if pattern.search(chunks[pos][1]):
+                starts.append((ref, pos))
+                cursor = pos
+                break
+
+    ranges: dict[str, tuple[int, int]] = {}
+    for i, (ref, pos) in enumerate(starts):
+        next_pos = starts[i + 1][1] if i + 1 < len(starts) else len(chunks)
+        end_pos = min(max(pos, next_pos - 1), pos + _MAX_CHUNKS_PER_QUESTION - 1, len(chunks) - 1)
+        ranges[ref] = (chunks[pos][0], chunks[end_pos][0])
+    return ranges
+
+
+def _as_int(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_exam_question_rows(
+    document_id: str,
+    key_points: list[dict],
+    chunks: list[tuple[int, str]],
+    subject_id: str | None,
+    doc_type: str | None,
+    year: int | None,
+    session: str | None,
+    paper_number: str | None,
+) -> list[dict]:
+    """Turn enrichment key_points into rag.exam_questions rows.
+
+    Args:
+        key_points: Per-question dicts from document_enricher ("question",
+            "topic", "marks", "command_word" / "key_criteria", ...).
+        chunks: (chunk_index, content) pairs for the document, in order.
+
+    Returns:
+        Row dicts ready to insert. Empty for non-question doc types.
+    """
+    if doc_type not in QUESTION_DOC_TYPES:
+        return []
+
+    parsed: list[tuple[str, dict]] = []
+    seen: set[str] = set()
+    for kp in key_points:
+        if not isinstance(kp, dict) or not kp.get("question"):
+            continue
+        ref = normalise_question_ref(str(kp["question"]))
+        if ref is None or ref in seen:
+            continue
+        seen.add(ref)
+        parsed.append((ref, kp))
+
+    ranges = locate_question_chunks([ref for ref, _ in parsed], chunks)
+
+    rows = []
+    for ref, kp in parsed:
+        chunk_start, chunk_end = ranges.get(ref, (None, None))
+        rows.append({
+            "document_id": document_id,
+            "subject_id": subject_id,
+            "doc_type": doc_type,
+            "year": year,
+            "session": session,
+            "paper_number": paper_number,
+            "question_ref": ref,
+            "question_label": str(kp["question"]),
+            "topic": kp.get("topic"),
+            "marks": _as_int(kp.get("marks")),
+            "command_word": kp.get("command_word"),
+            "key_criteria": kp.get("key_criteria"),
+            "chunk_start": chunk_start,
+            "chunk_end": chunk_end,
+            "details": {k: v for k, v in kp.items() if k not in _KNOWN_FIELDS},
+        })
+    return rows
+
+
+def store_exam_questions(document_id: str, rows: list[dict]) -> int:
+    """Replace a document's rag.exam_questions rows. Returns the number stored."""
+    sb = _get_supabase()
+    sb.schema("rag").table("exam_questions").delete().eq("document_id", document_id).execute()
+    if rows:
+        sb.schema("rag").table("exam_questions").insert(rows).execute()
+    located = sum(1 for r in rows if r["chunk_start"] is not None)
+    logger.info(
+        "Indexed %d exam questions for %s (%d linked to chunks)",
+        len(rows), document_id, located,
+    )
+    return len(rows)
+
+
+def index_exam_questions(
+    document_id: str,
+    key_points: list[dict],
+    chunks: list[tuple[int, str]],
+    subject_id: str | None,
+    doc_type: str | None,
+    year: int | None,
+    session: str | None,
+    paper_number: str | None,
+) -> int:
+    """Build and store exam question rows. Non-fatal: logs and returns 0 on error."""
+    if doc_type not in QUESTION_DOC_TYPES:
+        return 0
+    try:
+        rows = build_exam_question_rows(
+            document_id, key_points, chunks,
+            subject_id, doc_type, year, session, paper_number,
+        )
+        return store_exam_questions(document_id, rows)
+    except Exception as exc:
+        logger.warning("Exam question indexing failed for %s: %s", document_id, exc)
+        return 0
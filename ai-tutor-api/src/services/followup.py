@@ -0,0 +1,224 @@
+# ai-tutor-api/src/services/followup.py
+# Follow-up turn detection — reuse the previous turn's chunks instead of re-searching.
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..config import settings
+from .retrieval import RetrievedChunk
+
+# Short messages that lean on the previous answer ("explain that more simply",
+# "can you give an example of it?") rarely embed close to the original
+# question, so they are matched on wording as well as on vector similarity.
+# Only real anaphora counts: a pronoun as the object of a follow-up verb, an
+# example not tied to a new term, or a request to restate — a bare "why" or
+# "it" ("why is the sky blue?") is a new question.
+_ANAPHOR = r"(?:that|this|it|those|these)"
+_REFERENTIAL = re.compile(
+    r"\b(?:explain|rephrase|simplify|clarify|repeat|summari[sz]e|say|go over|"
+    rf"break down|expand on|elaborate on)\s+{_ANAPHOR}\b"
+    rf"|\b(?:an?|another)\s+example\b(?!\s+of\s+(?!{_ANAPHOR}\b))"
+    rf"|\bwhy\s+(?:is|does|did|was|would)\s+{_ANAPHOR}\s*[?.!]*$"
+    r"|\b(?:what do you mean|in simpler terms|more simply|more detail|elaborate)\b",
+    re.IGNORECASE,
+)
+_MAX_REFERENTIAL_WORDS = 12
+
+
+@dataclass
+class LastTurn:
+    """Retrieval state kept from the previous turn of a conversation.
+
+    A turn rebuilt from persisted sources has no query embedding or scope;
+    its chunks are scored against the new query instead.
+    """
+
+    message_id: str
+    query_embedding: list[float] | None
+    chunks: list[RetrievedChunk]
+    scope: tuple | None
+    stored_at: float
+
+
+@dataclass
+class ReuseDecision:
+    """Outcome of comparing a new query against the previous turn."""
+
+    reuse: bool
+    reason: str  # "similar", "referential", "dissimilar", "scope_changed", "stale", "miss"
+    similarity: float | None = None
+
+
+class TurnCache:
+    """Small per-process LRU of the last retrieval per conversation."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 1800):
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._entries: OrderedDict[str, LastTurn] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> LastTurn | None:
+        with self._lock:
+            turn = self._entries.get(conversation_id)
+            if turn is None:
+                return None
+            if time.monotonic() - turn.stored_at > self._ttl:
+                del self._entries[conversation_id]
+                return None
+            self._entries.move_to_end(conversation_id)
+            return turn
+
+    def put(
+        self,
+        conversation_id: str,
+        message_id: str,
+        query_embedding: list[float],
+        chunks: list[RetrievedChunk],
+        scope: tuple,
+    ) -> None:
+        with self._lock:
+            self._entries[conversation_id] = LastTurn(
+                message_id=message_id,
+                query_embedding=query_embedding,
+                chunks=chunks,
+                scope=scope,
+                stored_at=time.monotonic(),
+            )
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, conversation_id: str) -> None:
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+turn_cache = TurnCache(
+    max_size=settings.followup_cache_size,
+    ttl_seconds=settings.followup_cache_ttl_seconds,
+)
+
+
+def cosine_similarity(a: list[float], b: list[float]) -> float:
+    """Cosine similarity of two equal-length vectors."""
+    va = np.asarray(a, dtype=np.float32)
+    vb = np.asarray(b, dtype=np.float32)
+    norm = float(np.linalg.norm(va) * np.linalg.norm(vb))
+    if not norm:
+        return 0.0
+    return float(np.dot(va, vb)) / norm
+
+
+def is_referential_followup(message: str) -> bool:
+    """True for short messages that refer back to the previous answer."""
+    words = message.split()
+    return 0 < len(words) <= _MAX_REFERENTIAL_WORDS and bool(_REFERENTIAL.search(message))
+
+
+def last_assistant_message(history: list[dict]) -> dict | None:
+    """Return the most recent assistant message from loaded history, if any."""
+    for msg in reversed(history):
+        if msg.get("role") == "assistant":
+            return msg
+    return None
+
+
+def turn_from_sources(last_message: dict, chunks: list[RetrievedChunk]) -> LastTurn:
+    """Rebuild the previous turn from an assistant message and its re-fetched sources.
+
+    ``chunks`` come from fetch_chunks(), scored against the new query.
+    """
+    return LastTurn(
+        message_id=last_message.get("id"),
+        query_embedding=None,
+        chunks=chunks,
+        scope=None,
+        stored_at=time.monotonic(),
+    )
+
+
+def _in_scope(chunk: RetrievedChunk, scope: tuple) -> bool:
+    """True when the chunk satisfies every filter set in the request scope."""
+    subject_id, topic_id, source_type, year, doc_type = scope
+    return all(
+        want is None or want == have
+        for want, have in (
+            (subject_id, chunk.subject_id),
+            (topic_id, chunk.topic_id),
+            (source_type, chunk.source_type),
+            (year, chunk.year),
+            (doc_type, chunk.doc_type),
+        )
+    )
+
+
+def _relative_similarity(previous: LastTurn, sources: list[dict]) -> float:
+    """How close the new query is to the previous chunks, relative to the old query.
+
+    Mean similarity of the new query to the chunks over the mean the previous
+    query scored when it retrieved them, capped at 1 — so the reuse thresholds
+    keep their meaning without the previous query embedding.
+    """
+    retrieved = np.mean([s.get("similarity") or 0.0 for s in sources])
+    if not previous.chunks or retrieved <= 0:
+        return 0.0
+    current = np.mean([c.similarity for c in previous.chunks])
+    return float(min(1.0, current / retrieved))
+
+
+def decide_reuse(
+    previous: LastTurn | None,
+    history: list[dict],
+    query_embedding: list[float],
+    message: str,
+    scope: tuple,
+) -> ReuseDecision:
+    """Decide whether the previous turn's chunks can answer this query.
+
+    The cached turn is only trusted when it belongs to the latest assistant
+    message in ``rag.messages`` and its persisted ``sources`` list the same
+    chunk IDs — so an edit or a turn served by another worker forces a search.
+    A turn rebuilt from those sources is checked against the request filters
+    chunk by chunk and scored with _relative_similarity(). A referential follow-up still needs a loose similarity to the previous
+    query, so a short new question that happens to match the wording searches.
+    """
+    if previous is None:
+        return ReuseDecision(reuse=False, reason="miss")
+
+    last = last_assistant_message(history)
+    if last is None or last.get("id") != previous.message_id:
+        return ReuseDecision(reuse=False, reason="stale")
+
+    sources = last.get("sources") or []
+    persisted_ids = [s.get("chunk_id") for s in sources]
+    if persisted_ids and persisted_ids != [c.id for c in previous.chunks]:
+        return ReuseDecision(reuse=False, reason="stale")
+
+    if previous.scope is None:
+        if not all(_in_scope(c, scope) for c in previous.chunks):
+            return ReuseDecision(reuse=False, reason="scope_changed")
+        similarity = _relative_similarity(previous, sources)
+    elif scope != previous.scope:
+        return ReuseDecision(reuse=False, reason="scope_changed")
+    else:
+        similarity = cosine_similarity(query_embedding, previous.query_embedding)
+
+    if similarity >= settings.followup_reuse_similarity:
+        return ReuseDecision(reuse=True, reason="similar", similarity=similarity)
+    if (
+        previous.chunks
+        and similarity >= settings.followup_referential_min_similarity
+        and is_referential_followup(message)
+    ):
+        return ReuseDecision(reuse=True, reason="referential", similarity=similarity)
+    return ReuseDecision(reuse=False, reason="dissimilar", similarity=similarity)
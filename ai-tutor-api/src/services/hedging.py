@@ -0,0 +1,95 @@
+# ai-tutor-api/src/services/hedging.py
+# Hedged requests: duplicate a slow idempotent call and take whichever copy finishes first.
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from ..config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Unspent hedge budget is capped so a quiet spell can't bank a burst of hedges
+_MAX_BUDGET = 10.0
+
+
+class Hedger:
+    """Issue a second copy of a call that outlives the recent latency percentile.
+
+    The hedge deadline is `hedge_percentile` of the last `hedge_window_size`
+    call latencies (never below hedge_min_delay_ms); no hedges are sent
+    until hedge_min_samples latencies have been seen. Each call earns
+    `hedge_max_ratio` of a hedge and each hedge spends one, so at most that
+    fraction of calls is ever duplicated. Only use for idempotent calls.
+
+    The window holds the primary's latency measured from the original start.
+    When a hedge wins, the primary's time so far is recorded as a censored
+    sample — it took at least that long — so hedging doesn't hide the slow
+    tail that sets the deadline.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._latencies: deque[float] = deque(maxlen=settings.hedge_window_size)
+        self._budget = 0.0
+
+    def deadline_ms(self) -> float | None:
+        """Current hedge deadline, or None while there are too few samples."""
+        if len(self._latencies) < settings.hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(settings.hedge_percentile / 100 * len(ordered)) - 1)
+        return max(settings.hedge_min_delay_ms, ordered[max(0, index)])
+
+    def _record(self, started_at: float) -> None:
+        self._latencies.append((time.monotonic() - started_at) * 1000)
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await `fn()`, hedging it with a second `fn()` if it is slow."""
+        if not settings.hedging_enabled:
+            return await fn()
+
+        self._budget = min(_MAX_BUDGET, self._budget + settings.hedge_max_ratio)
+        deadline = self.deadline_ms()
+        started_at = time.monotonic()
+        primary = asyncio.ensure_future(fn())
+        tasks = [primary]
+        try:
+            if deadline is not None:
+                done, _ = await asyncio.wait({primary}, timeout=deadline / 1000)
+                if not done:
+                    if self._budget >= 1:
+                        self._budget -= 1
+                        metrics.increment("hedge_requests_total", group=self.name, outcome="sent")
+                        tasks.append(asyncio.ensure_future(fn()))
+                    else:
+                        metrics.increment("hedge_requests_total", group=self.name, outcome="no_budget")
+
+            pending = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._record(started_at)
+                        if task is not primary:
+                            metrics.increment("hedge_requests_total", group=self.name, outcome="won")
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+# Process-wide hedgers used by the chat pipeline
+embed_hedger = Hedger("embed_query")
+search_hedger = Hedger("search_chunks")
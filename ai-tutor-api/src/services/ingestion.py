@@ -14,9 +14,11 @@ from ..config import settings
 from .chunker import chunk_text
 from .document_enricher import enrich_document
 from .embedder import embed_chunks
+from .exam_questions import index_exam_questions
 from .metadata_extractor import extract_topics_for_chunks
 from .parser import parse_document
 from .taxonomy import load_taxonomy
+from .topic_packs import refresh_topic_packs
 
 logger = logging.getLogger(__name__)
 
@@ -271,6 +273,16 @@ async def ingest_document(
             "updated_at": datetime.now(timezone.utc).isoformat(),
         }).eq("id", doc_id).execute()
 
+        # 9. Expand per-question key_points into rag.exam_questions
+        index_exam_questions(
+            doc_id, enrichment.key_points,
+            [(i, c.content) for i, c in enumerate(chunks)],
+            subject_id, doc_type, year, session, paper_number,
+        )
+
+        # 10. Refresh precomputed packs for every topic this document touches
+        refresh_topic_packs({r["topic_id"] for r in chunk_rows})
+
         logger.info(
             "Ingested %s: %d chunks, %d embeddings, enrichment=%s",
             filename, len(chunks), len(embeddings),
@@ -279,7 +291,7 @@ async def ingest_document(
         return doc_id
 
     except Exception as exc:
-        # 9. Mark as failed
+        # 11. Mark as failed
         sb.schema("rag").table("documents").update({
             "status": "failed",
             "error_message": str(exc),
@@ -317,7 +329,15 @@ async def update_document(
     }).eq("id", doc_id).execute()
 
     try:
-        # 2. Delete old chunks
+        # 2. Delete old chunks (remember their topics — those packs go stale)
+        old_topics = (
+            sb.schema("rag")
+            .table("chunks")
+            .select("topic_id")
+            .eq("document_id", doc_id)
+            .execute()
+        )
+        affected_topics = {r["topic_id"] for r in (old_topics.data or [])}
         sb.schema("rag").table("chunks").delete().eq("document_id", doc_id).execute()
 
         # 3. Recompute content hash
@@ -338,13 +358,14 @@ async def update_document(
         doc_row = (
             sb.schema("rag")
             .table("documents")
-            .select("source_type, title, doc_type")
+            .select("source_type, title, doc_type, year, session, paper_number")
             .eq("id", doc_id)
             .execute()
         )
         source_type = doc_row.data[0]["source_type"] if doc_row.data else "unknown"
         title = doc_row.data[0]["title"] if doc_row.data else filename
         doc_type_val = doc_row.data[0].get("doc_type") if doc_row.data else None
+        existing = doc_row.data[0] if doc_row.data else {}
 
         # 6. Parse, enrich + chunk (enrich parallel with chunk)
         parsed = parse_document(file_bytes, filename)
@@ -414,6 +435,17 @@ async def update_document(
             "updated_at": datetime.now(timezone.utc).isoformat(),
         }).eq("id", doc_id).execute()
 
+        # 9. Re-index exam questions against the new chunk layout
+        index_exam_questions(
+            doc_id, enrichment.key_points,
+            [(i, c.content) for i, c in enumerate(chunks)],
+            subject_id, doc_type_val, existing.get("year"),
+            existing.get("session"), existing.get("paper_number"),
+        )
+
+        # 10. Refresh packs for old and new topics
+        refresh_topic_packs(affected_topics | {r["topic_id"] for r in chunk_rows})
+
         logger.info(
             "Updated %s (doc_id=%s): %d chunks re-embedded",
             filename, doc_id, len(chunks),
@@ -444,6 +476,16 @@ def soft_delete_document(doc_id: str) -> None:
     }).eq("id", doc_id).execute()
     logger.info("Soft-deleted document: %s", doc_id)
 
+    # Topic packs copy chunk content, so rebuild the ones this document fed
+    topics = (
+        sb.schema("rag")
+        .table("chunks")
+        .select("topic_id")
+        .eq("document_id", doc_id)
+        .execute()
+    )
+    refresh_topic_packs({r["topic_id"] for r in (topics.data or [])})
+
 
 def cleanup_deleted_documents(older_than_days: int = 30) -> int:
     """Hard-delete documents that were soft-deleted more than N days ago.
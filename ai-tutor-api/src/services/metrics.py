@@ -0,0 +1,94 @@
+# ai-tutor-api/src/services/metrics.py
+# In-process counters, gauges and timing summaries exposed via GET /metrics.
+
+import threading
+from dataclasses import dataclass
+
+_lock = threading.Lock()
+
+
+@dataclass
+class _Summary:
+    """Running count/sum/max for an observed value (e.g. latency in ms)."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+
+_counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+_gauges: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+_summaries: dict[tuple[str, tuple[tuple[str, str], ...]], _Summary] = {}
+
+
+def _key(name: str, labels: dict[str, object]) -> tuple[str, tuple[tuple[str, str], ...]]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def increment(name: str, value: float = 1, **labels: object) -> None:
+    """Add `value` to a counter, e.g. increment("retrieval_reuse_total", decision="hit")."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels: object) -> None:
+    """Set a gauge to an absolute value (queue depth, in-flight requests)."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels: object) -> None:
+    """Record one observation into a count/sum/max summary."""
+    key = _key(name, labels)
+    with _lock:
+        summary = _summaries.setdefault(key, _Summary())
+        summary.count += 1
+        summary.total += value
+        summary.max = max(summary.max, value)
+
+
+def _render(name: str, labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f"{k}={v}" for k, v in labels)
+    return f"{name}{{{inner}}}"
+
+
+def snapshot() -> dict:
+    """Return all metrics as a JSON-serialisable dict."""
+    with _lock:
+        return {
+            "counters": {_render(*k): v for k, v in _counters.items()},
+            "gauges": {_render(*k): v for k, v in _gauges.items()},
+            "summaries": {
+                _render(*k): {
+                    "count": s.count,
+                    "sum": round(s.total, 3),
+                    "avg": round(s.total / s.count, 3) if s.count else 0.0,
+                    "max": round(s.max, 3),
+                }
+                for k, s in _summaries.items()
+            },
+        }
+
+
+def summary_mean(name: str, **labels: object) -> float | None:
+    """Mean of a summary's observations so far, or None before the first one."""
+    with _lock:
+        summary = _summaries.get(_key(name, labels))
+        return summary.total / summary.count if summary and summary.count else None
+
+
+def get_counter(name: str, **labels: object) -> float:
+    """Read a single counter value (mainly for tests)."""
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def reset() -> None:
+    """Clear all metrics (tests only)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _summaries.clear()
@@ -0,0 +1,88 @@
+# ai-tutor-api/src/services/model_router.py
+# Pick a chat model tier per turn from cheap signals (query, chunk mix, subject, role).
+
+import re
+from dataclasses import dataclass, field
+
+from ..config import settings
+from .retrieval import RetrievedChunk
+
+TIERS = ("fast", "standard", "capable")
+
+# Chunk types that usually need multi-step reasoning to use well
+_REASONING_CHUNK_TYPES = frozenset({
+    "worked_example", "question", "marking_criteria", "answer", "data_table",
+})
+
+_REASONING_QUERY = re.compile(
+    r"\b(calculate|work out|solve|prove|derive|step[- ]by[- ]step|show (that|how)|"
+    r"explain (why|how)|compare|evaluate|how many marks|mark (my|this)|"
+    r"rearrange|simplify|factori[sz]e|expand)\b|[=^×÷√]|\d\s*[-+*/]\s*\d",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RouteDecision:
+    """The tier and model chosen for one turn, with the signals that decided it."""
+
+    tier: str
+    model: str
+    score: int
+    reasons: list[str] = field(default_factory=list)
+
+
+def model_for_tier(tier: str) -> str:
+    """Configured model for a tier; unconfigured tiers use settings.chat_model."""
+    return settings.chat_model_tiers.get(tier) or settings.chat_model
+
+
+def route_model(
+    message: str,
+    chunks: list[RetrievedChunk],
+    subject_id: str | None,
+    role: str,
+) -> RouteDecision:
+    """Score the turn and map the score to a tier.
+
+    Short definitional questions go to the fast tier; long questions,
+    calculation/explanation requests, exam-style chunk mixes and subjects
+    listed in route_capable_subject_ids push towards the capable tier.
+    """
+    score = 0
+    reasons: list[str] = []
+
+    words = len(message.split())
+    if words <= settings.route_fast_max_words:
+        score -= 1
+        reasons.append("short_query")
+    elif words >= settings.route_capable_min_words:
+        score += 2
+        reasons.append("long_query")
+
+    if _REASONING_QUERY.search(message):
+        score += 2
+        reasons.append("reasoning_query")
+
+    if chunks:
+        heavy = sum(1 for c in chunks if c.chunk_type in _REASONING_CHUNK_TYPES)
+        if heavy / len(chunks) >= 0.5:
+            score += 1
+            reasons.append("reasoning_chunks")
+
+    if subject_id and subject_id in settings.route_capable_subject_ids:
+        score += 1
+        reasons.append("capable_subject")
+
+    # Students working through a problem benefit most from the stronger model
+    if role == "child" and score > 0:
+        score += 1
+        reasons.append("child_reasoning")
+
+    if score <= -1:
+        tier = "fast"
+    elif score >= 2:
+        tier = "capable"
+    else:
+        tier = "standard"
+    return RouteDecision(tier=tier, model=model_for_tier(tier), score=score, reasons=reasons)
@@ -0,0 +1,225 @@
+# ai-tutor-api/src/services/providers.py
+# Ordered OpenAI-compatible providers per capability, with health tracking and latency-aware selection.
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+import httpx
+from openai import APIConnectionError, APIStatusError
+
+from ..config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest observation in the latency moving average
+_EWMA_ALPHA = 0.3
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    """One OpenAI-compatible endpoint.
+
+    `models` maps a chat route tier to this provider's model for it (e.g. a
+    deployment name on a fallback host); `model` is used for tiers it
+    doesn't list, and as the embedding model. `vector_space` identifies the
+    embedding space the provider produces; only providers in the pinned
+    space serve embeddings.
+    """
+
+    name: str
+    base_url: str
+    api_key: str
+    model: str | None = None
+    vector_space: str | None = None
+    models: dict[str, str] = field(default_factory=dict, hash=False)
+
+    def model_for(self, tier: str, default: str) -> str:
+        """The model this provider runs for a route tier; `default` is the tier's global model."""
+        return self.models.get(tier) or self.model or default
+
+
+@dataclass
+class ProviderHealth:
+    """Rolling health for one provider."""
+
+    ewma_ms: float | None = None
+    consecutive_failures: int = 0
+    down_until: float = 0.0
+
+    def available(self, now: float) -> bool:
+        return now >= self.down_until
+
+
+class ProviderPool:
+    """Selects providers for one capability and learns from each call's outcome.
+
+    Providers are tried in order of (latency EWMA + position penalty), so
+    the configured primary wins unless it is measurably slower. A provider
+    that fails `provider_failure_threshold` times in a row is skipped for a
+    cooldown that doubles per further failure; once the cooldown passes it
+    is tried again and a single success restores it (brownout recovery).
+    Providers in cooldown are still used as a last resort.
+    """
+
+    def __init__(self, capability: str, providers: list[ProviderConfig]):
+        self.capability = capability
+        self.providers = providers
+        self._health = {p.name: ProviderHealth() for p in providers}
+        self._lock = threading.Lock()
+
+    def candidates(self) -> list[ProviderConfig]:
+        """Providers in the order they should be tried for the next call."""
+        now = time.monotonic()
+        with self._lock:
+            def _rank(item: tuple[int, ProviderConfig]) -> tuple[bool, float]:
+                position, provider = item
+                health = self._health[provider.name]
+                latency = health.ewma_ms or 0.0
+                return (
+                    not health.available(now),
+                    latency + position * settings.provider_priority_penalty_ms,
+                )
+
+            ranked = sorted(enumerate(self.providers), key=_rank)
+        return [provider for _, provider in ranked]
+
+    def record_success(self, provider: ProviderConfig, latency_ms: float) -> None:
+        with self._lock:
+            health = self._health[provider.name]
+            health.ewma_ms = (
+                latency_ms if health.ewma_ms is None
+                else _EWMA_ALPHA * latency_ms + (1 - _EWMA_ALPHA) * health.ewma_ms
+            )
+            if health.consecutive_failures:
+                logger.info("%s provider %s recovered", self.capability, provider.name)
+            health.consecutive_failures = 0
+            health.down_until = 0.0
+            ewma = health.ewma_ms
+        metrics.increment(
+            "provider_requests_total",
+            capability=self.capability, provider=provider.name, result="ok",
+        )
+        metrics.set_gauge(
+            "provider_latency_ewma_ms", ewma, capability=self.capability, provider=provider.name
+        )
+
+    def record_failure(self, provider: ProviderConfig, reason: str) -> None:
+        with self._lock:
+            health = self._health[provider.name]
+            health.consecutive_failures += 1
+            over = health.consecutive_failures - settings.provider_failure_threshold
+            if over >= 0:
+                cooldown = min(
+                    settings.provider_cooldown_seconds * (2 ** over),
+                    settings.provider_max_cooldown_seconds,
+                )
+                health.down_until = time.monotonic() + cooldown
+                logger.warning(
+                    "%s provider %s marked down for %.0fs after %d failures (%s)",
+                    self.capability, provider.name, cooldown,
+                    health.consecutive_failures, reason,
+                )
+        metrics.increment(
+            "provider_requests_total",
+            capability=self.capability, provider=provider.name, result=reason,
+        )
+
+    def health(self, name: str) -> ProviderHealth:
+        return self._health[name]
+
+
+# Statuses that say something about the provider. Auth and not-found are
+# included: every provider has its own api_key and model, so a rejected key
+# or an unknown model is exactly what another provider may not have.
+_PROVIDER_FAULT_STATUSES = frozenset({401, 403, 404, 408, 409, 429})
+
+
+def is_provider_fault(exc: BaseException) -> bool:
+    """Whether an error says something about the provider rather than the request.
+
+    Connection failures, timeouts, 5xx, rate limits and provider-specific
+    rejections (auth, unknown model) trigger failover and count against
+    health. Request errors (bad request, context length) would fail the same
+    way everywhere, and anything else is a bug in our code — neither fails
+    over or trips a breaker.
+    """
+    if isinstance(exc, APIStatusError):
+        return exc.status_code >= 500 or exc.status_code in _PROVIDER_FAULT_STATUSES
+    return isinstance(exc, (APIConnectionError, httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def embedding_vector_space() -> str:
+    """The vector space stored chunks were embedded in; queries must match it."""
+    return settings.embedding_vector_space or (
+        f"{settings.embedding_model}@{settings.embedding_dimensions}"
+    )
+
+
+def _parse(entries: list[dict], capability: str) -> list[ProviderConfig]:
+    providers = []
+    for i, entry in enumerate(entries):
+        try:
+            providers.append(ProviderConfig(
+                name=entry.get("name") or f"{capability}-{i}",
+                base_url=entry["base_url"],
+                api_key=entry.get("api_key", ""),
+                model=entry.get("model"),
+                vector_space=entry.get("vector_space"),
+                models=dict(entry.get("models") or {}),
+            ))
+        except KeyError:
+            logger.error("Ignoring %s provider #%d without base_url", capability, i)
+    return providers
+
+
+def _build_chat_pool() -> ProviderPool:
+    providers = _parse(settings.chat_providers, "chat") or [
+        ProviderConfig(name="default", base_url=settings.chat_base_url, api_key=settings.chat_api_key)
+    ]
+    return ProviderPool("chat", providers)
+
+
+def _build_embedding_pool() -> ProviderPool:
+    space = embedding_vector_space()
+    configured = _parse(settings.embedding_providers, "embedding")
+    # Providers without an explicit space are assumed to serve the pinned one
+    pinned = [p for p in configured if (p.vector_space or space) == space]
+    if configured and not pinned:
+        logger.error("No embedding providers match vector space %s; using the default", space)
+    for p in configured:
+        if p not in pinned:
+            logger.warning(
+                "Embedding provider %s serves %s, not %s — excluded", p.name, p.vector_space, space
+            )
+    providers = pinned or [
+        ProviderConfig(
+            name="default",
+            base_url=settings.embedding_base_url,
+            api_key=settings.embedding_api_key,
+            vector_space=space,
+        )
+    ]
+    return ProviderPool("embedding", providers)
+
+
+_pools: dict[str, ProviderPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(capability: str) -> ProviderPool:
+    """Process-wide pool for "chat" or "embedding", built from settings on first use."""
+    with _pools_lock:
+        pool = _pools.get(capability)
+        if pool is None:
+            pool = _build_chat_pool() if capability == "chat" else _build_embedding_pool()
+            _pools[capability] = pool
+        return pool
+
+
+def reset_pools() -> None:
+    """Forget pools and health (tests, or after changing provider settings)."""
+    with _pools_lock:
+        _pools.clear()
@@ -0,0 +1,208 @@
+# ai-tutor-api/src/services/resilience.py
+# Circuit breakers around external dependencies and a per-turn deadline budget.
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TypeVar
+
+import httpx
+from postgrest.exceptions import APIError
+
+from ..config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} is temporarily unavailable")
+        self.name = name
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the turn's deadline budget is spent before a stage starts."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"No time left for {stage}")
+        self.stage = stage
+
+
+# Errors that mean the database (not the query) failed: SQLSTATE classes 08
+# connection, 53 insufficient resources, 57 operator intervention (statement
+# timeout, shutdown), 58 system error; and PostgREST unable to reach Postgres.
+_DATABASE_FAULT_CLASSES = frozenset({"08", "53", "57", "58"})
+_POSTGREST_CONNECTION_CODES = frozenset({"PGRST000", "PGRST001", "PGRST002", "PGRST003"})
+
+
+def is_database_fault(exc: BaseException) -> bool:
+    """Whether a Supabase error says the database is unhealthy, for the search and history breakers.
+
+    Transport failures, timeouts and server-side resource errors count;
+    query errors and bugs in our code (KeyError, validation) do not.
+    """
+    if isinstance(exc, APIError):
+        code = exc.code or ""
+        return code in _POSTGREST_CONNECTION_CODES or code[:2] in _DATABASE_FAULT_CLASSES
+    return isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class CircuitBreaker:
+    """Classic closed → open → half-open breaker for one dependency.
+
+    After `circuit_failure_threshold` consecutive failures the breaker opens
+    and calls fail immediately with CircuitOpen. Once `circuit_reset_seconds`
+    have passed a single probe call is let through: success closes the
+    breaker, failure opens it again. Disabled breakers (CIRCUIT_BREAKERS_ENABLED
+    off) still count failures but never reject.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("Circuit %s: %s -> %s", self.name, self.state, state)
+            self.state = state
+        metrics.set_gauge("circuit_state", _STATE_VALUES[state], breaker=self.name)
+
+    def acquire(self) -> None:
+        """Permission to call the dependency now; raises CircuitOpen if not."""
+        if not settings.circuit_breakers_enabled:
+            return
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < settings.circuit_reset_seconds:
+                    rejected = True
+                else:
+                    self._set_state("half_open")
+                    rejected = False
+            else:
+                rejected = False
+            if not rejected and self.state == "half_open":
+                # Only one probe at a time while half-open
+                rejected = self._probing
+                self._probing = True
+        if rejected:
+            metrics.increment("circuit_rejected_total", breaker=self.name)
+            raise CircuitOpen(self.name)
+
+    def release(self) -> None:
+        """Give back a probe that ended without a verdict (cancelled, out of time)."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set_state("closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= settings.circuit_failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state("open")
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        timeout: float | None = None,
+        is_failure: Callable[[Exception], bool] | None = None,
+    ) -> T:
+        """Await `fn()` behind the breaker, giving up after `timeout` seconds.
+
+        Timeouts and errors count as failures; cancellation and an exhausted
+        turn deadline do not, nor do errors `is_failure` rejects (request
+        errors and bugs say nothing about the dependency's health).
+        """
+        self.acquire()
+        if timeout is not None and timeout <= 0:
+            self.release()
+            raise DeadlineExceeded(self.name)
+        try:
+            result = await (asyncio.wait_for(fn(), timeout) if timeout is not None else fn())
+        except (asyncio.CancelledError, DeadlineExceeded):
+            self.release()
+            raise
+        except asyncio.TimeoutError:
+            self.record_failure()
+            raise
+        except Exception as exc:
+            if is_failure is None or is_failure(exc):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        self.record_success()
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.opened_at = 0.0
+            self._probing = False
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """A point in (monotonic) time by which a turn's slow stages must finish."""
+
+    expires_at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+_deadline: ContextVar[Deadline | None] = ContextVar("turn_deadline", default=None)
+
+
+def start_deadline(seconds: float) -> Deadline:
+    """Set the deadline for the current task and the tasks it starts from now on."""
+    deadline = Deadline.after(seconds)
+    _deadline.set(deadline)
+    return deadline
+
+
+def stage_timeout(cap: float) -> float:
+    """Timeout for the next stage: its own cap, shortened to the turn's remaining budget."""
+    deadline = _deadline.get()
+    return cap if deadline is None else min(cap, deadline.remaining())
+
+
+# One breaker per external dependency of the chat pipeline
+embedding_breaker = CircuitBreaker("embedding")
+search_breaker = CircuitBreaker("search")
+history_breaker = CircuitBreaker("history")
+llm_breaker = CircuitBreaker("llm")
+
+BREAKERS = (embedding_breaker, search_breaker, history_breaker, llm_breaker)
+
+
+def reset() -> None:
+    """Close every breaker (tests)."""
+    for breaker in BREAKERS:
+        breaker.reset()
@@ -2,12 +2,15 @@
 # Vector search with role-based scoping for RAG retrieval.
 
 import logging
+import re
 from dataclasses import dataclass
 
+import anyio
 from supabase import create_client
 
 from ..config import settings
 from .embedder import embed_query
+from .exam_questions import normalise_question_ref
 
 logger = logging.getLogger(__name__)
 
@@ -41,10 +44,45 @@ class RetrievedChunk:
         return self.chunk_metadata.get("chunk_type", "general")
 
 
+@dataclass
+class QuestionReference:
+    """A specific exam question named in a chat message, e.g. "Q3b June 2023 paper 2"."""
+
+    question_ref: str
+    year: int | None = None
+    session: str | None = None
+    paper_number: str | None = None
+    doc_type: str | None = None
+
+
 def _get_supabase():
     return create_client(settings.supabase_url, settings.supabase_service_role_key)
 
 
+def _row_to_chunk(row: dict) -> RetrievedChunk:
+    """Map a search_chunks-shaped RPC row to a RetrievedChunk."""
+    return RetrievedChunk(
+        id=row["id"],
+        document_id=row["document_id"],
+        content=row["content"],
+        similarity=row["similarity"],
+        document_title=row["document_title"],
+        source_type=row["source_type"],
+        subject_id=row.get("subject_id"),
+        topic_id=row.get("topic_id"),
+        chunk_metadata=row.get("chunk_metadata", {}),
+        doc_metadata=row.get("doc_metadata", {}),
+        year=row.get("doc_year"),
+        session=row.get("doc_session"),
+        paper_number=row.get("doc_paper_number"),
+        doc_type=row.get("doc_type"),
+        file_key=row.get("doc_file_key"),
+        exam_pathway_id=row.get("doc_exam_pathway_id"),
+        summary=row.get("doc_summary"),
+        key_points=row.get("doc_key_points"),
+    )
+
+
 async def search_chunks(
     query_embedding: list[float],
     subject_id: str | None = None,
@@ -62,7 +100,8 @@ async def search_chunks(
     use retrieve_context().
     """
     sb = _get_supabase()
-    result = sb.schema("rag").rpc(
+    # The RPC runs in a worker thread so concurrent (and hedged) searches overlap
+    query = sb.schema("rag").rpc(
         "search_chunks",
         {
             "query_embedding": query_embedding,
@@ -76,32 +115,10 @@ async def search_chunks(
             "filter_exam_pathway_id": exam_pathway_id,
             "filter_doc_type": doc_type,
         },
-    ).execute()
-
-    chunks = []
-    for row in result.data or []:
-        chunks.append(
-            RetrievedChunk(
-                id=row["id"],
-                document_id=row["document_id"],
-                content=row["content"],
-                similarity=row["similarity"],
-                document_title=row["document_title"],
-                source_type=row["source_type"],
-                subject_id=row.get("subject_id"),
-                topic_id=row.get("topic_id"),
-                chunk_metadata=row.get("chunk_metadata", {}),
-                doc_metadata=row.get("doc_metadata", {}),
-                year=row.get("doc_year"),
-                session=row.get("doc_session"),
-                paper_number=row.get("doc_paper_number"),
-                doc_type=row.get("doc_type"),
-                file_key=row.get("doc_file_key"),
-                exam_pathway_id=row.get("doc_exam_pathway_id"),
-                summary=row.get("doc_summary"),
-                key_points=row.get("doc_key_points"),
-            )
-        )
+    )
+    result = await anyio.to_thread.run_sync(query.execute)
+
+    chunks = [_row_to_chunk(row) for row in result.data or []]
 
     logger.info(
         "Retrieved %d chunks for query (subject=%s, topic=%s)",
@@ -110,6 +127,24 @@ async def search_chunks(
     return chunks
 
 
+async def fetch_chunks(
+    chunk_ids: list[str],
+    query_embedding: list[float],
+) -> list[RetrievedChunk]:
+    """Fetch chunks by id, in the given order, scored against a query embedding.
+
+    Primary-key lookups via rag.fetch_chunks — used to rebuild a previous
+    turn from its persisted sources. Chunks that no longer exist are left out.
+    """
+    sb = _get_supabase()
+    query = sb.schema("rag").rpc(
+        "fetch_chunks",
+        {"p_chunk_ids": chunk_ids, "query_embedding": query_embedding},
+    )
+    result = await anyio.to_thread.run_sync(query.execute)
+    return [_row_to_chunk(row) for row in result.data or []]
+
+
 async def retrieve_context(
     query: str,
     subject_id: str | None = None,
@@ -130,6 +165,99 @@ async def retrieve_context(
     )
 
 
+_QUESTION_RE = re.compile(
+    r"\b(?:q|qu|question)\s*\.?\s*"
+    r"(\d{1,2}(?:\s*\.\s*\d{1,2})?(?:\s*\(?[a-h]\)?)?(?:\s*\((?:i{1,3}|iv|vi{0,3})\))?)"
+    r"(?![\d])",
+    re.IGNORECASE,
+)
+_YEAR_RE = re.compile(r"\b(20\d{2})\b")
+_PAPER_RE = re.compile(r"\b(?:paper|p)\s*(\d)\b", re.IGNORECASE)
+_SESSIONS = {
+    "jun": ("june", "jun", "summer"),
+    "nov": ("november", "nov", "autumn"),
+    "mar": ("march", "mar"),
+    "jan": ("january", "jan", "winter"),
+}
+_MARK_SCHEME_RE = re.compile(r"\bmark\s*scheme|\bmarkscheme|\bms\b", re.IGNORECASE)
+
+
+def parse_question_reference(message: str) -> QuestionReference | None:
+    """Recognise requests for one specific past-paper question.
+
+    Needs a question label plus at least one paper identifier (year, session
+    or paper number) — "Q3b" on its own could be any paper. Sessions and
+    paper numbers are normalised to the rag.documents codes ("jun", "p2").
+    """
+    q_match = _QUESTION_RE.search(message)
+    if not q_match:
+        return None
+    question_ref = normalise_question_ref(q_match.group(1))
+    if question_ref is None:
+        return None
+
+    lowered = message.lower()
+    year_match = _YEAR_RE.search(message)
+    paper_match = _PAPER_RE.search(message)
+    session = next(
+        (
+            code for code, words in _SESSIONS.items()
+            if any(re.search(rf"\b{w}\b", lowered) for w in words)
+        ),
+        None,
+    )
+
+    year = int(year_match.group(1)) if year_match else None
+    paper_number = f"p{paper_match.group(1)}" if paper_match else None
+    if year is None and session is None and paper_number is None:
+        return None
+
+    return QuestionReference(
+        question_ref=question_ref,
+        year=year,
+        session=session,
+        paper_number=paper_number,
+        doc_type="ms" if _MARK_SCHEME_RE.search(message) else None,
+    )
+
+
+async def lookup_exam_question(
+    ref: QuestionReference,
+    subject_id: str | None = None,
+) -> list[RetrievedChunk]:
+    """Fetch the chunks for a specific exam question via rag.exam_questions.
+
+    One indexed lookup — no query embedding and no vector search. Returns an
+    empty list when the question is not indexed or the reference matches
+    more than one paper, so callers can fall back to search_chunks().
+    """
+    sb = _get_supabase()
+    try:
+        query = sb.schema("rag").rpc(
+            "lookup_exam_question",
+            {
+                "p_question_ref": ref.question_ref,
+                "p_year": ref.year,
+                "p_session": ref.session,
+                "p_paper_number": ref.paper_number,
+                "p_subject_id": subject_id,
+                "p_doc_type": ref.doc_type,
+                "match_count": settings.retrieval_match_count + 1,
+            },
+        )
+        result = await anyio.to_thread.run_sync(query.execute)
+    except Exception as exc:
+        logger.warning("Exam question lookup failed, falling back to search: %s", exc)
+        return []
+
+    chunks = [_row_to_chunk(row) for row in result.data or []]
+    logger.info(
+        "Exam question lookup Q%s (year=%s, session=%s, paper=%s): %d chunks",
+        ref.question_ref, ref.year, ref.session, ref.paper_number, len(chunks),
+    )
+    return chunks
+
+
 def _format_source_label(index: int, chunk: RetrievedChunk) -> str:
     """Build a rich source label with available metadata."""
     parts = [chunk.document_title]
@@ -0,0 +1,217 @@
+# ai-tutor-api/src/services/scope_inference.py
+# Infer a subject/topic scope for unscoped chat queries from topic-name embeddings.
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from supabase import create_client
+
+from ..config import settings
+from .embedder import embed_chunks
+from .taxonomy import load_taxonomy
+
+logger = logging.getLogger(__name__)
+
+# Topic names shorter than this are too generic to match on keywords alone
+# ("Energy", "Forces" appear in several subjects).
+_MIN_KEYWORD_CHARS = 8
+_TOP_K = 5
+
+
+@dataclass
+class InferredScope:
+    """A scope filter inferred from the query, with the evidence behind it."""
+
+    subject_id: str | None
+    topic_id: str | None
+    confidence: float
+    method: str  # "keyword", "embedding" or "none"
+
+
+@dataclass
+class _ScopeIndex:
+    """Precomputed, L2-normalised topic-name embeddings for every ingested subject."""
+
+    subject_ids: list[str]
+    topic_ids: list[str]
+    keywords: list[str]
+    matrix: np.ndarray  # shape (n_topics, dims)
+    built_at: float = field(default_factory=time.monotonic)
+
+
+_index: _ScopeIndex | None = None
+_build_lock = asyncio.Lock()
+_build_task: asyncio.Task | None = None
+
+
+def _get_supabase():
+    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+
+
+def _normalise(text: str) -> str:
+    return re.sub(r"[^a-z0-9 ]+", " ", text.lower()).strip()
+
+
+def _ingested_subject_ids() -> list[str]:
+    """Distinct subject IDs that have completed documents (deduplicated in SQL)."""
+    sb = _get_supabase()
+    result = sb.schema("rag").rpc("ingested_subject_ids", {}).execute()
+    return [r["subject_id"] for r in (result.data or []) if r.get("subject_id")]
+
+
+async def build_scope_index(force: bool = False) -> _ScopeIndex | None:
+    """Embed every topic label across ingested subjects and cache the matrix.
+
+    Labels include theme/component so that short topic names carry context,
+    e.g. "Cell structure (Cell Biology > Biology Paper 1)". Uses the same
+    embedding model as chunks so similarities are comparable. With force=True
+    a fresh index is built and swapped in; the old one keeps serving meanwhile.
+    Supabase reads run in worker threads so the event loop keeps serving.
+    """
+    global _index
+    async with _build_lock:
+        if _index is not None and not force:
+            return _index
+
+        subject_ids: list[str] = []
+        topic_ids: list[str] = []
+        keywords: list[str] = []
+        labels: list[str] = []
+
+        ingested = await asyncio.to_thread(_ingested_subject_ids)
+        taxonomies = await asyncio.gather(
+            *(asyncio.to_thread(load_taxonomy, subject_id) for subject_id in ingested)
+        )
+        for subject_id, taxonomy in zip(ingested, taxonomies):
+            for t in taxonomy.topics:
+                subject_ids.append(subject_id)
+                topic_ids.append(t.topic_id)
+                keywords.append(_normalise(t.topic_name))
+                labels.append(
+                    f"{taxonomy.subject_name}: {t.topic_name} ({t.theme_name} > {t.component_name})"
+                )
+
+        if not labels:
+            logger.info("Scope index not built: no topics for ingested subjects")
+            return None
+
+        embeddings = np.asarray(await embed_chunks(labels), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        _index = _ScopeIndex(
+            subject_ids=subject_ids,
+            topic_ids=topic_ids,
+            keywords=keywords,
+            matrix=embeddings / norms,
+        )
+        logger.info(
+            "Built scope index: %d topics across %d subjects",
+            len(topic_ids), len(set(subject_ids)),
+        )
+        return _index
+
+
+def ensure_scope_index() -> _ScopeIndex | None:
+    """Return the index if ready; otherwise start building it in the background.
+
+    Never blocks the caller — requests that arrive before the index exists
+    simply run unscoped. A stale index is still returned while its
+    replacement builds, so newly ingested subjects appear within one TTL.
+    """
+    global _build_task
+    stale = (
+        _index is not None
+        and time.monotonic() - _index.built_at > settings.scope_index_ttl_seconds
+    )
+    if (_index is None or stale) and (_build_task is None or _build_task.done()):
+        _build_task = asyncio.create_task(_build_in_background(force=stale))
+    return _index
+
+
+async def _build_in_background(force: bool) -> None:
+    try:
+        await build_scope_index(force=force)
+    except Exception:
+        logger.exception("Scope index build failed")
+
+
+def reset_scope_index() -> None:
+    """Drop the cached index (e.g. after new subjects are ingested)."""
+    global _index
+    _index = None
+
+
+def _keyword_scope(index: _ScopeIndex, message: str) -> InferredScope | None:
+    """Match topic names that appear verbatim in the query."""
+    text = f" {_normalise(message)} "
+    hits = [
+        i for i, kw in enumerate(index.keywords)
+        if len(kw) >= _MIN_KEYWORD_CHARS and f" {kw} " in text
+    ]
+    if not hits:
+        return None
+
+    subjects = {index.subject_ids[i] for i in hits}
+    if len(subjects) != 1:
+        return None
+
+    topic_id = index.topic_ids[hits[0]] if len(hits) == 1 else None
+    return InferredScope(
+        subject_id=subjects.pop(), topic_id=topic_id, confidence=1.0, method="keyword",
+    )
+
+
+def _embedding_scope(index: _ScopeIndex, query_embedding: list[float]) -> InferredScope | None:
+    """Score the query against every topic label and keep confident winners."""
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    if not norm or query.shape[0] != index.matrix.shape[1]:
+        return None
+
+    scores = index.matrix @ (query / norm)
+    order = np.argsort(scores)[::-1][:_TOP_K]
+    best = int(order[0])
+    best_score = float(scores[best])
+    runner_up = float(scores[order[1]]) if len(order) > 1 else -1.0
+
+    if (
+        best_score >= settings.scope_inference_topic_threshold
+        and best_score - runner_up >= settings.scope_inference_margin
+    ):
+        return InferredScope(
+            subject_id=index.subject_ids[best],
+            topic_id=index.topic_ids[best],
+            confidence=best_score,
+            method="embedding",
+        )
+
+    top_subjects = {index.subject_ids[int(i)] for i in order}
+    if best_score >= settings.scope_inference_subject_threshold and len(top_subjects) == 1:
+        return InferredScope(
+            subject_id=index.subject_ids[best],
+            topic_id=None,
+            confidence=best_score,
+            method="embedding",
+        )
+    return None
+
+
+def infer_scope(query_embedding: list[float], message: str) -> InferredScope:
+    """Infer a subject/topic filter for an unscoped query.
+
+    Keyword matches win when a topic name appears in the message and belongs
+    to a single subject. Otherwise the query embedding is compared against the
+    precomputed topic matrix. Returns method="none" when nothing is confident
+    enough — the caller should then search the whole corpus.
+    """
+    index = ensure_scope_index()
+    if index is None:
+        return InferredScope(subject_id=None, topic_id=None, confidence=0.0, method="none")
+
+    scope = _keyword_scope(index, message) or _embedding_scope(index, query_embedding)
+    return scope or InferredScope(subject_id=None, topic_id=None, confidence=0.0, method="none")
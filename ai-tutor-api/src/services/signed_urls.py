@@ -0,0 +1,107 @@
+# ai-tutor-api/src/services/signed_urls.py
+# Batched, cached signed Storage URLs for the documents behind source chips.
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from ..config import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+BUCKET = "exam-documents"
+
+
+class SignedUrlCache:
+    """Per-process LRU of signed URLs, each kept until `margin` seconds before it expires.
+
+    A URL handed out from the cache is therefore always valid for at least
+    `margin` more seconds — long enough for the student to click it.
+    """
+
+    def __init__(self, max_size: int = 4096, margin_seconds: float = 300):
+        self._max_size = max_size
+        self._margin = margin_seconds
+        self._urls: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, file_keys: list[str]) -> dict[str, str]:
+        now = time.monotonic()
+        found: dict[str, str] = {}
+        with self._lock:
+            for key in file_keys:
+                entry = self._urls.get(key)
+                if entry is None:
+                    continue
+                use_until, url = entry
+                if now >= use_until:
+                    del self._urls[key]
+                    continue
+                self._urls.move_to_end(key)
+                found[key] = url
+        return found
+
+    def put(self, file_key: str, url: str, expires_at: float) -> None:
+        with self._lock:
+            self._urls[file_key] = (expires_at - self._margin, url)
+            self._urls.move_to_end(file_key)
+            while len(self._urls) > self._max_size:
+                self._urls.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._urls.clear()
+
+
+signed_url_cache = SignedUrlCache(
+    max_size=settings.source_url_cache_size,
+    margin_seconds=settings.source_url_refresh_margin_seconds,
+)
+
+
+def _sign(sb, file_keys: list[str], expires_in: int) -> list[dict]:
+    return sb.storage.from_(BUCKET).create_signed_urls(file_keys, expires_in)
+
+
+async def signed_urls(sb, file_keys: list[str | None]) -> dict[str, str]:
+    """Signed URLs for the distinct non-empty `file_keys`, keyed by file_key.
+
+    Cache misses are signed in one Storage request. Keys that could not be
+    signed (missing object, Storage down, slower than
+    source_url_timeout_seconds) are simply absent — the caller sends those
+    sources without a URL and the frontend falls back to its own lookup.
+    """
+    keys = list(dict.fromkeys(k for k in file_keys if k))
+    if not keys:
+        return {}
+
+    urls = signed_url_cache.get_many(keys)
+    missing = [k for k in keys if k not in urls]
+    metrics.increment("source_url_cache_total", len(urls), result="hit")
+    metrics.increment("source_url_cache_total", len(missing), result="miss")
+    if not missing:
+        return urls
+
+    ttl = settings.source_url_ttl_seconds
+    issued_at = time.monotonic()
+    try:
+        signed = await asyncio.wait_for(
+            asyncio.to_thread(_sign, sb, missing, ttl),
+            settings.source_url_timeout_seconds,
+        )
+    except Exception as exc:
+        logger.warning("Signing %d source URLs failed: %s", len(missing), exc)
+        metrics.increment("source_url_sign_errors_total")
+        return urls
+
+    for item in signed:
+        url = item.get("signedURL") or item.get("signedUrl")
+        path = item.get("path")
+        if item.get("error") or not url or path not in missing:
+            continue
+        signed_url_cache.put(path, url, issued_at + ttl)
+        urls[path] = url
+    return urls
@@ -0,0 +1,255 @@
+# ai-tutor-api/src/services/singleflight.py
+# Coalesce identical in-flight work (embed, search, LLM streams) across concurrent requests.
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+from typing import TypeVar
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+def normalise_message(message: str) -> str:
+    """Canonical form for coalescing: case, spacing and trailing ?/!/. ignored."""
+    text = _WHITESPACE.sub(" ", message.strip().lower())
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def coalesce_key(message: str, *scope: object) -> tuple:
+    """Key for work that depends only on the message text and its scope filters."""
+    return (normalise_message(message), *scope)
+
+
+class StreamCancelled(Exception):
+    """Raised to a fan-out's subscribers when its upstream stream was cancelled mid-way."""
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key.
+
+    The first caller (leader) starts the work as its own task; callers that
+    arrive while it runs (followers) await the same task. The key is
+    forgotten as soon as the task finishes, so results are never served
+    stale — this is deduplication, not caching. A caller that is cancelled
+    (client disconnect) does not cancel the shared task.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+            metrics.increment("singleflight_total", group=self.name, role="leader")
+        else:
+            metrics.increment("singleflight_total", group=self.name, role="follower")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+
+@dataclass
+class _Broadcast:
+    """One upstream stream and everything read from it so far."""
+
+    items: list = field(default_factory=list)
+    done: bool = False
+    error: BaseException | None = None
+    subscribers: int = 0
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+    task: asyncio.Task | None = None
+
+
+class StreamFanout:
+    """Fan one upstream stream out to every subscriber with the same key.
+
+    Subscribers that join mid-stream replay the buffered items first, so
+    every subscriber sees the complete stream. The upstream stream is read
+    by its own task, which is cancelled once the last subscriber has been
+    gone for `linger_seconds` (0 = immediately). Finished streams stay
+    attachable for `retain_seconds` so late readers can still replay them.
+    """
+
+    def __init__(self, name: str, linger_seconds: float = 0.0, retain_seconds: float = 0.0):
+        self.name = name
+        self.linger_seconds = linger_seconds
+        self.retain_seconds = retain_seconds
+        self._streams: dict[Hashable, _Broadcast] = {}
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def start(
+        self,
+        key: Hashable,
+        open_stream: Callable[[], AsyncIterator],
+        on_done: Callable[[], None] | None = None,
+    ) -> bool:
+        """Start reading `open_stream` under `key` unless already running. Returns True if started.
+
+        `on_done` runs when the upstream task finishes, however it finishes
+        (even if cancelled before its first step).
+        """
+        if key in self._streams:
+            return False
+        broadcast = _Broadcast()
+        self._streams[key] = broadcast
+        broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, open_stream))
+        broadcast.task.add_done_callback(lambda _task: self._finish_unstarted(key, broadcast))
+        if on_done is not None:
+            broadcast.task.add_done_callback(lambda _task: on_done())
+        return True
+
+    async def subscribe(
+        self,
+        key: Hashable,
+        open_stream: Callable[[], AsyncIterator],
+    ) -> AsyncIterator:
+        """Read the stream for `key`, starting it if nobody else has."""
+        started = self.start(key, open_stream)
+        metrics.increment(
+            "stream_fanout_total", group=self.name, role="leader" if started else "follower"
+        )
+        async for item in self._follow(self._streams[key], 0):
+            yield item
+
+    def attach(self, key: Hashable, start_at: int = 0) -> AsyncIterator | None:
+        """Follow an existing stream from item index `start_at`, or None if unknown."""
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            return None
+        return self._follow(broadcast, start_at)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Stop the upstream stream for `key` now, whoever follows it. True if it was running."""
+        broadcast = self._streams.get(key)
+        if broadcast is None or broadcast.done:
+            return False
+        broadcast.task.cancel()
+        return True
+
+    async def _follow(self, broadcast: _Broadcast, start_at: int) -> AsyncIterator:
+        broadcast.subscribers += 1
+        sent = start_at
+        try:
+            while True:
+                async with broadcast.changed:
+                    await broadcast.changed.wait_for(
+                        lambda: len(broadcast.items) > sent or broadcast.done
+                    )
+                    pending = broadcast.items[sent:]
+                    finished = broadcast.done
+                for item in pending:
+                    yield item
+                sent += len(pending)
+                if finished and sent >= len(broadcast.items):
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                if self.linger_seconds > 0:
+                    asyncio.get_running_loop().call_later(
+                        self.linger_seconds, self._cancel_if_idle, broadcast
+                    )
+                else:
+                    broadcast.task.cancel()
+
+    @staticmethod
+    def _cancel_if_idle(broadcast: _Broadcast) -> None:
+        if broadcast.subscribers == 0 and not broadcast.done:
+            broadcast.task.cancel()
+
+    def _finish_unstarted(self, key: Hashable, broadcast: _Broadcast) -> None:
+        """Release subscribers of a task cancelled before _pump's first step."""
+        if broadcast.done:
+            return
+        broadcast.error = StreamCancelled(f"{self.name} stream cancelled")
+        broadcast.done = True
+        self._drop(key, broadcast)
+        asyncio.ensure_future(self._notify(broadcast))
+
+    def _drop(self, key: Hashable, broadcast: _Broadcast) -> None:
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    async def _pump(
+        self,
+        key: Hashable,
+        broadcast: _Broadcast,
+        open_stream: Callable[[], AsyncIterator],
+    ) -> None:
+        stream = open_stream()
+        try:
+            try:
+                async for item in stream:
+                    async with broadcast.changed:
+                        broadcast.items.append(item)
+                        broadcast.changed.notify_all()
+            except asyncio.CancelledError:
+                logger.info("Fan-out stream %s cancelled before it finished", self.name)
+                # Subscribers must not mistake the truncated stream for a complete one
+                broadcast.error = StreamCancelled(f"{self.name} stream cancelled")
+                raise
+            except Exception as exc:
+                broadcast.error = exc
+            finally:
+                # Run the upstream generator's cleanup now rather than at GC time
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    try:
+                        await aclose()
+                    except Exception:
+                        logger.exception("Fan-out stream %s failed to close", self.name)
+        finally:
+            # Whatever happened above (a failing or re-cancelled cleanup
+            # included), subscribers are released
+            if self.retain_seconds > 0:
+                asyncio.get_running_loop().call_later(
+                    self.retain_seconds, self._drop, key, broadcast
+                )
+            else:
+                self._drop(key, broadcast)
+            broadcast.done = True
+            await asyncio.shield(self._notify(broadcast))
+
+    @staticmethod
+    async def _notify(broadcast: _Broadcast) -> None:
+        async with broadcast.changed:
+            broadcast.changed.notify_all()
+
+
+def messages_key(model: str, messages: list[dict]) -> str:
+    """Stable key for an LLM request: identical prompts produce the same key."""
+    payload = json.dumps([model, messages], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Process-wide groups used by the chat pipeline
+embed_flight = SingleFlight("embed_query")
+search_flight = SingleFlight("search_chunks")
+llm_fanout = StreamFanout("chat_completion")
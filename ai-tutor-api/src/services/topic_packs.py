@@ -0,0 +1,329 @@
+# ai-tutor-api/src/services/topic_packs.py
+# Precomputed per-topic retrieval packs: ranked chunks, merged key points, packed context.
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+
+from supabase import create_client
+
+from ..config import settings
+from .retrieval import RetrievedChunk, format_retrieval_context
+
+logger = logging.getLogger(__name__)
+
+# Lower rank = earlier in the pack. Teaching content first, exam artefacts after.
+_CHUNK_TYPE_RANK = {
+    "learning_objective": 0,
+    "definition": 1,
+    "explanation": 2,
+    "worked_example": 3,
+    "practical": 4,
+    "question": 5,
+    "marking_criteria": 6,
+    "answer": 7,
+    "examiner_comment": 8,
+    "data_table": 9,
+    "general": 10,
+    "grade_table": 11,
+}
+_SOURCE_RANK = {
+    "revision": 0,
+    "specification": 1,
+    "past_paper": 2,
+    "sample_paper": 2,
+    "marking_scheme": 3,
+    "examiner_report": 4,
+    "grade_threshold": 5,
+}
+_MAX_CHUNKS_PER_DOCUMENT = 2
+# Candidate chunks are read in pages; PostgREST caps a single select at 1000 rows
+_CHUNK_PAGE_SIZE = 1000
+_MAX_KEY_POINTS = 15
+
+# Requests about the topic as a whole rather than a specific fact
+_GENERIC_QUERY = re.compile(
+    r"\b(help me (revise|understand|learn|with)|explain (this|the) topic|"
+    r"summari[sz]e|summary|overview|key (points|facts|ideas)|"
+    r"what (do|should) i (need to )?know|teach me|revise (this|it)|"
+    r"quiz me|test me|where (do|should) i start|main ideas|the basics)\b",
+    re.IGNORECASE,
+)
+_MAX_GENERIC_WORDS = 15
+
+
+@dataclass
+class TopicPack:
+    """Precomputed retrieval result for one topic."""
+
+    topic_id: str
+    chunks: list[RetrievedChunk]
+    key_points: list[dict] = field(default_factory=list)
+    packed_context: str = ""
+
+
+_cache: dict[str, tuple[float, TopicPack | None]] = {}
+_cache_lock = threading.Lock()
+
+
+def _get_supabase():
+    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+
+
+def is_generic_topic_query(message: str) -> bool:
+    """True for short whole-topic requests ("help me revise this", "quiz me")."""
+    words = message.split()
+    return 0 < len(words) <= _MAX_GENERIC_WORDS and bool(_GENERIC_QUERY.search(message))
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+
+def _row_to_pack_chunk(row: dict) -> RetrievedChunk:
+    doc = row.get("documents") or {}
+    return RetrievedChunk(
+        id=row["id"],
+        document_id=row["document_id"],
+        content=row["content"],
+        similarity=1.0,
+        document_title=doc.get("title", ""),
+        source_type=doc.get("source_type", ""),
+        subject_id=row.get("subject_id"),
+        topic_id=row.get("topic_id"),
+        chunk_metadata=row.get("metadata") or {},
+        doc_metadata={},
+        year=doc.get("year"),
+        session=doc.get("session"),
+        paper_number=doc.get("paper_number"),
+        doc_type=doc.get("doc_type"),
+        file_key=doc.get("file_key"),
+        exam_pathway_id=doc.get("exam_pathway_id"),
+        summary=doc.get("summary"),
+    )
+
+
+def rank_pack_chunks(rows: list[dict], limit: int) -> list[dict]:
+    """Order candidate chunk rows for a pack and keep the best `limit`.
+
+    Teaching content (definitions, explanations) ranks above exam artefacts,
+    revision guides above specifications above papers, newer papers first.
+    At most _MAX_CHUNKS_PER_DOCUMENT per document keeps the pack varied.
+    """
+    def _key(row: dict) -> tuple:
+        doc = row.get("documents") or {}
+        chunk_type = (row.get("metadata") or {}).get("chunk_type", "general")
+        return (
+            _CHUNK_TYPE_RANK.get(chunk_type, 10),
+            _SOURCE_RANK.get(doc.get("source_type", ""), 6),
+            -(doc.get("year") or 0),
+            row.get("chunk_index", 0),
+        )
+
+    picked: list[dict] = []
+    per_doc: dict[str, int] = {}
+    for row in sorted(rows, key=_key):
+        doc_id = row["document_id"]
+        if per_doc.get(doc_id, 0) >= _MAX_CHUNKS_PER_DOCUMENT:
+            continue
+        per_doc[doc_id] = per_doc.get(doc_id, 0) + 1
+        picked.append(row)
+        if len(picked) >= limit:
+            break
+    return picked
+
+
+def merge_key_points(rows: list[dict], topic_name: str | None) -> list[dict]:
+    """Collect document key_points relevant to the topic, deduplicated.
+
+    Key points that name a topic/area are kept only if it matches the topic
+    name; unlabelled ones from pack documents are kept as-is.
+    """
+    wanted = (topic_name or "").strip().lower()
+    merged: list[dict] = []
+    seen: set[str] = set()
+    seen_docs: set[str] = set()
+    for row in rows:
+        if row["document_id"] in seen_docs:
+            continue
+        seen_docs.add(row["document_id"])
+        for kp in (row.get("documents") or {}).get("key_points") or []:
+            if not isinstance(kp, dict):
+                continue
+            label = str(kp.get("topic") or kp.get("area") or "").strip().lower()
+            if label and wanted and wanted not in label and label not in wanted:
+                continue
+            key = json.dumps(kp, sort_keys=True)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(kp)
+            if len(merged) >= _MAX_KEY_POINTS:
+                return merged
+    return merged
+
+
+def build_packed_context(
+    topic_name: str | None,
+    key_points: list[dict],
+    chunks: list[RetrievedChunk],
+) -> str:
+    """Render the LLM system message for a pack: key points, then sources."""
+    lines = []
+    if key_points:
+        lines.append(f"Key points for {topic_name or 'this topic'}:")
+        for kp in key_points:
+            parts = [f"{k}: {v}" for k, v in kp.items() if v not in (None, "", [])]
+            lines.append(f"- {'; '.join(parts)}")
+        lines.append("")
+    lines.append(format_retrieval_context(chunks))
+    return "\n".join(lines)
+
+
+def _fingerprint(rows: list[dict]) -> str:
+    ids = sorted(r["id"] for r in rows)
+    return hashlib.sha256(",".join(ids).encode("utf-8")).hexdigest()
+
+
+def _candidate_rows(sb, topic_id: str) -> list[dict]:
+    """Every chunk of the topic from completed documents, paged by id."""
+    rows: list[dict] = []
+    offset = 0
+    while True:
+        page = (
+            sb.schema("rag")
+            .table("chunks")
+            .select(
+                "id, document_id, chunk_index, content, metadata, subject_id, topic_id, "
+                "documents!inner(title, source_type, status, year, session, paper_number, "
+                "doc_type, file_key, exam_pathway_id, summary, key_points)"
+            )
+            .eq("topic_id", topic_id)
+            .eq("documents.status", "completed")
+            .order("id")
+            .range(offset, offset + _CHUNK_PAGE_SIZE - 1)
+            .execute()
+        ).data or []
+        rows.extend(page)
+        if len(page) < _CHUNK_PAGE_SIZE:
+            return rows
+        offset += _CHUNK_PAGE_SIZE
+
+
+def build_topic_pack(topic_id: str, force: bool = False) -> bool:
+    """(Re)build the pack for one topic. Returns True if the row changed.
+
+    Skips the write when the set of candidate chunks is unchanged, so it is
+    cheap to call for every topic touched by an ingestion run.
+    """
+    sb = _get_supabase()
+    rows = _candidate_rows(sb, topic_id)
+
+    if not rows:
+        sb.schema("rag").table("topic_packs").delete().eq("topic_id", topic_id).execute()
+        invalidate_topic_pack(topic_id)
+        return True
+
+    fingerprint = _fingerprint(rows)
+    if not force:
+        existing = (
+            sb.schema("rag")
+            .table("topic_packs")
+            .select("fingerprint")
+            .eq("topic_id", topic_id)
+            .execute()
+        )
+        if existing.data and existing.data[0]["fingerprint"] == fingerprint:
+            return False
+
+    topic_result = sb.table("topics").select("topic_name").eq("id", topic_id).execute()
+    topic_name = topic_result.data[0]["topic_name"] if topic_result.data else None
+
+    picked = rank_pack_chunks(rows, settings.topic_pack_size)
+    chunks = [_row_to_pack_chunk(r) for r in picked]
+    key_points = merge_key_points(picked, topic_name)
+
+    sb.schema("rag").table("topic_packs").upsert({
+        "topic_id": topic_id,
+        "subject_id": rows[0].get("subject_id"),
+        "chunk_ids": [c.id for c in chunks],
+        "chunks": [asdict(c) for c in chunks],
+        "key_points": key_points,
+        "packed_context": build_packed_context(topic_name, key_points, chunks),
+        "fingerprint": fingerprint,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }).execute()
+    invalidate_topic_pack(topic_id)
+
+    logger.info(
+        "Built topic pack %s (%s): %d/%d chunks, %d key points",
+        topic_id, topic_name, len(chunks), len(rows), len(key_points),
+    )
+    return True
+
+
+def refresh_topic_packs(topic_ids: set[str] | list[str]) -> int:
+    """Incrementally rebuild packs for the given topics. Non-fatal per topic.
+
+    Returns the number of packs that changed.
+    """
+    changed = 0
+    for topic_id in sorted(t for t in topic_ids if t):
+        try:
+            if build_topic_pack(topic_id):
+                changed += 1
+        except Exception as exc:
+            logger.warning("Topic pack refresh failed for %s: %s", topic_id, exc)
+    return changed
+
+
+# ---------------------------------------------------------------------------
+# Serving
+# ---------------------------------------------------------------------------
+
+
+def invalidate_topic_pack(topic_id: str) -> None:
+    with _cache_lock:
+        _cache.pop(topic_id, None)
+
+
+async def get_topic_pack(topic_id: str) -> TopicPack | None:
+    """Return the topic's pack, from the in-process cache when fresh.
+
+    Misses (no pack built yet) are cached too, so a topic without a pack
+    costs one read per TTL rather than one per message.
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _cache.get(topic_id)
+        if hit and now - hit[0] < settings.topic_pack_cache_ttl_seconds:
+            return hit[1]
+
+    sb = _get_supabase()
+    result = (
+        sb.schema("rag")
+        .table("topic_packs")
+        .select("topic_id, chunks, key_points, packed_context")
+        .eq("topic_id", topic_id)
+        .execute()
+    )
+
+    pack = None
+    if result.data and result.data[0].get("chunks"):
+        row = result.data[0]
+        pack = TopicPack(
+            topic_id=topic_id,
+            chunks=[RetrievedChunk(**c) for c in row["chunks"]],
+            key_points=row.get("key_points") or [],
+            packed_context=row.get("packed_context") or "",
+        )
+
+    with _cache_lock:
+        _cache[topic_id] = (now, pack)
+    return pack
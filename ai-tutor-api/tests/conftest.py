@@ -68,6 +68,31 @@ def override_auth_child():
     app.dependency_overrides.pop(get_current_user, None)
 
 
+@pytest.fixture(autouse=True)
+def _reset_process_state():
+    """Each test starts with empty rate-limit buckets, no held stream slots,
+    fresh provider health, closed circuit breakers and no cached tokens,
+    signing keys, sidebar pages or signed URLs."""
+    from src import auth
+    from src.services import admission, providers, resilience
+    from src.services.conversation_cache import conversation_list_cache
+    from src.services.signed_urls import signed_url_cache
+
+    admission.reset()
+    auth.reset_caches()
+    providers.reset_pools()
+    resilience.reset()
+    conversation_list_cache.clear()
+    signed_url_cache.clear()
+    yield
+    admission.reset()
+    auth.reset_caches()
+    providers.reset_pools()
+    resilience.reset()
+    conversation_list_cache.clear()
+    signed_url_cache.clear()
+
+
 # ---------------------------------------------------------------------------
 # Async HTTP client
 # ---------------------------------------------------------------------------
@@ -125,6 +150,9 @@ class FakeStreamResponse:
     async def __anext__(self):
         return await self._gen.__anext__()
 
+    async def close(self):
+        await self._gen.aclose()
+
 
 @pytest.fixture()
 def mock_openai(monkeypatch):
@@ -169,6 +197,8 @@ class MockQueryBuilder:
         self._table_data = table_data or {}
         self._current_table: str | None = None
         self._schema: str | None = None
+        self.rpc_calls: list[tuple[str, dict]] = []
+        self.or_filters: list[str] = []
 
     def schema(self, name: str) -> "MockQueryBuilder":
         self._schema = name
@@ -178,6 +208,12 @@ class MockQueryBuilder:
         self._current_table = name
         return self
 
+    def rpc(self, name: str, params: dict) -> "MockQueryBuilder":
+        """Record the call; execute() returns table_data[name]."""
+        self.rpc_calls.append((name, params))
+        self._current_table = name
+        return self
+
     def select(self, *_args: Any, **kwargs: Any) -> "MockQueryBuilder":
         return self
 
@@ -196,6 +232,27 @@ class MockQueryBuilder:
     def neq(self, _col: str, _val: Any) -> "MockQueryBuilder":
         return self
 
+    def gt(self, _col: str, _val: Any) -> "MockQueryBuilder":
+        return self
+
+    def gte(self, _col: str, _val: Any) -> "MockQueryBuilder":
+        return self
+
+    def lt(self, _col: str, _val: Any) -> "MockQueryBuilder":
+        return self
+
+    def is_(self, _col: str, _val: Any) -> "MockQueryBuilder":
+        return self
+
+    def or_(self, filters: str) -> "MockQueryBuilder":
+        """Record the PostgREST or=(...) filter for assertions."""
+        self.or_filters.append(filters)
+        return self
+
+    @property
+    def not_(self) -> "MockQueryBuilder":
+        return self
+
     def order(self, _col: str, **_kwargs: Any) -> "MockQueryBuilder":
         return self
 
@@ -207,7 +264,9 @@ class MockQueryBuilder:
 
     def execute(self) -> MockExecuteResult:
         data = self._table_data.get(self._current_table or "", [])
-        return MockExecuteResult(data=data, count=len(data))
+        # RPCs may return a scalar or an object rather than rows
+        count = len(data) if isinstance(data, list) else None
+        return MockExecuteResult(data=data, count=count)
 
 
 @pytest.fixture()
@@ -232,6 +291,16 @@ def mock_supabase(monkeypatch):
     monkeypatch.setattr("src.api.chat.embed_query", _mock_embed_query)
     monkeypatch.setattr("src.api.chat.search_chunks", _mock_search_chunks)
 
+    # No scope index in unit tests — unscoped queries stay unscoped
+    from src.services.scope_inference import InferredScope
+
+    monkeypatch.setattr(
+        "src.api.chat.infer_scope",
+        lambda *_a, **_k: InferredScope(
+            subject_id=None, topic_id=None, confidence=0.0, method="none",
+        ),
+    )
+
     return builder
 
 
@@ -0,0 +1,125 @@
+# tests/test_admission.py
+# Unit tests for chat admission control (token buckets, concurrency cap).
+
+import asyncio
+
+import pytest
+
+from src.config import settings
+from src.services.admission import (
+    AdmissionRejected,
+    ConcurrencyLimiter,
+    RateLimiter,
+    TokenBucket,
+    admit,
+    concurrency_limiter,
+    reset,
+)
+
+
+class TestTokenBucket:
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(capacity=2, rate=1.0, tokens=2, updated_at=0.0)
+        assert bucket.take(0.0) == 0
+        assert bucket.take(0.0) == 0
+        assert bucket.take(0.0) == pytest.approx(1.0)
+        assert bucket.take(1.0) == 0
+
+
+class TestRateLimiter:
+    def test_rejects_after_burst_with_retry_after(self, monkeypatch):
+        monkeypatch.setattr(settings, "rate_limit_child_burst", 2)
+        monkeypatch.setattr(settings, "rate_limit_child_per_minute", 6.0)
+        limiter = RateLimiter()
+
+        limiter.check("u1", "child")
+        limiter.check("u1", "child")
+        with pytest.raises(AdmissionRejected) as exc_info:
+            limiter.check("u1", "child")
+        assert exc_info.value.reason == "rate_limit"
+        assert exc_info.value.retry_after == 10
+
+    def test_users_have_separate_buckets(self, monkeypatch):
+        monkeypatch.setattr(settings, "rate_limit_child_burst", 1)
+        limiter = RateLimiter()
+
+        limiter.check("u1", "child")
+        limiter.check("u2", "child")
+        with pytest.raises(AdmissionRejected):
+            limiter.check("u1", "child")
+
+    def test_changing_role_does_not_give_a_fresh_bucket(self, monkeypatch):
+        monkeypatch.setattr(settings, "rate_limit_child_burst", 1)
+        monkeypatch.setattr(settings, "rate_limit_parent_burst", 10)
+        limiter = RateLimiter()
+
+        limiter.check("u1", "child")
+        with pytest.raises(AdmissionRejected):
+            limiter.check("u1", "parent")
+
+
+class TestConcurrencyLimiter:
+    @pytest.mark.asyncio
+    async def test_queued_request_gets_released_slot(self, monkeypatch):
+        monkeypatch.setattr(settings, "max_concurrent_streams", 1)
+        monkeypatch.setattr(settings, "admission_queue_size", 1)
+        limiter = ConcurrencyLimiter()
+
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+
+        limiter.release()
+        await waiter
+        assert limiter.active == 1
+        assert limiter.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_immediately(self, monkeypatch):
+        monkeypatch.setattr(settings, "max_concurrent_streams", 1)
+        monkeypatch.setattr(settings, "admission_queue_size", 0)
+        limiter = ConcurrencyLimiter()
+
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await limiter.acquire()
+        assert exc_info.value.reason == "queue_full"
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout_rejects(self, monkeypatch):
+        monkeypatch.setattr(settings, "max_concurrent_streams", 1)
+        monkeypatch.setattr(settings, "admission_queue_size", 5)
+        monkeypatch.setattr(settings, "admission_queue_timeout_seconds", 0.01)
+        limiter = ConcurrencyLimiter()
+
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await limiter.acquire()
+        assert exc_info.value.reason == "queue_timeout"
+        assert limiter.queued == 0
+
+        limiter.release()
+        assert limiter.active == 0
+
+
+class TestAdmit:
+    @pytest.mark.asyncio
+    async def test_concurrency_rejection_refunds_rate_token(self, monkeypatch):
+        monkeypatch.setattr(settings, "rate_limit_child_burst", 1)
+        monkeypatch.setattr(settings, "max_concurrent_streams", 1)
+        monkeypatch.setattr(settings, "admission_queue_size", 0)
+        reset()
+        try:
+            held = await admit("u1", "child")
+
+            with pytest.raises(AdmissionRejected) as exc_info:
+                await admit("u2", "child")
+            assert exc_info.value.reason == "queue_full"
+
+            held.release()
+            slot = await admit("u2", "child")
+            slot.release()
+            assert concurrency_limiter.active == 0
+        finally:
+            reset()
@@ -1,12 +1,14 @@
 # ai-tutor-api/tests/test_auth.py
 # Tests for JWT authentication — the security boundary.
 
+import json
 import time
 
 import jwt
 import pytest
 from fastapi import HTTPException
 
+from src import auth
 from src.auth import get_current_user
 from tests.conftest import TEST_JWT_SECRET
 
@@ -118,3 +120,127 @@ async def test_wrong_secret_returns_401():
 
     assert exc_info.value.status_code == 401
     assert "Invalid token" in exc_info.value.detail
+
+
+# ── Asymmetric keys (JWKS) ───────────────────────────────────────────────
+
+
+def _ec_key():
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+def _rsa_key():
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _jwk(private_key, kid: str, alg: str) -> dict:
+    algorithm = jwt.get_algorithm_by_name(alg)
+    return {**json.loads(algorithm.to_jwk(private_key.public_key())), "kid": kid, "alg": alg}
+
+
+@pytest.fixture()
+def jwks(monkeypatch):
+    """Serve a mutable key set from the JWKS endpoint and count fetches."""
+    served = {"keys": [], "fetches": 0}
+
+    async def _fetch(_url):
+        served["fetches"] += 1
+        return {"keys": list(served["keys"])}
+
+    monkeypatch.setattr("src.auth._fetch_jwks", _fetch)
+    return served
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("alg,make_key", [("ES256", _ec_key), ("RS256", _rsa_key)])
+async def test_asymmetric_token_verified_with_jwks(jwks, alg, make_key):
+    private_key = make_key()
+    jwks["keys"].append(_jwk(private_key, "key-1", alg))
+    token = jwt.encode(JWT_PAYLOAD, private_key, algorithm=alg, headers={"kid": "key-1"})
+
+    result = await get_current_user(f"Bearer {token}")
+
+    assert result["user_id"] == JWT_PAYLOAD["sub"]
+    assert jwks["fetches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rotated_key_is_fetched_once(jwks):
+    old_key, new_key = _ec_key(), _ec_key()
+    jwks["keys"].append(_jwk(old_key, "old", "ES256"))
+    await get_current_user(
+        f"Bearer {jwt.encode(JWT_PAYLOAD, old_key, algorithm='ES256', headers={'kid': 'old'})}"
+    )
+
+    jwks["keys"].append(_jwk(new_key, "new", "ES256"))
+    auth.jwks_cache._attempted_at -= 60  # past the unknown-kid refetch interval
+    token = jwt.encode(JWT_PAYLOAD, new_key, algorithm="ES256", headers={"kid": "new"})
+    result = await get_current_user(f"Bearer {token}")
+
+    assert result["user_id"] == JWT_PAYLOAD["sub"]
+    assert jwks["fetches"] == 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_does_not_refetch_every_request(jwks):
+    forged = jwt.encode(JWT_PAYLOAD, _ec_key(), algorithm="ES256", headers={"kid": "forged"})
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(f"Bearer {forged}")
+        assert exc_info.value.status_code == 401
+
+    assert jwks["fetches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_public_key_cannot_be_used_as_hmac_secret(jwks):
+    """Algorithm confusion: an HS256 token signed with the published key is rejected."""
+    private_key = _ec_key()
+    jwks["keys"].append(_jwk(private_key, "key-1", "ES256"))
+    public_material = jwks["keys"][0]["x"].encode()
+    forged = jwt.encode(JWT_PAYLOAD, public_material, algorithm="HS256", headers={"kid": "key-1"})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(f"Bearer {forged}")
+
+    assert exc_info.value.status_code == 401
+
+
+# ── Verified-token cache ─────────────────────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_verified_token_is_not_decoded_again(monkeypatch):
+    token = _make_token()
+    await get_current_user(f"Bearer {token}")
+
+    def _no_decode(*_args, **_kwargs):
+        raise AssertionError("token decoded twice")
+
+    monkeypatch.setattr("src.auth.jwt.decode", _no_decode)
+    result = await get_current_user(f"Bearer {token}")
+
+    assert result["user_id"] == JWT_PAYLOAD["sub"]
+
+
+def test_cached_token_expires_with_its_exp(monkeypatch):
+    cache = auth.VerifiedTokenCache(max_size=10)
+    cache.put(b"digest", {"sub": "u1", "exp": 1000})
+
+    monkeypatch.setattr("src.auth.time.time", lambda: 999.0)
+    assert cache.get(b"digest") == {"sub": "u1", "exp": 1000}
+
+    monkeypatch.setattr("src.auth.time.time", lambda: 1000.0)
+    assert cache.get(b"digest") is None
+
+
+def test_tokens_without_exp_are_not_cached():
+    cache = auth.VerifiedTokenCache(max_size=10)
+    cache.put(b"digest", {"sub": "u1"})
+
+    assert cache.get(b"digest") is None
@@ -189,3 +189,754 @@ async def test_stream_model_matches_settings(mock_openai, mock_supabase):
         assert call_kwargs.kwargs.get("stream") is True
         # Model should be present
         assert "model" in call_kwargs.kwargs
+
+
+@pytest.mark.asyncio
+async def test_followup_reuses_previous_chunks(mock_openai, mock_supabase, monkeypatch):
+    """A follow-up close to the previous turn skips search_chunks entirely."""
+    from src.services.followup import turn_cache
+
+    search_calls = []
+
+    async def _counting_search(*_args, **_kwargs):
+        search_calls.append(_kwargs)
+        return []
+
+    async def _unit_embedding(*_args, **_kwargs):
+        return [1.0] * 2000
+
+    monkeypatch.setattr("src.api.chat.search_chunks", _counting_search)
+    monkeypatch.setattr("src.api.chat.embed_query", _unit_embedding)
+    mock_supabase._table_data["messages"] = [
+        {"id": "msg-prev", "role": "assistant", "content": "Earlier answer", "sources": []},
+    ]
+    turn_cache.put("conv-1", "msg-prev", [1.0] * 2000, [], (None, None, None, None, None))
+
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/chat/stream",
+                json=_chat_body(conversation_id="conv-1"),
+            )
+    finally:
+        turn_cache.clear()
+
+    events = parse_sse_events(response.text)
+    assert any(e["event"] == "done" for e in events)
+    assert search_calls == []
+
+
+@pytest.mark.asyncio
+async def test_followup_rebuilds_previous_turn_from_sources(mock_openai, mock_supabase, monkeypatch):
+    """A turn answered by another worker is rebuilt from its persisted sources."""
+    from src.services.followup import turn_cache
+    from src.services.retrieval import RetrievedChunk
+
+    chunk = RetrievedChunk(
+        id="chunk-1",
+        document_id="doc-1",
+        content="Photosynthesis converts light energy...",
+        similarity=0.62,
+        document_title="AQA Biology Revision",
+        source_type="revision",
+        subject_id=None,
+        topic_id=None,
+        chunk_metadata={},
+        doc_metadata={},
+    )
+    search_calls = []
+    fetched = []
+
+    async def _counting_search(*_args, **_kwargs):
+        search_calls.append(_kwargs)
+        return []
+
+    async def _fetch(chunk_ids, _embedding):
+        fetched.append(chunk_ids)
+        return [chunk]
+
+    monkeypatch.setattr("src.api.chat.search_chunks", _counting_search)
+    monkeypatch.setattr("src.api.chat.fetch_chunks", _fetch)
+    mock_supabase._table_data["messages"] = [
+        {
+            "id": "msg-prev",
+            "role": "assistant",
+            "content": "Earlier answer",
+            "sources": [{"chunk_id": "chunk-1", "similarity": 0.6}],
+        },
+    ]
+    turn_cache.clear()
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/chat/stream",
+            json=_chat_body(conversation_id="conv-1", message="Can you explain that more simply?"),
+        )
+    turn_cache.clear()
+
+    events = parse_sse_events(response.text)
+    sources = next(e for e in events if e["event"] == "sources")
+    assert fetched == [["chunk-1"]]
+    assert search_calls == []
+    assert [s["chunk_id"] for s in sources["data"]["sources"]] == ["chunk-1"]
+
+
+@pytest.mark.asyncio
+async def test_exam_question_reference_skips_embedding(mock_openai, mock_supabase, monkeypatch):
+    """"Q3b of June 2023 paper 2" is answered by direct lookup — no embed, no search."""
+    from src.services.retrieval import RetrievedChunk
+
+    chunk = RetrievedChunk(
+        id="c1", document_id="d1", content="03.2 Explain...", similarity=1.0,
+        document_title="AQA Biology Paper 2", source_type="past_paper",
+        subject_id=None, topic_id=None, chunk_metadata={}, doc_metadata={},
+    )
+    calls = []
+
+    async def _lookup(ref, subject_id=None):
+        calls.append(("lookup", ref.question_ref))
+        return [chunk]
+
+    async def _fail(*_args, **_kwargs):
+        calls.append(("unexpected", None))
+        return []
+
+    monkeypatch.setattr("src.api.chat.lookup_exam_question", _lookup)
+    monkeypatch.setattr("src.api.chat.embed_query", _fail)
+    monkeypatch.setattr("src.api.chat.search_chunks", _fail)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/chat/stream", json=_chat_body(message="Explain Q3b of June 2023 paper 2"),
+        )
+
+    events = parse_sse_events(response.text)
+    sources = [e for e in events if e["event"] == "sources"]
+    assert calls == [("lookup", "3b")]
+    assert sources[0]["data"]["sources"][0]["chunk_id"] == "c1"
+
+
+@pytest.mark.asyncio
+async def test_sources_event_carries_signed_urls(mock_openai, mock_supabase, monkeypatch):
+    """Sources go out with a signed URL per distinct file_key; the saved sources don't."""
+    from src.services.retrieval import RetrievedChunk
+
+    chunks = [
+        RetrievedChunk(
+            id=f"c{i}", document_id="d1", content="...", similarity=0.9,
+            document_title="AQA Biology Paper 2", source_type="past_paper",
+            subject_id=None, topic_id=None, chunk_metadata={}, doc_metadata={},
+            file_key="aqa/biology/2023-paper-2.pdf",
+        )
+        for i in range(2)
+    ]
+    signed_batches = []
+
+    class _Bucket:
+        def create_signed_urls(self, paths, expires_in):
+            signed_batches.append(paths)
+            return [{"path": p, "signedURL": f"https://storage.test/{p}?token=t"} for p in paths]
+
+    mock_supabase.storage = type("Storage", (), {"from_": lambda _self, _bucket: _Bucket()})()
+
+    async def _search(*_args, **_kwargs):
+        return chunks
+
+    monkeypatch.setattr("src.api.chat.search_chunks", _search)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/stream", json=_chat_body())
+
+    events = parse_sse_events(response.text)
+    sources = [e for e in events if e["event"] == "sources"][0]["data"]["sources"]
+    assert signed_batches == [["aqa/biology/2023-paper-2.pdf"]]
+    assert {s["url"] for s in sources} == {
+        "https://storage.test/aqa/biology/2023-paper-2.pdf?token=t"
+    }
+
+
+@pytest.mark.asyncio
+async def test_source_urls_are_signed_while_the_llm_connects(mock_openai, mock_supabase, monkeypatch):
+    """Signing doesn't hold up the LLM call; the sources event still precedes the tokens."""
+    import threading
+
+    from src.config import settings
+    from src.services.retrieval import RetrievedChunk
+
+    chunk = RetrievedChunk(
+        id="c1", document_id="d1", content="...", similarity=0.9,
+        document_title="AQA Biology Paper 2", source_type="past_paper",
+        subject_id=None, topic_id=None, chunk_metadata={}, doc_metadata={},
+        file_key="aqa/biology/2023-paper-2.pdf",
+    )
+    from src.api import chat as chat_module
+
+    llm_called = threading.Event()
+    open_chat_stream = chat_module._open_chat_stream
+
+    async def _open(*args, **kwargs):
+        llm_called.set()
+        return await open_chat_stream(*args, **kwargs)
+
+    monkeypatch.setattr(chat_module, "_open_chat_stream", _open)
+
+    class _Bucket:
+        def create_signed_urls(self, paths, expires_in):
+            # Only signs once the LLM request is under way
+            if not llm_called.wait(timeout=2):
+                return []
+            return [{"path": p, "signedURL": f"https://storage.test/{p}?token=t"} for p in paths]
+
+    mock_supabase.storage = type("Storage", (), {"from_": lambda _self, _bucket: _Bucket()})()
+
+    async def _search(*_args, **_kwargs):
+        return [chunk]
+
+    monkeypatch.setattr("src.api.chat.search_chunks", _search)
+    monkeypatch.setattr(settings, "source_url_timeout_seconds", 5.0)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/stream", json=_chat_body())
+
+    events = parse_sse_events(response.text)
+    names = [e["event"] for e in events]
+    assert names.index("sources") < names.index("token")
+    sources = events[names.index("sources")]["data"]["sources"]
+    assert sources[0]["url"] == "https://storage.test/aqa/biology/2023-paper-2.pdf?token=t"
+
+
+@pytest.mark.asyncio
+async def test_sources_are_sent_when_the_llm_fails_before_any_token(mock_supabase, monkeypatch):
+    """A turn whose LLM call fails still sends its sources, then the error."""
+    from src.services.retrieval import RetrievedChunk
+
+    chunk = RetrievedChunk(
+        id="c1", document_id="d1", content="...", similarity=0.9,
+        document_title="AQA Biology Paper 2", source_type="past_paper",
+        subject_id=None, topic_id=None, chunk_metadata={}, doc_metadata={},
+    )
+
+    async def _search(*_args, **_kwargs):
+        return [chunk]
+
+    async def _failing_tokens(_messages, _model):
+        raise RuntimeError("provider unavailable")
+        yield  # pragma: no cover — makes this an async generator
+
+    monkeypatch.setattr("src.api.chat.search_chunks", _search)
+    monkeypatch.setattr("src.api.chat._llm_tokens", _failing_tokens)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/stream", json=_chat_body())
+
+    events = parse_sse_events(response.text)
+    assert [e["event"] for e in events] == ["sources", "error"]
+    assert events[0]["data"]["sources"][0]["chunk_id"] == "c1"
+
+
+@pytest.mark.asyncio
+async def test_answer_records_the_model_that_served_it(mock_supabase, monkeypatch):
+    """A provider running its own model for the tier is what the saved message names."""
+    from src.api.chat import ServedModel
+
+    saved = []
+
+    async def _save(conversation_id, role, content, **kwargs):
+        saved.append((role, kwargs.get("model_name")))
+        return f"msg-{len(saved)}"
+
+    async def _tokens(_messages, _route):
+        yield ServedModel("fallback-deployment")
+        yield "Hi"
+
+    monkeypatch.setattr("src.api.chat._save_message", _save)
+    monkeypatch.setattr("src.api.chat._llm_tokens", _tokens)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/stream", json=_chat_body())
+
+    events = parse_sse_events(response.text)
+    assert [e["event"] for e in events] == ["token", "done"]
+    assert ("assistant", "fallback-deployment") in saved
+
+
+@pytest.mark.asyncio
+async def test_generic_topic_request_uses_topic_pack(mock_openai, mock_supabase, monkeypatch):
+    """"Help me revise this" on a topic page reads the precomputed pack — no embed, no search."""
+    from src.services.retrieval import RetrievedChunk
+    from src.services.topic_packs import TopicPack
+
+    chunk = RetrievedChunk(
+        id="c7", document_id="d1", content="Osmosis is...", similarity=1.0,
+        document_title="Biology Revision Guide", source_type="revision",
+        subject_id=None, topic_id="top-1", chunk_metadata={}, doc_metadata={},
+    )
+    calls = []
+
+    async def _pack(topic_id):
+        calls.append(("pack", topic_id))
+        return TopicPack(topic_id=topic_id, chunks=[chunk], packed_context="PACKED CONTEXT")
+
+    async def _fail(*_args, **_kwargs):
+        calls.append(("unexpected", None))
+        return []
+
+    monkeypatch.setattr("src.api.chat.get_topic_pack", _pack)
+    monkeypatch.setattr("src.api.chat.embed_query", _fail)
+    monkeypatch.setattr("src.api.chat.search_chunks", _fail)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/chat/stream", json=_chat_body(message="Help me revise this", topic_id="top-1"),
+        )
+
+    events = parse_sse_events(response.text)
+    sources = [e for e in events if e["event"] == "sources"]
+    assert calls == [("pack", "top-1")]
+    assert sources[0]["data"]["sources"][0]["chunk_id"] == "c7"
+    sent = mock_openai["create_mock"].call_args.kwargs["messages"]
+    assert any(m["content"] == "PACKED CONTEXT" for m in sent)
+
+
+# ---------------------------------------------------------------------------
+# Prefetch
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture()
+def _warm_stubs(monkeypatch):
+    """Record warm-up calls instead of touching the network."""
+    calls = []
+
+    async def _warm_embedding():
+        calls.append("embedding")
+
+    async def _pack(topic_id):
+        calls.append(("pack", topic_id))
+        return None
+
+    monkeypatch.setattr("src.api.chat.warm_embedding_client", _warm_embedding)
+    monkeypatch.setattr("src.api.chat.ensure_scope_index", lambda: calls.append("scope"))
+    monkeypatch.setattr("src.api.chat.load_taxonomy", lambda sid: calls.append(("taxonomy", sid)))
+    monkeypatch.setattr("src.api.chat.get_topic_pack", _pack)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_prefetch_warms_scope_and_creates_conversation(mock_supabase, _warm_stubs):
+    """POST /chat/prefetch warms every step and returns a fresh conversation ID."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/chat/prefetch", json={"subject_id": "sub-1", "topic_id": "top-1"},
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["conversation_id"]
+    assert set(body["warmed"]) == {
+        "scope_index", "embedding_connection", "taxonomy", "topic_pack", "conversation",
+    }
+    assert body["failed"] == []
+    assert ("taxonomy", "sub-1") in _warm_stubs
+    assert ("pack", "top-1") in _warm_stubs
+
+
+@pytest.mark.asyncio
+async def test_prefetch_reuses_empty_conversation(mock_supabase, _warm_stubs):
+    """Reopening the panel reuses the latest empty conversation for the scope."""
+    mock_supabase._table_data["conversations"] = [{"id": "existing-conv"}]
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/prefetch", json={"subject_id": "sub-1"})
+
+    assert response.json()["conversation_id"] == "existing-conv"
+
+
+@pytest.mark.asyncio
+async def test_prefetch_failures_are_best_effort(mock_supabase, _warm_stubs, monkeypatch):
+    """A failing step is reported, not raised."""
+
+    def _boom(_sid):
+        raise RuntimeError("taxonomy down")
+
+    monkeypatch.setattr("src.api.chat.load_taxonomy", _boom)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/chat/prefetch", json={"subject_id": "sub-1", "create_conversation": False},
+        )
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["failed"] == ["taxonomy"]
+    assert body["conversation_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_requests_share_embedding(mock_openai, mock_supabase, monkeypatch):
+    """A burst of identical questions embeds once."""
+    import asyncio
+
+    calls = 0
+
+    async def _slow_embed(_text):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return [0.0] * 2000
+
+    monkeypatch.setattr("src.api.chat.embed_query", _slow_embed)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = await asyncio.gather(
+            client.post("/chat/stream", json=_chat_body(message="What is osmosis?")),
+            client.post("/chat/stream", json=_chat_body(message="what is osmosis")),
+        )
+
+    assert all(r.status_code == 200 for r in responses)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_returns_429(mock_openai, mock_supabase, monkeypatch):
+    """Past the user's burst, chat_stream answers 429 + Retry-After without embedding."""
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "rate_limit_parent_burst", 1)
+    embeds = []
+
+    async def _embed(text):
+        embeds.append(text)
+        return [0.0] * 2000
+
+    monkeypatch.setattr("src.api.chat.embed_query", _embed)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.post("/chat/stream", json=_chat_body(message="one"))
+        second = await client.post("/chat/stream", json=_chat_body(message="two"))
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["retry-after"]) >= 1
+    assert embeds == ["one"]
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_uses_profile_role_not_request_role(mock_openai, mock_supabase, monkeypatch):
+    """A child can't claim the parent limits by sending role=parent."""
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "rate_limit_child_burst", 1)
+    monkeypatch.setattr(settings, "rate_limit_parent_burst", 10)
+    mock_supabase._table_data["profiles"] = [{"role": "child"}]
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.post("/chat/stream", json=_chat_body(role="child"))
+        second = await client.post("/chat/stream", json=_chat_body(role="parent"))
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_stream_releases_concurrency_slot(mock_openai, mock_supabase):
+    """A finished stream gives its slot back."""
+    from src.services.admission import concurrency_limiter
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/chat/stream", json=_chat_body())
+
+    assert concurrency_limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_disconnect_closes_upstream_and_saves_partial(mock_openai, mock_supabase, monkeypatch):
+    """Closing the SSE stream mid-answer stops the LLM stream and keeps the partial text."""
+    import asyncio
+
+    from src.api.chat import chat_stream, chat_turns
+    from src.models.chat import ChatRequest
+    from src.services import metrics
+
+    monkeypatch.setattr(chat_turns, "linger_seconds", 0)
+    saved = []
+
+    async def _save(conversation_id, role, content, **kwargs):
+        saved.append((role, content, kwargs.get("interrupted", False)))
+        return f"msg-{len(saved)}"
+
+    closed = []
+
+    async def _slow_tokens(_messages, _model):
+        try:
+            for token in ["Osmosis", " is", " the", " movement"]:
+                yield token
+                await asyncio.sleep(0.05)
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr("src.api.chat._save_message", _save)
+    monkeypatch.setattr("src.api.chat._llm_tokens", _slow_tokens)
+    before = metrics.get_counter("chat_stream_interrupted_total", reason="disconnect")
+
+    response = await chat_stream(ChatRequest(message="What is osmosis?"), MOCK_USER, None)
+    body = response.body_iterator
+    while True:
+        event = await body.__anext__()
+        if event["event"] == "token":
+            break
+    await body.aclose()
+    for _ in range(50):
+        if any(interrupted for _, _, interrupted in saved):
+            break
+        await asyncio.sleep(0.01)
+
+    assert ("assistant", "Osmosis", True) in saved
+    assert closed == [True]
+    assert metrics.get_counter("chat_stream_interrupted_total", reason="disconnect") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_coalesced_answer_cut_upstream_is_saved_as_interrupted(mock_supabase, monkeypatch):
+    """A subscriber whose shared LLM stream is cancelled keeps a partial, interrupted answer."""
+    import asyncio
+
+    from src.api.chat import chat_stream, llm_fanout
+    from src.config import settings
+    from src.models.chat import ChatRequest
+
+    monkeypatch.setattr(settings, "coalesce_llm_streams", True)
+    saved = []
+
+    async def _save(conversation_id, role, content, **kwargs):
+        saved.append((role, content, kwargs.get("interrupted", False)))
+        return f"msg-{len(saved)}"
+
+    async def _hanging_tokens(_messages, _route):
+        yield "Osmosis"
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr("src.api.chat._save_message", _save)
+    monkeypatch.setattr("src.api.chat._llm_tokens", _hanging_tokens)
+
+    body = (await chat_stream(ChatRequest(message="What is osmosis?"), MOCK_USER, None)).body_iterator
+    while (await body.__anext__())["event"] != "token":
+        pass
+    for key in list(llm_fanout._streams):
+        llm_fanout.cancel(key)
+    rest = [event async for event in body]
+
+    assert [e["event"] for e in rest] == ["error"]
+    assert ("assistant", "Osmosis", True) in saved
+    assert ("assistant", "Osmosis", False) not in saved
+
+
+@pytest.mark.asyncio
+async def test_cancel_endpoint_stops_turn_without_grace(mock_openai, mock_supabase, monkeypatch):
+    """POST /chat/stream/{id}/cancel stops generation now, despite the resume grace period."""
+    import asyncio
+
+    from src.api.chat import cancel_stream, chat_stream, chat_turns
+    from src.models.chat import ChatRequest
+
+    monkeypatch.setattr(chat_turns, "linger_seconds", 60)
+    saved = []
+
+    async def _save(conversation_id, role, content, **kwargs):
+        saved.append((role, content, kwargs.get("interrupted", False)))
+        return f"msg-{len(saved)}"
+
+    async def _slow_tokens(_messages, _model):
+        for token in ["Osmosis", " is", " the", " movement"]:
+            yield token
+            await asyncio.sleep(0.05)
+
+    monkeypatch.setattr("src.api.chat._save_message", _save)
+    monkeypatch.setattr("src.api.chat._llm_tokens", _slow_tokens)
+
+    body = (await chat_stream(ChatRequest(message="What is osmosis?"), MOCK_USER, None)).body_iterator
+    while True:
+        event = await body.__anext__()
+        if event["event"] == "token":
+            break
+    await body.aclose()
+    stream_id = event["id"].rpartition(":")[0]
+
+    assert await cancel_stream(stream_id, MOCK_USER) == {"cancelled": True}
+    for _ in range(50):
+        if any(interrupted for _, _, interrupted in saved):
+            break
+        await asyncio.sleep(0.01)
+    assert ("assistant", "Osmosis", True) in saved
+    assert await cancel_stream(stream_id, MOCK_USER) == {"cancelled": False}
+
+
+def test_tokens_saved_is_estimated_from_completed_answers():
+    """Savings are the mean completed-answer length less what was streamed, not the token cap."""
+    from src.api.chat import _record_tokens_saved
+    from src.services import metrics
+
+    metrics.reset()
+    _record_tokens_saved(10)
+    assert metrics.get_counter("llm_tokens_saved_total") == 0
+
+    metrics.observe("chat_response_tokens", 100)
+    metrics.observe("chat_response_tokens", 60)
+    _record_tokens_saved(30)
+    _record_tokens_saved(200)
+    assert metrics.get_counter("llm_tokens_saved_total") == pytest.approx(50)
+
+
+@pytest.mark.asyncio
+async def test_reconnect_with_last_event_id_resumes_turn(mock_openai, mock_supabase, monkeypatch):
+    """A dropped client reconnecting with Last-Event-ID gets the rest of the same answer."""
+    from src.api.chat import chat_stream
+    from src.models.chat import ChatRequest
+
+    mock_openai["set_tokens"](["Osmosis", " is", " diffusion", " of", " water"])
+    req = ChatRequest(message="What is osmosis?")
+
+    first = (await chat_stream(req, MOCK_USER, None)).body_iterator
+    seen = []
+    while len([e for e in seen if e["event"] == "token"]) < 2:
+        seen.append(await first.__anext__())
+    await first.aclose()
+
+    resumed = (await chat_stream(req, MOCK_USER, seen[-1]["id"])).body_iterator
+    rest = [event async for event in resumed]
+
+    tokens = [json.loads(e["data"])["content"] for e in seen + rest if e["event"] == "token"]
+    assert "".join(tokens) == "Osmosis is diffusion of water"
+    assert rest[-1]["event"] == "done"
+    stream_id = seen[0]["id"].split(":")[0]
+    assert [e["id"] for e in rest][0] == f"{stream_id}:{len(seen) + 1}"
+    assert mock_openai["create_mock"].call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_last_event_id_starts_new_turn(mock_openai, mock_supabase):
+    """An expired or foreign Last-Event-ID is ignored and the message answered normally."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/chat/stream", json=_chat_body(), headers={"Last-Event-ID": "gone:12"},
+        )
+
+    events = parse_sse_events(response.text)
+    assert events[-1]["event"] == "done"
+
+
+@pytest.mark.asyncio
+async def test_new_conversation_written_with_first_message(mock_openai, mock_supabase, monkeypatch):
+    """A new chat inserts conversation + first message in one RPC and skips history."""
+    history_calls = []
+
+    async def _history(conversation_id):
+        history_calls.append(conversation_id)
+        return []
+
+    monkeypatch.setattr("src.api.chat._load_history", _history)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/stream", json=_chat_body(message="Hi"))
+
+    events = parse_sse_events(response.text)
+    done = [e for e in events if e["event"] == "done"][0]["data"]
+    starts = [p for name, p in mock_supabase.rpc_calls if name == "start_conversation"]
+    assert len(starts) == 1
+    assert starts[0]["p_conversation_id"] == done["conversation_id"]
+    assert starts[0]["p_content"] == "Hi"
+    assert history_calls == [None]
+
+
+@pytest.mark.asyncio
+async def test_turn_uses_routed_model(mock_openai, mock_supabase, monkeypatch):
+    """The LLM call uses the model of the routed tier."""
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "chat_model_tiers", {"fast": "fast-model"})
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/chat/stream", json=_chat_body(message="Define osmosis"))
+
+    assert mock_openai["create_mock"].call_args.kwargs["model"] == "fast-model"
+
+
+@pytest.mark.asyncio
+async def test_search_failure_answers_without_retrieval(mock_openai, mock_supabase, monkeypatch):
+    """A failing vector search degrades the turn to an answer without sources."""
+
+    async def _down(*_args, **_kwargs):
+        raise ConnectionError("search unavailable")
+
+    monkeypatch.setattr("src.api.chat.search_chunks", _down)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/stream", json=_chat_body())
+
+    events = parse_sse_events(response.text)
+    assert not [e for e in events if e["event"] == "sources"]
+    assert [e for e in events if e["event"] == "token"]
+    assert events[-1]["event"] == "done"
+    assert events[-1]["data"]["degraded"] == ["retrieval"]
+
+
+@pytest.mark.asyncio
+async def test_open_search_circuit_skips_search(mock_openai, mock_supabase, monkeypatch):
+    """While the search breaker is open, turns don't call search at all."""
+    from src.services.resilience import search_breaker
+
+    calls = []
+
+    async def _search(*_args, **_kwargs):
+        calls.append(1)
+        return []
+
+    monkeypatch.setattr("src.api.chat.search_chunks", _search)
+    for _ in range(10):
+        search_breaker.record_failure()
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/stream", json=_chat_body())
+
+    events = parse_sse_events(response.text)
+    assert calls == []
+    assert events[-1]["event"] == "done"
+    assert events[-1]["data"]["degraded"] == ["retrieval"]
+
+
+@pytest.mark.asyncio
+async def test_open_llm_circuit_fails_fast(mock_openai, mock_supabase):
+    """With the LLM breaker open the turn ends in an error event without calling the LLM."""
+    from src.services.resilience import llm_breaker
+
+    for _ in range(10):
+        llm_breaker.record_failure()
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/chat/stream", json=_chat_body())
+
+    events = parse_sse_events(response.text)
+    assert events[-1]["event"] == "error"
+    assert "llm" in events[-1]["data"]["error"]
+    mock_openai["create_mock"].assert_not_called()
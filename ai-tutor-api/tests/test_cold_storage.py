@@ -0,0 +1,118 @@
+# ai-tutor-api/tests/test_cold_storage.py
+# Tests for packing idle conversations into cold storage and restoring them.
+
+import base64
+
+from src.services.cold_storage import (
+    CODEC,
+    freeze_conversation,
+    idle_conversations,
+    pack_messages,
+    rehydrate_conversation,
+    unpack_messages,
+)
+from tests.conftest import MockQueryBuilder
+
+CONV_ID = "11111111-1111-1111-1111-111111111111"
+
+
+def _rows(n: int) -> list[dict]:
+    return [
+        {
+            "id": f"m{i}",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": "Photosynthesis converts light energy into chemical energy. " * 5,
+            "sources": [],
+            "created_at": f"2025-11-01T10:{i:02d}:00+00:00",
+            "interrupted": False,
+        }
+        for i in range(n)
+    ]
+
+
+class TestPacking:
+    def test_round_trip(self):
+        rows = _rows(4)
+        blob, raw_bytes = pack_messages(rows)
+
+        assert unpack_messages(blob) == rows
+        assert raw_bytes > len(blob)  # repetitive chat text compresses well
+
+    def test_keeps_unicode(self):
+        rows = [{"id": "m0", "role": "user", "content": "Wie geht's? – ½ × π"}]
+        blob, _ = pack_messages(rows)
+
+        assert unpack_messages(blob) == rows
+
+
+class TestFreeze:
+    def test_packs_messages_and_calls_rpc(self):
+        rows = _rows(3)
+        sb = MockQueryBuilder({"messages": rows, "freeze_conversation": True})
+
+        frozen = freeze_conversation(sb, CONV_ID, "2025-11-01T10:02:00+00:00")
+
+        assert frozen is True
+        name, params = sb.rpc_calls[0]
+        assert name == "freeze_conversation"
+        assert params["p_conversation_id"] == CONV_ID
+        assert params["p_last_active_at"] == "2025-11-01T10:02:00+00:00"
+        assert params["p_message_ids"] == ["m0", "m1", "m2"]
+        assert params["p_codec"] == CODEC
+        assert unpack_messages(base64.b64decode(params["p_payload_b64"])) == rows
+
+    def test_skips_empty_conversation(self):
+        sb = MockQueryBuilder({"messages": []})
+
+        assert freeze_conversation(sb, CONV_ID, "2025-11-01T10:00:00+00:00") is False
+        assert sb.rpc_calls == []
+
+    def test_reports_conversation_that_changed(self):
+        # The RPC refuses when last_active_at or the message set moved on
+        sb = MockQueryBuilder({"messages": _rows(2), "freeze_conversation": False})
+
+        assert freeze_conversation(sb, CONV_ID, "2025-11-01T10:01:00+00:00") is False
+
+
+class TestIdleConversations:
+    def test_first_batch_has_no_cursor(self):
+        sb = MockQueryBuilder({"conversations": [{"id": "c1", "last_active_at": "t1"}]})
+
+        assert idle_conversations(sb, 90, 200) == [{"id": "c1", "last_active_at": "t1"}]
+        assert sb.or_filters == []
+
+    def test_pages_past_the_previous_batch(self):
+        # Skipped (empty or changed) conversations must not be selected again
+        sb = MockQueryBuilder({"conversations": []})
+
+        idle_conversations(sb, 90, 200, after=("2025-11-01T10:00:00+00:00", CONV_ID))
+
+        assert sb.or_filters == [
+            'last_active_at.gt."2025-11-01T10:00:00+00:00",'
+            f'and(last_active_at.eq."2025-11-01T10:00:00+00:00",id.gt.{CONV_ID})'
+        ]
+
+
+class TestRehydrate:
+    def test_hot_conversation_is_untouched(self):
+        sb = MockQueryBuilder()
+
+        assert rehydrate_conversation(sb, CONV_ID) == 0
+        assert [name for name, _ in sb.rpc_calls] == ["cold_storage_payload"]
+
+    def test_restores_archived_rows(self):
+        rows = _rows(3)
+        blob, _ = pack_messages(rows)
+        sb = MockQueryBuilder({
+            "cold_storage_payload": {
+                "codec": CODEC,
+                "payload_b64": base64.b64encode(blob).decode("ascii"),
+                "message_count": 3,
+            },
+            "thaw_conversation": 3,
+        })
+
+        assert rehydrate_conversation(sb, CONV_ID) == 3
+        name, params = sb.rpc_calls[1]
+        assert name == "thaw_conversation"
+        assert params == {"p_conversation_id": CONV_ID, "p_messages": rows}
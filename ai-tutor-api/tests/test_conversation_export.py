@@ -0,0 +1,195 @@
+# ai-tutor-api/tests/test_conversation_export.py
+# Tests for the batched NDJSON conversation export.
+
+import base64
+import gzip
+import json
+
+import pytest
+import zstandard
+
+from src.config import settings
+from src.services.cold_storage import CODEC, ArchiveReader, pack_messages
+from src.services.conversation_export import export_ndjson, gzip_stream
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+class ScriptedRpc:
+    """Supabase stand-in that pages export RPCs by their keyset parameters."""
+
+    def __init__(self, conversations: list[dict], messages: dict[str, list[dict]]):
+        self.conversations = conversations
+        self.messages = messages
+        self.calls: list[tuple[str, dict]] = []
+        self._pending: tuple[str, dict] | None = None
+
+    def schema(self, _name):
+        return self
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        self._pending = (name, params)
+        return self
+
+    def execute(self):
+        name, params = self._pending
+        if name == "export_conversations":
+            rows = self.conversations
+        elif name == "export_user_messages":
+            rows = [
+                {"conversation_id": cid, **row}
+                for cid in sorted(self.messages)
+                for row in self.messages[cid]
+            ]
+        else:
+            rows = None
+        if rows is not None and params.get("p_after_id") is not None:
+            ids = [r["id"] for r in rows]
+            rows = rows[ids.index(params["p_after_id"]) + 1 :]
+        if rows is not None and "p_limit" in params:
+            rows = rows[: params["p_limit"]]
+        return type("Result", (), {"data": rows})()
+
+
+def _conversation(cid: str) -> dict:
+    return {"id": cid, "title": cid, "created_at": f"2026-03-01T10:00:0{cid[-1]}+00:00"}
+
+
+def _messages(prefix: str, n: int) -> list[dict]:
+    return [
+        {"id": f"{prefix}-{i}", "role": "user", "content": "hi", "created_at": f"2026-03-01T10:{i:02d}:00+00:00"}
+        for i in range(n)
+    ]
+
+
+async def _collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.mark.asyncio
+async def test_pages_through_conversations_and_messages():
+    sb = ScriptedRpc(
+        [_conversation("c1"), _conversation("c2"), _conversation("c3")],
+        {"c1": _messages("a", 5), "c2": _messages("b", 2), "c3": _messages("c", 1)},
+    )
+
+    body = await _collect(export_ndjson(sb, USER_ID, batch_size=2))
+
+    lines = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert [r["id"] for r in lines if r["type"] == "conversation"] == ["c1", "c2", "c3"]
+    assert [r["id"] for r in lines if r["type"] == "message"] == [
+        "a-0", "a-1", "a-2", "a-3", "a-4", "b-0", "b-1", "c-0",
+    ]
+    assert lines[-1] == {"type": "end", "conversations": 3, "messages": 8}
+    # No request ever asked for more than one batch
+    assert all(params["p_limit"] == 2 for _, params in sb.calls if "p_limit" in params)
+    # One keyset walk over all messages, not a query per conversation
+    message_calls = [p for name, p in sb.calls if name == "export_user_messages"]
+    assert [(p["p_after_conversation_id"], p["p_after_id"]) for p in message_calls] == [
+        (None, None), ("c1", "a-1"), ("c1", "a-3"), ("c2", "b-0"), ("c3", "c-0"),
+    ]
+    assert "export_messages" not in [name for name, _ in sb.calls]
+
+
+@pytest.mark.asyncio
+async def test_skips_messages_of_conversations_not_exported():
+    sb = ScriptedRpc(
+        [_conversation("c1"), _conversation("c3")],
+        {"c1": _messages("a", 1), "c2": _messages("b", 3), "c3": _messages("c", 2)},
+    )
+
+    body = await _collect(export_ndjson(sb, USER_ID, batch_size=2))
+
+    lines = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert [r["id"] for r in lines if r["type"] == "message"] == ["a-0", "c-0", "c-1"]
+    assert lines[-1] == {"type": "end", "conversations": 2, "messages": 3}
+
+
+class ChunkedArchive(ScriptedRpc):
+    """Serves a cold archive through cold_storage_chunk, a slice per call."""
+
+    def __init__(self, conversations, blob: bytes):
+        super().__init__(conversations, {})
+        self.blob = blob
+
+    def execute(self):
+        name, params = self._pending
+        if name == "cold_storage_chunk":
+            chunk = self.blob[params["p_offset"] : params["p_offset"] + params["p_length"]]
+            data = {"codec": CODEC, "size": len(self.blob), "chunk_b64": base64.b64encode(chunk).decode()}
+            return type("Result", (), {"data": data})()
+        return super().execute()
+
+
+@pytest.mark.asyncio
+async def test_cold_archive_is_streamed_in_slices(monkeypatch):
+    monkeypatch.setattr(settings, "export_cold_chunk_bytes", 64)
+    rows = [{"id": f"m-{i}", "role": "user", "content": f"question {i} " * 5} for i in range(40)]
+    blob, _ = pack_messages(rows)
+    sb = ChunkedArchive([{**_conversation("c1"), "cold_stored_at": "2026-01-01T00:00:00+00:00"}], blob)
+
+    body = await _collect(export_ndjson(sb, USER_ID, batch_size=7))
+
+    lines = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert [r["id"] for r in lines if r["type"] == "message"] == [r["id"] for r in rows]
+    chunk_calls = [p for name, p in sb.calls if name == "cold_storage_chunk"]
+    assert len(chunk_calls) == -(-len(blob) // 64)
+    assert all(p["p_length"] == 64 for p in chunk_calls)
+
+
+@pytest.mark.asyncio
+async def test_cold_archive_reader_is_closed_when_export_stops_early(monkeypatch):
+    monkeypatch.setattr(settings, "export_cold_chunk_bytes", 64)
+    closed = []
+
+    class TrackingReader(ArchiveReader):
+        def close(self):
+            closed.append(True)
+            super().close()
+
+    monkeypatch.setattr("src.services.conversation_export.ArchiveReader", TrackingReader)
+    rows = [{"id": f"m-{i}", "role": "user", "content": f"question {i} " * 5} for i in range(40)]
+    blob, _ = pack_messages(rows)
+    sb = ChunkedArchive([{**_conversation("c1"), "cold_stored_at": "2026-01-01T00:00:00+00:00"}], blob)
+
+    stream = export_ndjson(sb, USER_ID, batch_size=7)
+    await anext(stream)  # conversation line
+    await anext(stream)  # first message
+    await stream.aclose()
+
+    assert closed == [True]
+
+
+def test_archive_reader_rejects_a_truncated_archive():
+    blob, _ = pack_messages([{"id": "m-1", "content": "x" * 200}])
+    reader = ArchiveReader()
+    raw = zstandard.ZstdDecompressor().decompress(blob)
+    truncated = zstandard.ZstdCompressor().compress(raw[:-10])
+    reader.feed(truncated)
+
+    with pytest.raises(ValueError):
+        reader.finish()
+
+
+@pytest.mark.asyncio
+async def test_failure_mid_stream_is_reported_in_band():
+    sb = ScriptedRpc([_conversation("c1")], {})
+    sb.messages = None  # export_user_messages raises TypeError
+
+    body = await _collect(export_ndjson(sb, USER_ID, batch_size=2))
+
+    lines = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert lines[0]["type"] == "conversation"
+    assert lines[-1]["type"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_gzip_stream_round_trips():
+    async def chunks():
+        for i in range(100):
+            yield f'{{"n": {i}}}\n'.encode()
+
+    compressed = await _collect(gzip_stream(chunks(), level=6))
+
+    assert gzip.decompress(compressed).decode().count("\n") == 100
@@ -1,10 +1,15 @@
 # ai-tutor-api/tests/test_conversations.py
 
+import base64
+import gzip
+import json
+
 import pytest
 from httpx import ASGITransport, AsyncClient
 
 from src.main import app
 from src.auth import get_current_user
+from src.services.cold_storage import CODEC, pack_messages
 
 
 MOCK_USER = {
@@ -80,3 +85,431 @@ async def test_delete_not_found():
         )
 
     assert response.status_code == 404
+
+
+# ---------------------------------------------------------------------------
+# Keyset pagination + first-page cache
+# ---------------------------------------------------------------------------
+
+
+def _conversation_rows(n: int) -> list[dict]:
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "title": f"Chat {i}",
+            "message_count": 2,
+            "last_active_at": f"2026-03-{20 - i:02d}T10:00:00+00:00",
+            "created_at": "2026-03-01T10:00:00+00:00",
+            "subject_id": None,
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture()
+def conversations_db(monkeypatch):
+    from tests.conftest import MockQueryBuilder
+
+    builder = MockQueryBuilder()
+    monkeypatch.setattr("src.api.conversations.create_client", lambda _url, _key: builder)
+    return builder
+
+
+async def _get(path: str, **kwargs):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_list_returns_cursor_for_next_page(conversations_db):
+    """The page fetches limit + 1 rows and returns a cursor for the last row shown."""
+    conversations_db._table_data["list_conversations"] = _conversation_rows(3)
+
+    response = await _get("/conversations", params={"limit": 2})
+
+    data = response.json()
+    assert [c["id"] for c in data["conversations"]] == [
+        "00000000-0000-0000-0000-000000000000",
+        "00000000-0000-0000-0000-000000000001",
+    ]
+    assert data["has_more"] is True
+    name, params = conversations_db.rpc_calls[0]
+    assert name == "list_conversations"
+    assert params["p_limit"] == 3
+    assert params["p_before_active_at"] is None
+
+    conversations_db._table_data["list_conversations"] = _conversation_rows(3)[2:]
+    response = await _get("/conversations", params={"limit": 2, "cursor": data["next_cursor"]})
+
+    _, params = conversations_db.rpc_calls[1]
+    assert params["p_before_active_at"] == "2026-03-19T10:00:00+00:00"
+    assert params["p_before_id"] == "00000000-0000-0000-0000-000000000001"
+    assert response.json()["has_more"] is False
+    assert response.json()["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_returns_400(conversations_db):
+    response = await _get("/conversations", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_first_page_is_cached_until_invalidated(conversations_db):
+    """Repeat sidebar loads skip the database until the user's conversations change."""
+    from src.services.conversation_cache import conversation_list_cache
+
+    conversations_db._table_data["list_conversations"] = _conversation_rows(1)
+
+    await _get("/conversations")
+    await _get("/conversations")
+    assert len(conversations_db.rpc_calls) == 1
+
+    conversation_list_cache.invalidate(MOCK_USER["user_id"])
+    await _get("/conversations")
+    assert len(conversations_db.rpc_calls) == 2
+
+
+class TestConversationListCache:
+    def test_page_read_before_invalidation_is_not_stored(self):
+        from src.services.conversation_cache import ConversationListCache
+
+        cache = ConversationListCache()
+        ticket = cache.begin()
+        cache.invalidate("u1")
+        cache.put("u1", 20, "stale", ticket)
+        assert cache.get("u1", 20) is None
+
+        cache.put("u1", 20, "fresh", cache.begin())
+        assert cache.get("u1", 20) == "fresh"
+        assert cache.get("u1", 10) is None
+
+    def test_each_page_size_expires_on_its_own(self, monkeypatch):
+        from src.services import conversation_cache
+        from src.services.conversation_cache import ConversationListCache
+
+        now = [100.0]
+        monkeypatch.setattr(conversation_cache.time, "monotonic", lambda: now[0])
+        cache = ConversationListCache(ttl_seconds=30)
+        cache.put("u1", 20, "twenty", cache.begin())
+        now[0] += 25
+        cache.put("u1", 10, "ten", cache.begin())
+        now[0] += 10
+
+        assert cache.get("u1", 20) is None
+        assert cache.get("u1", 10) == "ten"
+
+
+# ---------------------------------------------------------------------------
+# Paged, conditional message history
+# ---------------------------------------------------------------------------
+
+CONV_ID = "00000000-0000-0000-0000-00000000000a"
+
+
+def _messages_page(**overrides) -> dict:
+    page = {
+        "etag": "abc123",
+        "title": "Osmosis",
+        "last_active_at": "2026-03-20T10:00:00+00:00",
+        "has_more": True,
+        "messages": [
+            {"id": "m2", "role": "user", "content": "Hi", "created_at": "2026-03-20T09:59:00+00:00"},
+            {
+                "id": "m3", "role": "assistant", "content": "Hello",
+                "created_at": "2026-03-20T10:00:00+00:00", "interrupted": False,
+            },
+        ],
+    }
+    page.update(overrides)
+    return page
+
+
+@pytest.mark.asyncio
+async def test_messages_page_with_etag_and_cursor(conversations_db):
+    """The newest page comes back with an ETag and a cursor to the older page."""
+    conversations_db._table_data["conversation_messages_page"] = _messages_page()
+
+    response = await _get(f"/conversations/{CONV_ID}/messages", params={"limit": 2})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"abc123"'
+    data = response.json()
+    assert [m["id"] for m in data["messages"]] == ["m2", "m3"]
+    assert data["has_more"] is True
+    assert data["next_before"] == "m2"
+    name, params = conversations_db.rpc_calls[0]
+    assert name == "conversation_messages_page"
+    assert params["p_user_id"] == MOCK_USER["user_id"]  # ownership checked in the RPC
+    assert params["p_limit"] == 2
+
+
+@pytest.mark.asyncio
+async def test_unchanged_conversation_returns_304(conversations_db):
+    conversations_db._table_data["conversation_messages_page"] = {
+        "etag": "abc123", "not_modified": True,
+    }
+
+    response = await _get(
+        f"/conversations/{CONV_ID}/messages", headers={"If-None-Match": 'W/"abc123"'}
+    )
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"abc123"'
+    _, params = conversations_db.rpc_calls[0]
+    assert params["p_if_none_match"] == ["abc123"]
+
+
+@pytest.mark.asyncio
+async def test_messages_of_other_users_conversation_is_403(conversations_db):
+    conversations_db._table_data["conversation_messages_page"] = {"forbidden": True}
+
+    response = await _get(f"/conversations/{CONV_ID}/messages")
+
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_messages_of_missing_conversation_is_404(conversations_db):
+    # No table data: the RPC returns nothing, as for an unknown conversation
+    response = await _get(f"/conversations/{CONV_ID}/messages")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_cold_conversation_is_restored_before_reading(conversations_db, monkeypatch):
+    """A conversation in cold storage is rehydrated, then its page is read."""
+    conversations_db._table_data["conversation_messages_page"] = {"etag": "abc123", "cold": True}
+    restored = []
+
+    def fake_rehydrate(_sb, conversation_id):
+        restored.append(conversation_id)
+        conversations_db._table_data["conversation_messages_page"] = _messages_page()
+        return 3
+
+    monkeypatch.setattr("src.api.conversations.rehydrate_conversation", fake_rehydrate)
+
+    response = await _get(f"/conversations/{CONV_ID}/messages", params={"limit": 2})
+
+    assert response.status_code == 200
+    assert restored == [CONV_ID]
+    assert [m["id"] for m in response.json()["messages"]] == ["m2", "m3"]
+    assert [name for name, _ in conversations_db.rpc_calls] == [
+        "conversation_messages_page", "conversation_messages_page",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_invalid_before_is_400(conversations_db):
+    response = await _get(f"/conversations/{CONV_ID}/messages", params={"before": "nope"})
+
+    assert response.status_code == 400
+    assert conversations_db.rpc_calls == []
+
+
+# ---------------------------------------------------------------------------
+# Bulk delete / archive
+# ---------------------------------------------------------------------------
+
+OTHER_ID = "00000000-0000-0000-0000-00000000000b"
+MISSING_ID = "00000000-0000-0000-0000-00000000000c"
+
+
+async def _request(method: str, path: str, **kwargs):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request(method, path, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_is_one_rpc(conversations_db):
+    """Ownership check and cascading delete for the whole list happen in one call."""
+    from src.services.conversation_cache import conversation_list_cache
+
+    conversation_list_cache.put(MOCK_USER["user_id"], 20, "cached", conversation_list_cache.begin())
+    conversations_db._table_data["bulk_conversation_action"] = {
+        "affected": [CONV_ID], "forbidden": [OTHER_ID], "not_found": [MISSING_ID],
+    }
+
+    response = await _request(
+        "POST", "/conversations/bulk",
+        json={"action": "delete", "conversation_ids": [CONV_ID, OTHER_ID, MISSING_ID, CONV_ID]},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "action": "delete",
+        "affected": [CONV_ID],
+        "forbidden": [OTHER_ID],
+        "not_found": [MISSING_ID],
+    }
+    assert len(conversations_db.rpc_calls) == 1
+    name, params = conversations_db.rpc_calls[0]
+    assert name == "bulk_conversation_action"
+    assert params["p_conversation_ids"] == [CONV_ID, OTHER_ID, MISSING_ID]
+    assert params["p_action"] == "delete"
+    assert conversation_list_cache.get(MOCK_USER["user_id"], 20) is None
+
+
+@pytest.mark.asyncio
+async def test_bulk_rejects_unknown_action_and_bad_ids(conversations_db):
+    bad_action = await _request(
+        "POST", "/conversations/bulk", json={"action": "purge", "conversation_ids": [CONV_ID]},
+    )
+    bad_id = await _request(
+        "POST", "/conversations/bulk", json={"action": "archive", "conversation_ids": ["x"]},
+    )
+    empty = await _request(
+        "POST", "/conversations/bulk", json={"action": "archive", "conversation_ids": []},
+    )
+
+    assert {bad_action.status_code, bad_id.status_code, empty.status_code} == {422}
+    assert conversations_db.rpc_calls == []
+
+
+@pytest.mark.asyncio
+async def test_single_delete_maps_outcome_to_status(conversations_db):
+    conversations_db._table_data["bulk_conversation_action"] = {
+        "affected": [], "forbidden": [CONV_ID], "not_found": [],
+    }
+    forbidden = await _request("DELETE", f"/conversations/{CONV_ID}")
+
+    conversations_db._table_data["bulk_conversation_action"] = {
+        "affected": [CONV_ID], "forbidden": [], "not_found": [],
+    }
+    deleted = await _request("DELETE", f"/conversations/{CONV_ID}")
+
+    assert forbidden.status_code == 403
+    assert deleted.json() == {"deleted": True}
+
+
+@pytest.mark.asyncio
+async def test_list_archived_conversations(conversations_db):
+    conversations_db._table_data["list_conversations"] = _conversation_rows(1)
+
+    await _get("/conversations", params={"archived": "true"})
+    await _get("/conversations", params={"archived": "true"})
+
+    assert [p["p_archived"] for _, p in conversations_db.rpc_calls] == [True, True]  # not cached
+
+
+# ---------------------------------------------------------------------------
+# Full-text search
+# ---------------------------------------------------------------------------
+
+
+def _search_rows(n: int) -> list[dict]:
+    return [
+        {
+            "message_id": f"m{i}",
+            "conversation_id": CONV_ID,
+            "conversation_title": "Osmosis",
+            "role": "assistant",
+            "created_at": "2026-03-20T10:00:00+00:00",
+            "rank": 1.0 - i / 10,
+            "snippet": "**Osmosis** is the movement of water...",
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_returns_ranked_page(conversations_db):
+    conversations_db._table_data["search_messages"] = _search_rows(3)
+
+    response = await _get("/conversations/search", params={"q": "osmosis", "limit": 2})
+
+    data = response.json()
+    assert [r["message_id"] for r in data["results"]] == ["m0", "m1"]
+    assert data["has_more"] is True
+    assert data["next_offset"] == 2
+    name, params = conversations_db.rpc_calls[0]
+    assert name == "search_messages"
+    assert params == {
+        "p_user_id": MOCK_USER["user_id"], "p_query": "osmosis", "p_limit": 3, "p_offset": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_search_reports_unsearched_cold_conversations(conversations_db):
+    """Cold messages aren't searched (and not thawed); the first page says how many are left out."""
+    conversations_db._table_data["search_messages"] = _search_rows(1)
+    conversations_db._table_data["conversations"] = [{"id": "cold-1"}, {"id": "cold-2"}]
+
+    first = (await _get("/conversations/search", params={"q": "osmosis"})).json()
+    later = (await _get("/conversations/search", params={"q": "osmosis", "offset": 20})).json()
+
+    assert first["cold_conversations"] == 2
+    assert later["cold_conversations"] == 0
+    assert {name for name, _ in conversations_db.rpc_calls} == {"search_messages"}
+
+
+@pytest.mark.asyncio
+async def test_search_requires_a_query(conversations_db):
+    response = await _get("/conversations/search", params={"q": "a"})
+
+    assert response.status_code == 422
+    assert conversations_db.rpc_calls == []
+
+
+def _export_db(db) -> None:
+    blob, _ = pack_messages([
+        {"id": "c1", "role": "user", "content": "Old question", "created_at": "2025-10-01T10:00:00+00:00"},
+    ])
+    db._table_data.update({
+        "export_conversations": [
+            {"id": CONV_ID, "title": "Osmosis", "message_count": 2,
+             "created_at": "2026-03-01T10:00:00+00:00", "archived_at": None, "cold_stored_at": None},
+            {"id": OTHER_ID, "title": "Old", "message_count": 1,
+             "created_at": "2025-10-01T10:00:00+00:00", "archived_at": "2025-12-01T10:00:00+00:00",
+             "cold_stored_at": "2026-01-01T10:00:00+00:00"},
+        ],
+        "export_user_messages": [
+            {"conversation_id": CONV_ID, "id": "m1", "role": "user", "content": "What is osmosis?", "sources": [],
+             "created_at": "2026-03-01T10:00:00+00:00"},
+            {"conversation_id": CONV_ID, "id": "m2", "role": "assistant", "content": "Osmosis is…", "sources": [],
+             "created_at": "2026-03-01T10:00:05+00:00"},
+        ],
+        "cold_storage_chunk": {
+            "codec": CODEC, "size": len(blob), "chunk_b64": base64.b64encode(blob).decode("ascii"),
+        },
+    })
+
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson_including_cold_conversations(conversations_db):
+    _export_db(conversations_db)
+
+    response = await _get("/conversations/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "attachment" in response.headers["content-disposition"]
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["type"], r.get("id")) for r in lines] == [
+        ("conversation", CONV_ID), ("message", "m1"), ("message", "m2"),
+        ("conversation", OTHER_ID), ("message", "c1"),
+        ("end", None),
+    ]
+    assert lines[3]["archived"] is True
+    assert lines[-1] == {"type": "end", "conversations": 2, "messages": 3}
+    # The cold conversation is read from its archive, not restored
+    assert "thaw_conversation" not in [name for name, _ in conversations_db.rpc_calls]
+    assert all(
+        params["p_user_id"] == MOCK_USER["user_id"]
+        for name, params in conversations_db.rpc_calls if name.startswith("export_")
+    )
+
+
+@pytest.mark.asyncio
+async def test_export_gzip(conversations_db):
+    _export_db(conversations_db)
+
+    response = await _get("/conversations/export", params={"gzip": "true"})
+
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith('.ndjson.gz"')
+    lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+    assert json.loads(lines[-1])["messages"] == 3
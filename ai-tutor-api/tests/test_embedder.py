@@ -0,0 +1,81 @@
+# tests/test_embedder.py
+# Unit tests for query embedding micro-batching.
+
+import asyncio
+
+import pytest
+
+from src.services import embedder
+from src.services.embedder import QueryBatcher
+
+
+@pytest.fixture()
+def fake_embed_batch(monkeypatch):
+    """Replace the API call; records each batch and returns [len(text)] vectors."""
+    batches: list[list[str]] = []
+
+    async def _embed_batch(_client, texts, _model=None):
+        batches.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(embedder, "_embed_batch", _embed_batch)
+    monkeypatch.setattr(embedder, "_get_client", lambda _provider=None: None)
+    return batches
+
+
+class TestQueryBatcher:
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_share_one_call(self, fake_embed_batch):
+        batcher = QueryBatcher(max_wait_seconds=0.01, max_size=64)
+
+        results = await asyncio.gather(
+            batcher.embed("a"), batcher.embed("bb"), batcher.embed("ccc"),
+        )
+
+        assert results == [[1.0], [2.0], [3.0]]
+        assert fake_embed_batch == [["a", "bb", "ccc"]]
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_without_waiting(self, fake_embed_batch):
+        batcher = QueryBatcher(max_wait_seconds=10, max_size=2)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.embed("a"), batcher.embed("bb")), timeout=1,
+        )
+
+        assert results == [[1.0], [2.0]]
+        assert len(fake_embed_batch) == 1
+
+    @pytest.mark.asyncio
+    async def test_duplicate_texts_embedded_once(self, fake_embed_batch):
+        batcher = QueryBatcher(max_wait_seconds=0.01, max_size=64)
+
+        results = await asyncio.gather(batcher.embed("same"), batcher.embed("same"))
+
+        assert results == [[4.0], [4.0]]
+        assert fake_embed_batch == [["same"]]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self, monkeypatch):
+        async def _fail(_client, _texts, _model=None):
+            raise RuntimeError("rate limited")
+
+        monkeypatch.setattr(embedder, "_embed_batch", _fail)
+        monkeypatch.setattr(embedder, "_get_client", lambda _provider=None: None)
+        batcher = QueryBatcher(max_wait_seconds=0.01, max_size=64)
+
+        results = await asyncio.gather(
+            batcher.embed("a"), batcher.embed("b"), return_exceptions=True,
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_break_batch(self, fake_embed_batch):
+        batcher = QueryBatcher(max_wait_seconds=0.01, max_size=64)
+
+        cancelled = asyncio.create_task(batcher.embed("a"))
+        kept = asyncio.create_task(batcher.embed("bb"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        assert await kept == [2.0]
@@ -0,0 +1,99 @@
+# tests/test_exam_questions.py
+# Unit tests for expanding key_points into rag.exam_questions rows.
+
+import pytest
+
+from src.services.exam_questions import (
+    build_exam_question_rows,
+    locate_question_chunks,
+    normalise_question_ref,
+)
+
+
+class TestNormaliseQuestionRef:
+    @pytest.mark.parametrize(
+        "label,expected",
+        [
+            ("Q3b", "3b"),
+            ("Q3(b)(ii)", "3bii"),
+            ("Question 3 (b)", "3b"),
+            ("03.2", "3.2"),
+            ("Q10", "10"),
+            ("q1a", "1a"),
+        ],
+    )
+    def test_valid_labels(self, label, expected):
+        assert normalise_question_ref(label) == expected
+
+    @pytest.mark.parametrize("label", ["", "Section A", "Grade 9", "Q123"])
+    def test_invalid_labels(self, label):
+        assert normalise_question_ref(label) is None
+
+
+CHUNKS = [
+    (0, "AQA GCSE Biology Paper 1 Higher Tier. Answer all questions."),
+    (1, "0 1 Cells. 01.1 Name the structure that controls the cell."),
+    (2, "01.2 Describe the function of ribosomes. [2 marks]"),
+    (3, "0 2 Photosynthesis. 02.1 Write the word equation."),
+    (4, "Figure 3 shows a leaf. Continue your answer."),
+    (5, "02.2 Explain why the rate increases. [4 marks]"),
+]
+
+
+class TestLocateQuestionChunks:
+    def test_ranges_follow_question_order(self):
+        ranges = locate_question_chunks(["1.1", "1.2", "2.1", "2.2"], CHUNKS)
+        assert ranges["1.1"] == (1, 1)
+        assert ranges["1.2"] == (2, 2)
+        assert ranges["2.1"] == (3, 4)
+        assert ranges["2.2"] == (5, 5)
+
+    def test_missing_question_omitted(self):
+        ranges = locate_question_chunks(["1.1", "9.9"], CHUNKS)
+        assert "9.9" not in ranges
+        assert ranges["1.1"][0] == 1
+
+    def test_lettered_parts(self):
+        chunks = [(0, "Question 3 (a) Define osmosis."), (1, "(b) Explain the results.")]
+        ranges = locate_question_chunks(["3a"], chunks)
+        assert ranges["3a"] == (0, 1)
+
+
+class TestBuildExamQuestionRows:
+    def test_builds_rows_for_question_paper(self):
+        key_points = [
+            {"question": "Q01.1", "topic": "Cells", "marks": 1, "command_word": "name"},
+            {"question": "Q01.2", "topic": "Cells", "marks": "2", "command_word": "describe"},
+        ]
+        rows = build_exam_question_rows(
+            "doc-1", key_points, CHUNKS,
+            subject_id="sub-1", doc_type="qp", year=2023, session="jun", paper_number="p1",
+        )
+
+        assert [r["question_ref"] for r in rows] == ["1.1", "1.2"]
+        assert rows[1]["marks"] == 2
+        assert rows[0]["question_label"] == "Q01.1"
+        assert rows[0]["chunk_start"] == 1
+        assert rows[0]["session"] == "jun"
+
+    def test_mark_scheme_keeps_extra_fields(self):
+        key_points = [
+            {"question": "Q2.2", "key_criteria": "Light intensity", "common_errors": "units"},
+        ]
+        rows = build_exam_question_rows(
+            "doc-2", key_points, CHUNKS, None, "ms", 2023, "jun", "p1",
+        )
+        assert rows[0]["key_criteria"] == "Light intensity"
+        assert rows[0]["details"] == {"common_errors": "units"}
+
+    def test_skips_non_question_doc_types(self):
+        rows = build_exam_question_rows(
+            "doc-3", [{"question": "Q1"}], CHUNKS, None, "rev", None, None, None,
+        )
+        assert rows == []
+
+    def test_skips_duplicates_and_unparseable(self):
+        key_points = [{"question": "Q1a"}, {"question": "1(a)"}, {"question": "Section B"}, "bad"]
+        rows = build_exam_question_rows("doc-4", key_points, [], None, "qp", None, None, None)
+        assert [r["question_ref"] for r in rows] == ["1a"]
+        assert rows[0]["chunk_start"] is None
@@ -0,0 +1,203 @@
+# tests/test_followup.py
+# Unit tests for follow-up turn retrieval reuse.
+
+import pytest
+
+from src.services.followup import (
+    TurnCache,
+    cosine_similarity,
+    decide_reuse,
+    is_referential_followup,
+    turn_from_sources,
+)
+from src.services.retrieval import RetrievedChunk
+
+
+def _chunk(idx: int, similarity: float = 0.8, subject_id: str | None = None) -> RetrievedChunk:
+    return RetrievedChunk(
+        id=f"chunk-{idx}",
+        document_id="doc-1",
+        content="Photosynthesis converts light energy...",
+        similarity=similarity,
+        document_title="AQA Biology Revision",
+        source_type="revision",
+        subject_id=subject_id,
+        topic_id=None,
+        chunk_metadata={},
+        doc_metadata={},
+    )
+
+
+SCOPE = ("sub-1", None, None, None, None)
+
+
+def _cached_turn(embedding: list[float], message_id: str = "msg-1"):
+    cache = TurnCache()
+    cache.put("conv-1", message_id, embedding, [_chunk(1), _chunk(2)], SCOPE)
+    return cache.get("conv-1")
+
+
+def _history(message_id: str = "msg-1", sources: list[dict] | None = None) -> list[dict]:
+    return [
+        {"id": "msg-0", "role": "user", "content": "What is photosynthesis?", "sources": []},
+        {"id": message_id, "role": "assistant", "content": "It is...", "sources": sources or []},
+    ]
+
+
+class TestCosineSimilarity:
+    def test_identical(self):
+        assert cosine_similarity([1.0, 2.0], [1.0, 2.0]) == pytest.approx(1.0)
+
+    def test_orthogonal(self):
+        assert cosine_similarity([1.0, 0.0], [0.0, 1.0]) == pytest.approx(0.0)
+
+    def test_zero_vector(self):
+        assert cosine_similarity([0.0, 0.0], [1.0, 1.0]) == 0.0
+
+
+class TestIsReferentialFollowup:
+    def test_short_referential(self):
+        assert is_referential_followup("Can you explain that more simply?")
+
+    def test_new_question(self):
+        assert not is_referential_followup("What is the function of mitochondria?")
+
+    @pytest.mark.parametrize("message", [
+        "Explain that again",
+        "Can you give an example of it?",
+        "Give me another example",
+        "Why is that?",
+        "What do you mean?",
+    ])
+    def test_anaphora(self, message):
+        assert is_referential_followup(message)
+
+    @pytest.mark.parametrize("message", [
+        "Why is the sky blue?",
+        "Is it true that enzymes denature?",
+        "Give an example of osmosis",
+        "What does this word mean: isotope",
+    ])
+    def test_short_new_questions(self, message):
+        assert not is_referential_followup(message)
+
+    def test_long_message_not_referential(self):
+        long_msg = "Explain that " + "word " * 20
+        assert not is_referential_followup(long_msg)
+
+
+class TestTurnCache:
+    def test_expired_entry_dropped(self):
+        cache = TurnCache(ttl_seconds=-1)
+        cache.put("conv-1", "msg-1", [1.0], [], SCOPE)
+        assert cache.get("conv-1") is None
+
+    def test_evicts_oldest(self):
+        cache = TurnCache(max_size=1)
+        cache.put("conv-1", "msg-1", [1.0], [], SCOPE)
+        cache.put("conv-2", "msg-2", [1.0], [], SCOPE)
+        assert cache.get("conv-1") is None
+        assert cache.get("conv-2") is not None
+
+
+class TestDecideReuse:
+    def test_no_previous_turn(self):
+        decision = decide_reuse(None, _history(), [1.0, 0.0], "Hi", SCOPE)
+        assert not decision.reuse
+        assert decision.reason == "miss"
+
+    def test_similar_query_reuses(self):
+        prev = _cached_turn([1.0, 0.0])
+        decision = decide_reuse(prev, _history(), [0.99, 0.05], "What's photosynthesis", SCOPE)
+        assert decision.reuse
+        assert decision.reason == "similar"
+
+    def test_referential_followup_reuses(self):
+        prev = _cached_turn([1.0, 0.0])
+        decision = decide_reuse(
+            prev, _history(), [0.6, 0.8], "Can you explain that more simply?", SCOPE,
+        )
+        assert decision.reuse
+        assert decision.reason == "referential"
+
+    def test_referential_followup_below_floor_searches(self):
+        prev = _cached_turn([1.0, 0.0])
+        decision = decide_reuse(prev, _history(), [0.0, 1.0], "Explain that again", SCOPE)
+        assert not decision.reuse
+        assert decision.reason == "dissimilar"
+
+    def test_dissimilar_query_searches(self):
+        prev = _cached_turn([1.0, 0.0])
+        decision = decide_reuse(
+            prev, _history(), [0.0, 1.0], "How do vaccines produce immunity in humans?", SCOPE,
+        )
+        assert not decision.reuse
+        assert decision.reason == "dissimilar"
+
+    def test_scope_change_searches(self):
+        prev = _cached_turn([1.0, 0.0])
+        other_scope = ("sub-2", None, None, None, None)
+        decision = decide_reuse(prev, _history(), [1.0, 0.0], "Same again", other_scope)
+        assert not decision.reuse
+        assert decision.reason == "scope_changed"
+
+    def test_cache_for_older_message_is_stale(self):
+        prev = _cached_turn([1.0, 0.0], message_id="msg-old")
+        decision = decide_reuse(prev, _history(), [1.0, 0.0], "Same again", SCOPE)
+        assert not decision.reuse
+        assert decision.reason == "stale"
+
+    def test_persisted_sources_must_match(self):
+        prev = _cached_turn([1.0, 0.0])
+        history = _history(sources=[{"chunk_id": "chunk-9"}])
+        decision = decide_reuse(prev, history, [1.0, 0.0], "Same again", SCOPE)
+        assert not decision.reuse
+        assert decision.reason == "stale"
+
+
+class TestRebuiltTurn:
+    """Turns rebuilt from persisted sources after a turn-cache miss."""
+
+    SOURCES = [
+        {"chunk_id": "chunk-1", "similarity": 0.6},
+        {"chunk_id": "chunk-2", "similarity": 0.5},
+    ]
+
+    def _rebuilt(self, *chunks):
+        return turn_from_sources(_history(sources=self.SOURCES)[-1], list(chunks))
+
+    def test_chunks_as_close_as_before_reuse(self):
+        prev = self._rebuilt(_chunk(1, 0.61, "sub-1"), _chunk(2, 0.5, "sub-1"))
+        history = _history(sources=self.SOURCES)
+        decision = decide_reuse(prev, history, [1.0, 0.0], "What's photosynthesis", SCOPE)
+        assert decision.reuse
+        assert decision.reason == "similar"
+        assert decision.similarity == pytest.approx(1.0)
+
+    def test_referential_followup_reuses(self):
+        prev = self._rebuilt(_chunk(1, 0.4, "sub-1"), _chunk(2, 0.3, "sub-1"))
+        history = _history(sources=self.SOURCES)
+        decision = decide_reuse(prev, history, [1.0, 0.0], "Explain that again", SCOPE)
+        assert decision.reuse
+        assert decision.reason == "referential"
+
+    def test_new_question_searches(self):
+        prev = self._rebuilt(_chunk(1, 0.1, "sub-1"), _chunk(2, 0.1, "sub-1"))
+        history = _history(sources=self.SOURCES)
+        decision = decide_reuse(prev, history, [1.0, 0.0], "How do vaccines work?", SCOPE)
+        assert not decision.reuse
+        assert decision.reason == "dissimilar"
+
+    def test_chunk_outside_request_scope_searches(self):
+        prev = self._rebuilt(_chunk(1, 0.6, "sub-1"), _chunk(2, 0.5, "sub-2"))
+        history = _history(sources=self.SOURCES)
+        decision = decide_reuse(prev, history, [1.0, 0.0], "Same again", SCOPE)
+        assert not decision.reuse
+        assert decision.reason == "scope_changed"
+
+    def test_deleted_chunk_is_stale(self):
+        prev = self._rebuilt(_chunk(1, 0.6, "sub-1"))
+        history = _history(sources=self.SOURCES)
+        decision = decide_reuse(prev, history, [1.0, 0.0], "Same again", SCOPE)
+        assert not decision.reuse
+        assert decision.reason == "stale"
@@ -0,0 +1,141 @@
+# tests/test_hedging.py
+# Unit tests for hedged requests.
+
+import asyncio
+
+import pytest
+
+from src.config import settings
+from src.services import metrics
+from src.services.hedging import Hedger
+
+
+@pytest.fixture()
+def hedging(monkeypatch):
+    monkeypatch.setattr(settings, "hedging_enabled", True)
+    monkeypatch.setattr(settings, "hedge_percentile", 95.0)
+    monkeypatch.setattr(settings, "hedge_min_delay_ms", 10.0)
+    monkeypatch.setattr(settings, "hedge_min_samples", 5)
+    monkeypatch.setattr(settings, "hedge_max_ratio", 1.0)
+    metrics.reset()
+
+
+def _warm(hedger: Hedger, latency_ms: float = 10.0, samples: int = 20) -> None:
+    hedger._latencies.extend([latency_ms] * samples)
+
+
+class TestHedger:
+    @pytest.mark.asyncio
+    async def test_disabled_calls_once(self, monkeypatch):
+        monkeypatch.setattr(settings, "hedging_enabled", False)
+        calls = []
+
+        async def _call():
+            calls.append(1)
+            return "ok"
+
+        assert await Hedger("t").run(_call) == "ok"
+        assert calls == [1]
+
+    def test_no_deadline_until_enough_samples(self, hedging):
+        hedger = Hedger("t")
+        _warm(hedger, samples=4)
+        assert hedger.deadline_ms() is None
+        _warm(hedger, samples=1)
+        assert hedger.deadline_ms() == 10.0
+
+    def test_deadline_tracks_percentile(self, hedging):
+        hedger = Hedger("t")
+        hedger._latencies.extend(float(ms) for ms in range(1, 101))
+        assert hedger.deadline_ms() == 95.0
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_and_hedge_wins(self, hedging):
+        hedger = Hedger("t")
+        _warm(hedger)
+        calls = 0
+
+        async def _call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(5 if calls == 1 else 0)
+            return calls
+
+        assert await hedger.run(_call) == 2
+        assert metrics.get_counter("hedge_requests_total", group="t", outcome="sent") == 1
+        assert metrics.get_counter("hedge_requests_total", group="t", outcome="won") == 1
+
+    @pytest.mark.asyncio
+    async def test_losing_primary_records_its_elapsed_time(self, hedging):
+        hedger = Hedger("t")
+        _warm(hedger, latency_ms=10.0)
+        calls = 0
+
+        async def _call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(5 if calls == 1 else 0.02)
+            return calls
+
+        assert await hedger.run(_call) == 2
+        # Primary ran ~10ms before the hedge and ~20ms alongside it
+        assert hedger._latencies[-1] >= 25.0
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self, hedging):
+        hedger = Hedger("t")
+        _warm(hedger, latency_ms=1000)
+        calls = 0
+
+        async def _call():
+            nonlocal calls
+            calls += 1
+            return "ok"
+
+        assert await hedger.run(_call) == "ok"
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_hedge_rate(self, hedging, monkeypatch):
+        monkeypatch.setattr(settings, "hedge_max_ratio", 0.5)
+        hedger = Hedger("t")
+        _warm(hedger, samples=100)
+
+        async def _call():
+            await asyncio.sleep(0.03)
+            return "ok"
+
+        for _ in range(4):
+            await hedger.run(_call)
+
+        assert metrics.get_counter("hedge_requests_total", group="t", outcome="sent") == 2
+        assert metrics.get_counter("hedge_requests_total", group="t", outcome="no_budget") == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_back_to_hedge(self, hedging):
+        hedger = Hedger("t")
+        _warm(hedger)
+        calls = 0
+
+        async def _call():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await asyncio.sleep(0.05)
+                raise ConnectionError("reset")
+            await asyncio.sleep(0.1)
+            return "hedge"
+
+        assert await hedger.run(_call) == "hedge"
+
+    @pytest.mark.asyncio
+    async def test_all_copies_failing_raises(self, hedging):
+        hedger = Hedger("t")
+        _warm(hedger)
+
+        async def _call():
+            await asyncio.sleep(0.03)
+            raise ConnectionError("reset")
+
+        with pytest.raises(ConnectionError):
+            await hedger.run(_call)
@@ -0,0 +1,57 @@
+# tests/test_model_router.py
+# Unit tests for per-turn chat model routing.
+
+import pytest
+
+from src.config import settings
+from src.services.model_router import model_for_tier, route_model
+from src.services.retrieval import RetrievedChunk
+
+
+def _chunk(chunk_type: str) -> RetrievedChunk:
+    return RetrievedChunk(
+        id="c", document_id="d", content="x", similarity=0.8,
+        document_title="Doc", source_type="past_paper",
+        subject_id=None, topic_id=None,
+        chunk_metadata={"chunk_type": chunk_type}, doc_metadata={},
+    )
+
+
+@pytest.fixture(autouse=True)
+def _tiers(monkeypatch):
+    monkeypatch.setattr(settings, "chat_model_tiers", {"fast": "small", "capable": "large"})
+    monkeypatch.setattr(settings, "route_capable_subject_ids", ["maths"])
+
+
+class TestRouteModel:
+    def test_short_definition_is_fast(self):
+        decision = route_model("Define osmosis", [_chunk("definition")], None, "parent")
+        assert decision.tier == "fast"
+        assert decision.model == "small"
+        assert "short_query" in decision.reasons
+
+    def test_calculation_is_capable(self):
+        decision = route_model(
+            "Can you calculate the magnification if the image is 5mm and actual size 0.1mm",
+            [_chunk("worked_example")], None, "parent",
+        )
+        assert decision.tier == "capable"
+        assert decision.model == "large"
+
+    def test_exam_chunk_mix_and_subject_raise_tier(self):
+        message = "Tell me about the questions on this topic from last year please"
+        plain = route_model(message, [_chunk("definition")], None, "parent")
+        exam = route_model(message, [_chunk("question"), _chunk("marking_criteria")], "maths", "parent")
+        assert plain.tier == "standard"
+        assert exam.tier == "capable"
+        assert {"reasoning_chunks", "capable_subject"} <= set(exam.reasons)
+
+    def test_child_reasoning_gets_boost(self):
+        message = "Why does the rate of reaction change with temperature in this experiment"
+        parent = route_model(message, [_chunk("question")], None, "parent")
+        child = route_model(message, [_chunk("question")], None, "child")
+        assert child.score == parent.score + 1
+
+    def test_unconfigured_tier_uses_chat_model(self, monkeypatch):
+        monkeypatch.setattr(settings, "chat_model_tiers", {})
+        assert model_for_tier("capable") == settings.chat_model
@@ -0,0 +1,318 @@
+# tests/test_providers.py
+# Unit tests for provider ordering, health/cooldown and failover of chat and embedding calls.
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import APIConnectionError, AuthenticationError, BadRequestError
+
+from src.api import chat
+from src.config import settings
+from src.services import embedder, providers
+from src.services.model_router import RouteDecision
+from src.services.providers import ProviderConfig, ProviderPool, get_pool, is_provider_fault
+from tests.conftest import FakeStreamResponse
+
+PRIMARY = ProviderConfig(name="primary", base_url="https://a.example/v1", api_key="a")
+SECONDARY = ProviderConfig(name="secondary", base_url="https://b.example/v1", api_key="b")
+
+
+class TestProviderPool:
+    def test_configured_order_wins_without_measurements(self):
+        pool = ProviderPool("chat", [PRIMARY, SECONDARY])
+        assert pool.candidates() == [PRIMARY, SECONDARY]
+
+    def test_much_slower_primary_is_demoted(self, monkeypatch):
+        monkeypatch.setattr(settings, "provider_priority_penalty_ms", 250.0)
+        pool = ProviderPool("chat", [PRIMARY, SECONDARY])
+        pool.record_success(PRIMARY, 2000)
+        pool.record_success(SECONDARY, 300)
+        assert pool.candidates()[0] == SECONDARY
+
+    def test_slightly_slower_primary_keeps_priority(self, monkeypatch):
+        monkeypatch.setattr(settings, "provider_priority_penalty_ms", 250.0)
+        pool = ProviderPool("chat", [PRIMARY, SECONDARY])
+        pool.record_success(PRIMARY, 400)
+        pool.record_success(SECONDARY, 300)
+        assert pool.candidates()[0] == PRIMARY
+
+    def test_cooldown_after_threshold_then_recovery(self, monkeypatch):
+        monkeypatch.setattr(settings, "provider_failure_threshold", 2)
+        monkeypatch.setattr(settings, "provider_cooldown_seconds", 5.0)
+        pool = ProviderPool("chat", [PRIMARY, SECONDARY])
+
+        pool.record_failure(PRIMARY, "error")
+        assert pool.candidates()[0] == PRIMARY  # below threshold
+        pool.record_failure(PRIMARY, "timeout")
+        assert pool.candidates() == [SECONDARY, PRIMARY]  # down, but still a last resort
+
+        pool.health("primary").down_until = 0.0  # cooldown elapsed
+        pool.record_success(PRIMARY, 100)
+        health = pool.health("primary")
+        assert health.consecutive_failures == 0
+        assert pool.candidates()[0] == PRIMARY
+
+    def test_cooldown_doubles_and_is_capped(self, monkeypatch):
+        monkeypatch.setattr(settings, "provider_failure_threshold", 1)
+        monkeypatch.setattr(settings, "provider_cooldown_seconds", 10.0)
+        monkeypatch.setattr(settings, "provider_max_cooldown_seconds", 15.0)
+        monkeypatch.setattr(providers.time, "monotonic", lambda: 1000.0)
+        pool = ProviderPool("chat", [PRIMARY])
+
+        pool.record_failure(PRIMARY, "error")
+        assert pool.health("primary").down_until == 1010.0
+        pool.record_failure(PRIMARY, "error")
+        assert pool.health("primary").down_until == 1015.0
+
+
+class TestVectorSpacePinning:
+    def test_mismatched_embedding_providers_are_excluded(self, monkeypatch):
+        monkeypatch.setattr(settings, "embedding_vector_space", "large@2000")
+        monkeypatch.setattr(settings, "embedding_providers", [
+            {"name": "main", "base_url": "https://a.example/v1", "vector_space": "large@2000"},
+            {"name": "small", "base_url": "https://b.example/v1", "vector_space": "small@1536"},
+            {"name": "mirror", "base_url": "https://c.example/v1"},
+        ])
+
+        names = [p.name for p in get_pool("embedding").candidates()]
+
+        assert names == ["main", "mirror"]
+
+    def test_default_provider_when_none_match(self, monkeypatch):
+        monkeypatch.setattr(settings, "embedding_vector_space", "large@2000")
+        monkeypatch.setattr(settings, "embedding_providers", [
+            {"name": "small", "base_url": "https://b.example/v1", "vector_space": "small@1536"},
+        ])
+
+        names = [p.name for p in get_pool("embedding").candidates()]
+
+        assert names == ["default"]
+
+
+def _status_error(status: int) -> Exception:
+    request = httpx.Request("POST", "https://a.example/v1/chat/completions")
+    response = httpx.Response(status, request=request)
+    cls = AuthenticationError if status == 401 else BadRequestError
+    return cls("rejected", response=response, body=None)
+
+
+class TestIsProviderFault:
+    @pytest.mark.parametrize("status", [401, 403, 404, 429, 500, 503])
+    def test_provider_specific_statuses_are_faults(self, status):
+        assert is_provider_fault(_status_error(status))
+
+    @pytest.mark.parametrize("status", [400, 413, 422])
+    def test_request_errors_are_not(self, status):
+        assert not is_provider_fault(_status_error(status))
+
+    def test_connection_errors_and_timeouts_are_faults(self):
+        request = httpx.Request("POST", "https://a.example/v1/chat/completions")
+        assert is_provider_fault(APIConnectionError(request=request))
+        assert is_provider_fault(httpx.ConnectTimeout("slow"))
+        assert is_provider_fault(asyncio.TimeoutError())
+
+    @pytest.mark.parametrize("exc", [TypeError("bad arg"), KeyError("choices"), ValueError()])
+    def test_programming_errors_are_not(self, exc):
+        assert not is_provider_fault(exc)
+
+
+class TestEmbeddingFailover:
+    @pytest.fixture()
+    def two_embedding_providers(self, monkeypatch):
+        monkeypatch.setattr(settings, "embedding_providers", [
+            {"name": "primary", "base_url": "https://a.example/v1"},
+            {"name": "secondary", "base_url": "https://b.example/v1"},
+        ])
+        monkeypatch.setattr(embedder, "_get_client", lambda provider=None: provider.name)
+
+    @pytest.mark.asyncio
+    async def test_error_fails_over_to_next_provider(self, monkeypatch, two_embedding_providers):
+        calls = []
+
+        async def _embed_batch(client, texts, _model=None):
+            calls.append(client)
+            if client == "primary":
+                raise ConnectionError("down")
+            return [[1.0] for _ in texts]
+
+        monkeypatch.setattr(embedder, "_embed_batch", _embed_batch)
+
+        assert await embedder._embed_with_failover(["q"]) == [[1.0]]
+        assert calls == ["primary", "secondary"]
+        assert get_pool("embedding").health("primary").consecutive_failures == 1
+
+    @pytest.mark.asyncio
+    async def test_each_provider_is_tried_once_before_failing_over(self, monkeypatch, two_embedding_providers):
+        """No backoff retries of a failing provider inside the query deadline."""
+        calls = []
+
+        async def _create(**_kwargs):
+            calls.append(_kwargs["input"])
+            raise ConnectionError("down")
+
+        client = SimpleNamespace(embeddings=SimpleNamespace(create=_create))
+        monkeypatch.setattr(embedder, "_get_client", lambda provider=None: client)
+
+        started = time.monotonic()
+        with pytest.raises(ConnectionError):
+            await embedder._embed_with_failover(["q"])
+        assert len(calls) == 2
+        assert time.monotonic() - started < 0.5
+
+    @pytest.mark.asyncio
+    async def test_slow_provider_is_abandoned_at_deadline(self, monkeypatch, two_embedding_providers):
+        async def _embed_batch(client, texts, _model=None):
+            if client == "primary":
+                await asyncio.sleep(5)
+            return [[2.0] for _ in texts]
+
+        monkeypatch.setattr(embedder, "_embed_batch", _embed_batch)
+
+        assert await embedder._embed_with_failover(["q"], timeout=0.05) == [[2.0]]
+
+    @pytest.mark.asyncio
+    async def test_request_errors_do_not_fail_over(self, monkeypatch, two_embedding_providers):
+        calls = []
+
+        async def _embed_batch(client, texts, _model=None):
+            calls.append(client)
+            request = httpx.Request("POST", "https://a.example/v1/embeddings")
+            raise BadRequestError(
+                "input too long", response=httpx.Response(400, request=request), body=None
+            )
+
+        monkeypatch.setattr(embedder, "_embed_batch", _embed_batch)
+
+        with pytest.raises(BadRequestError):
+            await embedder._embed_with_failover(["q"])
+        assert calls == ["primary"]
+
+    @pytest.mark.asyncio
+    async def test_rejected_api_key_fails_over(self, monkeypatch, two_embedding_providers):
+        calls = []
+
+        async def _embed_batch(client, texts, _model=None):
+            calls.append(client)
+            if client == "primary":
+                raise _status_error(401)
+            return [[3.0] for _ in texts]
+
+        monkeypatch.setattr(embedder, "_embed_batch", _embed_batch)
+
+        assert await embedder._embed_with_failover(["q"]) == [[3.0]]
+        assert calls == ["primary", "secondary"]
+
+
+class _SlowStream(FakeStreamResponse):
+    def __init__(self):
+        async def _gen():
+            await asyncio.sleep(5)
+            yield None
+
+        self._gen = _gen()
+
+
+class TestChatFailover:
+    @pytest.fixture()
+    def chat_clients(self, monkeypatch):
+        """Per-provider fake clients; each returns what `behaviour[name]` builds."""
+        monkeypatch.setattr(settings, "chat_providers", [
+            {"name": "primary", "base_url": "https://a.example/v1"},
+            {"name": "secondary", "base_url": "https://b.example/v1", "model": "backup-model"},
+        ])
+        behaviour = {}
+        models = []
+
+        def _client(base_url):
+            name = "primary" if "a.example" in base_url else "secondary"
+
+            async def _create(**kwargs):
+                models.append((name, kwargs["model"]))
+                return behaviour[name]()
+
+            return SimpleNamespace(
+                chat=SimpleNamespace(completions=SimpleNamespace(create=_create))
+            )
+
+        monkeypatch.setattr(chat, "AsyncOpenAI", lambda api_key, base_url: base_url)
+        monkeypatch.setattr(chat, "wrap_openai", _client)
+        return behaviour, models
+
+    async def _collect(self, model="gpt-test", tier="standard", served=None):
+        route = RouteDecision(tier=tier, model=model, score=0)
+        tokens = []
+        async for item in chat._llm_tokens([{"role": "user", "content": "hi"}], route):
+            if isinstance(item, chat.ServedModel):
+                if served is not None:
+                    served.append(item.name)
+            else:
+                tokens.append(item)
+        return tokens
+
+    @pytest.mark.asyncio
+    async def test_first_token_deadline_fails_over(self, monkeypatch, chat_clients):
+        monkeypatch.setattr(settings, "chat_first_token_timeout_seconds", 0.05)
+        behaviour, models = chat_clients
+        behaviour["primary"] = _SlowStream
+        behaviour["secondary"] = lambda: FakeStreamResponse(["Hi", " there"])
+
+        assert await self._collect() == ["Hi", " there"]
+        assert models == [("primary", "gpt-test"), ("secondary", "backup-model")]
+        assert get_pool("chat").health("primary").consecutive_failures == 1
+
+    @pytest.mark.asyncio
+    async def test_provider_maps_the_route_tier_to_its_own_model(self, monkeypatch, chat_clients):
+        monkeypatch.setattr(settings, "chat_providers", [
+            {"name": "primary", "base_url": "https://a.example/v1",
+             "models": {"capable": "primary-large"}},
+        ])
+        providers.reset_pools()
+        behaviour, models = chat_clients
+        behaviour["primary"] = lambda: FakeStreamResponse(["ok"])
+        served = []
+
+        await self._collect(model="gpt-large", tier="capable", served=served)
+        await self._collect(model="gpt-small", tier="fast", served=served)
+
+        # A tier the provider maps runs its model; others keep the routed one
+        assert models == [("primary", "primary-large"), ("primary", "gpt-small")]
+        assert served == ["primary-large", "gpt-small"]
+
+    @pytest.mark.asyncio
+    async def test_served_model_is_the_failover_providers(self, monkeypatch, chat_clients):
+        monkeypatch.setattr(settings, "chat_first_token_timeout_seconds", 0.05)
+        behaviour, _models = chat_clients
+        behaviour["primary"] = _SlowStream
+        behaviour["secondary"] = lambda: FakeStreamResponse(["Hi"])
+        served = []
+
+        assert await self._collect(served=served) == ["Hi"]
+        assert served == ["backup-model"]
+
+    @pytest.mark.asyncio
+    async def test_connect_error_fails_over(self, chat_clients):
+        behaviour, _models = chat_clients
+
+        def _refuse():
+            raise ConnectionError("refused")
+
+        behaviour["primary"] = _refuse
+        behaviour["secondary"] = lambda: FakeStreamResponse(["ok"])
+
+        assert await self._collect() == ["ok"]
+
+    @pytest.mark.asyncio
+    async def test_all_providers_failing_raises(self, chat_clients):
+        behaviour, _models = chat_clients
+
+        def _refuse():
+            raise ConnectionError("refused")
+
+        behaviour["primary"] = _refuse
+        behaviour["secondary"] = _refuse
+
+        with pytest.raises(ConnectionError):
+            await self._collect()
@@ -0,0 +1,224 @@
+# ai-tutor-api/tests/test_realtime.py
+# Tests for the /chat/ws WebSocket transport.
+
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock
+
+import jwt
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.main import app
+from tests.conftest import TEST_JWT_SECRET, FakeChoice, FakeChunk, FakeDelta, MockQueryBuilder
+
+USER_ID = "00000000-0000-0000-0000-000000000099"
+
+
+def _token(sub: str = USER_ID, exp_in: int = 3600) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {"sub": sub, "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + exp_in},
+        TEST_JWT_SECRET,
+        algorithm="HS256",
+    )
+
+
+@pytest.fixture(autouse=True)
+def _socket_settings(monkeypatch):
+    monkeypatch.setattr("src.api.realtime.settings.websocket_enabled", True)
+    monkeypatch.setattr("src.auth.settings.supabase_jwt_secret", TEST_JWT_SECRET)
+
+
+def _connect():
+    return TestClient(app).websocket_connect("/chat/ws")
+
+
+def _auth(ws) -> dict:
+    ws.send_json({"type": "auth", "token": _token()})
+    return ws.receive_json()
+
+
+RECEIVE_TIMEOUT_SECONDS = 5.0
+
+
+def _receive(ws, timeout: float = RECEIVE_TIMEOUT_SECONDS) -> dict:
+    """ws.receive_json(), failing the test instead of hanging if no frame arrives in time."""
+    message = ws.portal.call(asyncio.wait_for, ws._send_rx.receive(), timeout)
+    ws._raise_on_close(message)
+    return json.loads(message["text"])
+
+
+def _until(ws, op_id: str, *events: str, timeout: float = RECEIVE_TIMEOUT_SECONDS) -> list[dict]:
+    """Frames for op_id up to and including the first of `events`, within `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    frames = []
+    while True:
+        frame = _receive(ws, max(deadline - time.monotonic(), 0))
+        if frame["id"] != op_id:
+            continue
+        frames.append(frame)
+        if frame["event"] in events:
+            return frames
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.setattr("src.api.realtime.settings.websocket_enabled", False)
+
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with _connect() as ws:
+            ws.receive_json()
+    assert exc_info.value.code == 4403
+
+
+def test_first_frame_must_authenticate():
+    with _connect() as ws:
+        ws.send_json({"type": "chat", "id": "t1", "request": {"message": "hi"}})
+        error = ws.receive_json()
+        assert error["event"] == "error"
+        assert error["data"]["status"] == 401
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            ws.receive_json()
+    assert exc_info.value.code == 4401
+
+
+def test_invalid_token_is_rejected():
+    with _connect() as ws:
+        ws.send_json({"type": "auth", "token": "not-a-jwt"})
+        assert ws.receive_json()["data"] == {"error": "Invalid token", "status": 401}
+
+
+def test_chat_turn_streams_sse_events(mock_openai, mock_supabase):
+    with _connect() as ws:
+        ready = _auth(ws)
+        assert ready["event"] == "ready"
+        assert ready["data"] == {"user_id": USER_ID}
+
+        ws.send_json({"type": "chat", "id": "t1", "request": {"message": "What is photosynthesis?"}})
+        frames = _until(ws, "t1", "done", "error")
+
+    assert [f["event"] for f in frames] == ["token", "token", "token", "done"]
+    assert "".join(f["data"]["content"] for f in frames[:-1]) == "Hello world!"
+    stream_id = frames[0]["event_id"].rpartition(":")[0]
+    assert [f["event_id"] for f in frames] == [f"{stream_id}:{n}" for n in range(1, 5)]
+    assert frames[-1]["data"]["conversation_id"]
+
+
+def test_history_reads_share_the_connection(monkeypatch):
+    db = MockQueryBuilder({"list_conversations": [], "conversation_messages_page": {"forbidden": True}})
+    monkeypatch.setattr("src.api.conversations.create_client", lambda _url, _key: db)
+
+    with _connect() as ws:
+        _auth(ws)
+        ws.send_json({"type": "conversations", "id": "c1", "limit": 10})
+        ws.send_json({
+            "type": "messages", "id": "m1",
+            "conversation_id": "11111111-1111-1111-1111-111111111111",
+        })
+        listing = _until(ws, "c1", "result", "error")[-1]
+        messages = _until(ws, "m1", "result", "error")[-1]
+
+    assert listing["event"] == "result"
+    assert listing["data"]["conversations"] == []
+    assert messages["event"] == "error"
+    assert messages["data"]["status"] == 403
+    _, params = db.rpc_calls[0]
+    assert params["p_user_id"] == USER_ID
+
+
+def test_invalid_operation_frames(mock_supabase):
+    with _connect() as ws:
+        _auth(ws)
+        ws.send_json({"type": "chat", "request": {"message": "hi"}})
+        assert ws.receive_json()["data"]["status"] == 400  # no id
+        ws.send_json({"type": "teleport", "id": "x"})
+        assert ws.receive_json()["data"]["status"] == 400
+        ws.send_json({"type": "chat", "id": "t1", "request": {"role": "teacher"}})
+        assert _until(ws, "t1", "error")[-1]["data"]["status"] == 422
+        ws.send_json({"type": "chat", "id": "t2", "request": ["hi"]})
+        assert _until(ws, "t2", "error")[-1]["data"]["status"] == 422
+
+
+def test_non_string_last_event_id_is_rejected(mock_supabase):
+    with _connect() as ws:
+        _auth(ws)
+        ws.send_json({"type": "chat", "id": "t1", "last_event_id": 42})
+        error = _until(ws, "t1", "error")[-1]
+
+    assert error["data"]["status"] == 422
+    assert "last_event_id" in error["data"]["error"]
+
+
+def test_reauth_as_another_user_closes_the_socket():
+    with _connect() as ws:
+        _auth(ws)
+        ws.send_json({"type": "auth", "token": _token(sub="00000000-0000-0000-0000-000000000042")})
+        assert ws.receive_json()["data"]["status"] == 403
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            ws.receive_json()
+    assert exc_info.value.code == 4403
+
+
+class _HangingStream:
+    """Produces one token, then waits forever (a slow answer)."""
+
+    def __init__(self):
+        self._sent = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._sent:
+            self._sent = True
+            return FakeChunk(choices=[FakeChoice(delta=FakeDelta(content="Partial"))])
+        await asyncio.Event().wait()
+
+    async def close(self):
+        pass
+
+
+def test_cancel_stops_the_turn(mock_supabase, monkeypatch):
+    async def create(**_kwargs):
+        return _HangingStream()
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    monkeypatch.setattr("src.api.chat.wrap_openai", lambda _client: client)
+
+    with _connect() as ws:
+        _auth(ws)
+        ws.send_json({"type": "chat", "id": "t1", "request": {"message": "Explain osmosis"}})
+        first = _until(ws, "t1", "token")[-1]
+        assert first["data"] == {"content": "Partial"}
+
+        ws.send_json({"type": "cancel", "id": "t1"})
+        cancelled = _until(ws, "t1", "cancelled", "done")[-1]
+
+    assert cancelled["event"] == "cancelled"
+    assert cancelled["data"] == {"stopped": True}
+
+
+@pytest.mark.parametrize("code", [1000, 1001])
+def test_deliberate_close_cancels_running_turns(mock_supabase, monkeypatch, code):
+    from src.api.chat import chat_turns
+
+    async def create(**_kwargs):
+        return _HangingStream()
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    monkeypatch.setattr("src.api.chat.wrap_openai", lambda _client: client)
+    cancel = chat_turns.cancel
+    cancelled = []
+    monkeypatch.setattr(chat_turns, "cancel", lambda key: cancelled.append(key) or cancel(key))
+
+    with _connect() as ws:
+        _auth(ws)
+        ws.send_json({"type": "chat", "id": "t1", "request": {"message": "Explain osmosis"}})
+        _until(ws, "t1", "token")
+        ws.close(code=code)
+
+    assert [user_id for user_id, _stream_id in cancelled] == [USER_ID]
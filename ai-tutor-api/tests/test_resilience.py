@@ -0,0 +1,216 @@
+# tests/test_resilience.py
+# Unit tests for circuit breakers and the per-turn deadline budget.
+
+import asyncio
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from src.config import settings
+from src.services import resilience
+from src.services.resilience import (
+    CircuitBreaker,
+    CircuitOpen,
+    DeadlineExceeded,
+    is_database_fault,
+    stage_timeout,
+    start_deadline,
+)
+
+
+@pytest.fixture()
+def breaker(monkeypatch):
+    monkeypatch.setattr(settings, "circuit_breakers_enabled", True)
+    monkeypatch.setattr(settings, "circuit_failure_threshold", 2)
+    monkeypatch.setattr(settings, "circuit_reset_seconds", 30.0)
+    return CircuitBreaker("test")
+
+
+async def _fail():
+    raise ConnectionError("down")
+
+
+async def _ok():
+    return "ok"
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_opens_after_threshold_and_rejects(self, breaker):
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await breaker.call(_fail)
+        assert breaker.state == "open"
+
+        calls = []
+
+        async def _tracked():
+            calls.append(1)
+            return "ok"
+
+        with pytest.raises(CircuitOpen):
+            await breaker.call(_tracked)
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_errors_rejected_by_is_failure_do_not_count(self, breaker):
+        async def _bug():
+            raise KeyError("choices")
+
+        for _ in range(3):
+            with pytest.raises(KeyError):
+                await breaker.call(_bug, is_failure=lambda exc: isinstance(exc, ConnectionError))
+        assert breaker.state == "closed"
+        assert breaker.failures == 0
+
+    @pytest.mark.asyncio
+    async def test_success_resets_failure_count(self, breaker):
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+        await breaker.call(_ok)
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_closes_on_success(self, breaker, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+        breaker.record_failure()
+        breaker.record_failure()
+
+        now[0] += 31
+        assert await breaker.call(_ok) == "ok"
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_failure_reopens(self, breaker, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+        breaker.record_failure()
+        breaker.record_failure()
+
+        now[0] += 31
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpen):
+            await breaker.call(_ok)
+
+    def test_only_one_probe_while_half_open(self, breaker, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+        breaker.record_failure()
+        breaker.record_failure()
+
+        now[0] += 31
+        breaker.acquire()
+        with pytest.raises(CircuitOpen):
+            breaker.acquire()
+        breaker.release()
+        breaker.acquire()
+
+    @pytest.mark.asyncio
+    async def test_timeout_counts_as_failure(self, breaker):
+        async def _slow():
+            await asyncio.sleep(5)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(_slow, timeout=0.01)
+        assert breaker.failures == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_breaker_never_rejects(self, breaker, monkeypatch):
+        monkeypatch.setattr(settings, "circuit_breakers_enabled", False)
+        for _ in range(5):
+            breaker.record_failure()
+        assert await breaker.call(_ok) == "ok"
+
+
+class TestDeadline:
+    @pytest.mark.asyncio
+    async def test_stage_timeout_is_capped_by_remaining_budget(self):
+        async def _turn():
+            start_deadline(1.0)
+            return stage_timeout(10.0), stage_timeout(0.5)
+
+        budget, capped = await asyncio.create_task(_turn())
+        assert 0.9 < budget <= 1.0
+        assert capped == 0.5
+
+    @pytest.mark.asyncio
+    async def test_no_deadline_uses_stage_cap(self):
+        async def _stage():
+            return stage_timeout(3.0)
+
+        assert await asyncio.create_task(_stage()) == 3.0
+
+    @pytest.mark.asyncio
+    async def test_spent_deadline_skips_call_without_failure(self, breaker):
+        async def _turn():
+            start_deadline(0)
+            await breaker.call(_ok, timeout=stage_timeout(5.0))
+
+        with pytest.raises(DeadlineExceeded):
+            await asyncio.create_task(_turn())
+        assert breaker.failures == 0
+
+
+class TestDatabaseFault:
+    def test_transport_and_server_side_errors_count(self):
+        assert is_database_fault(httpx.ConnectError("refused"))
+        assert is_database_fault(TimeoutError())
+        assert is_database_fault(APIError({"code": "57014", "message": "statement timeout"}))
+        assert is_database_fault(APIError({"code": "PGRST001", "message": "no connection"}))
+
+    def test_query_errors_and_bugs_do_not(self):
+        assert not is_database_fault(APIError({"code": "42883", "message": "no such function"}))
+        assert not is_database_fault(KeyError("similarity"))
+        assert not is_database_fault(ValueError("bad row"))
+
+
+class TestCoalescedBreaker:
+    @pytest.mark.asyncio
+    async def test_one_shared_failure_is_one_breaker_failure(self, breaker, monkeypatch):
+        from src.api import chat
+
+        monkeypatch.setattr(settings, "coalesce_requests_enabled", True)
+        monkeypatch.setattr(settings, "circuit_failure_threshold", 3)
+        monkeypatch.setattr(chat, "embedding_breaker", breaker)
+        calls = 0
+
+        async def _embed(_message):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise ConnectionError("provider down")
+
+        monkeypatch.setattr(chat, "embed_query", _embed)
+
+        results = await asyncio.gather(
+            *(chat._embed_message("What is osmosis?") for _ in range(5)),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, ConnectionError) for r in results)
+        assert calls == 1
+        assert breaker.failures == 1
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_our_own_bugs_do_not_trip_the_search_breaker(self, breaker, monkeypatch):
+        from src.api import chat
+        from src.models.chat import ChatRequest
+
+        monkeypatch.setattr(chat, "search_breaker", breaker)
+
+        async def _broken(**_kwargs):
+            raise KeyError("similarity")
+
+        monkeypatch.setattr(chat, "search_chunks", _broken)
+
+        for _ in range(3):
+            with pytest.raises(KeyError):
+                await chat._search(ChatRequest(message="osmosis"), [0.1], None, None)
+        assert breaker.failures == 0
@@ -5,8 +5,11 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock
 
 from src.services.retrieval import (
+    QuestionReference,
     RetrievedChunk,
     format_retrieval_context,
+    lookup_exam_question,
+    parse_question_reference,
     search_chunks,
 )
 
@@ -93,6 +96,67 @@ class TestSearchChunks:
         assert results == []
 
 
+class TestParseQuestionReference:
+    def test_full_reference(self):
+        ref = parse_question_reference("Can you explain Q3b of June 2023 paper 2?")
+        assert ref == QuestionReference(
+            question_ref="3b", year=2023, session="jun", paper_number="p2",
+        )
+
+    def test_mark_scheme_reference(self):
+        ref = parse_question_reference("What does the 2022 mark scheme say for question 3(b)(ii)?")
+        assert ref.question_ref == "3bii"
+        assert ref.year == 2022
+        assert ref.doc_type == "ms"
+
+    def test_question_without_paper_identity(self):
+        assert parse_question_reference("How do I answer Q3b?") is None
+
+    def test_ordinary_question(self):
+        assert parse_question_reference("What happened in 2023 to interest rates?") is None
+
+
+class TestLookupExamQuestion:
+    @pytest.mark.asyncio
+    async def test_calls_lookup_rpc(self, monkeypatch):
+        """lookup_exam_question uses the indexed RPC, not search_chunks."""
+        fake_row = {
+            "id": "c7",
+            "document_id": "d2",
+            "content": "03.2 Explain why...",
+            "similarity": 1.0,
+            "document_title": "AQA Biology Paper 2",
+            "source_type": "past_paper",
+            "doc_year": 2023,
+            "doc_session": "jun",
+            "doc_paper_number": "p2",
+        }
+        mock_schema = MagicMock()
+        mock_schema.rpc.return_value.execute.return_value = MagicMock(data=[fake_row])
+        mock_sb = MagicMock()
+        mock_sb.schema.return_value = mock_schema
+        monkeypatch.setattr("src.services.retrieval.create_client", lambda _u, _k: mock_sb)
+
+        ref = QuestionReference(question_ref="3.2", year=2023, session="jun", paper_number="p2")
+        results = await lookup_exam_question(ref, subject_id="sub-1")
+
+        name, params = mock_schema.rpc.call_args.args
+        assert name == "lookup_exam_question"
+        assert params["p_question_ref"] == "3.2"
+        assert params["p_subject_id"] == "sub-1"
+        assert results[0].id == "c7"
+        assert results[0].year == 2023
+
+    @pytest.mark.asyncio
+    async def test_rpc_failure_returns_empty(self, monkeypatch):
+        mock_sb = MagicMock()
+        mock_sb.schema.return_value.rpc.side_effect = RuntimeError("function does not exist")
+        monkeypatch.setattr("src.services.retrieval.create_client", lambda _u, _k: mock_sb)
+
+        results = await lookup_exam_question(QuestionReference(question_ref="1a", year=2023))
+        assert results == []
+
+
 class TestFormatRetrievalContext:
     def test_empty_chunks_fallback(self):
         """Empty chunks produce a fallback message."""
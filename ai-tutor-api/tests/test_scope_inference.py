@@ -0,0 +1,121 @@
+# tests/test_scope_inference.py
+# Unit tests for retrieval scope inference from topic-name embeddings.
+
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from src.services import scope_inference
+from src.services.scope_inference import (
+    _ScopeIndex,
+    build_scope_index,
+    infer_scope,
+)
+from src.services.taxonomy import SubjectTaxonomy, TopicEntry
+from tests.conftest import MockQueryBuilder
+
+
+def _index() -> _ScopeIndex:
+    """Three topics: two biology, one chemistry, on orthogonal axes."""
+    return _ScopeIndex(
+        subject_ids=["bio", "bio", "chem"],
+        topic_ids=["t-photo", "t-cells", "t-bonding"],
+        keywords=["photosynthesis", "cell structure", "covalent bonding"],
+        matrix=np.eye(3, dtype=np.float32),
+    )
+
+
+@pytest.fixture()
+def ready_index(monkeypatch):
+    monkeypatch.setattr(scope_inference, "_index", _index())
+    monkeypatch.setattr("src.services.scope_inference.settings.scope_index_ttl_seconds", 10**9)
+
+
+class TestInferScope:
+    def test_keyword_match_sets_topic(self, ready_index):
+        scope = infer_scope([0.0, 0.0, 0.0], "How does photosynthesis work?")
+        assert scope.method == "keyword"
+        assert scope.subject_id == "bio"
+        assert scope.topic_id == "t-photo"
+
+    def test_embedding_match_sets_topic(self, ready_index):
+        scope = infer_scope([0.0, 0.0, 1.0], "How do atoms share electrons?")
+        assert scope.method == "embedding"
+        assert scope.subject_id == "chem"
+        assert scope.topic_id == "t-bonding"
+
+    def test_ambiguous_query_stays_unscoped(self, ready_index):
+        scope = infer_scope([1.0, 1.0, 1.0], "Tell me something interesting")
+        assert scope.method == "none"
+        assert scope.subject_id is None
+
+    def test_dimension_mismatch_stays_unscoped(self, ready_index):
+        scope = infer_scope([1.0, 0.0], "Tell me something interesting")
+        assert scope.method == "none"
+
+    @pytest.mark.asyncio
+    async def test_no_index_yet_stays_unscoped(self, monkeypatch):
+        monkeypatch.setattr(scope_inference, "_index", None)
+        monkeypatch.setattr(scope_inference, "_build_task", None)
+
+        started = []
+
+        async def _record_build(force):
+            started.append(force)
+
+        monkeypatch.setattr(scope_inference, "_build_in_background", _record_build)
+        scope = infer_scope([1.0, 0.0, 0.0], "photosynthesis")
+        await scope_inference._build_task
+
+        assert scope.method == "none"
+        assert started == [False]
+
+
+class TestBuildScopeIndex:
+    @pytest.mark.asyncio
+    async def test_embeds_topic_labels(self, monkeypatch):
+        monkeypatch.setattr(scope_inference, "_index", None)
+        monkeypatch.setattr(scope_inference, "_ingested_subject_ids", lambda: ["bio"])
+        monkeypatch.setattr(
+            scope_inference,
+            "load_taxonomy",
+            lambda _sid: SubjectTaxonomy(
+                subject_id="bio",
+                subject_name="Biology",
+                topics=[
+                    TopicEntry("t-1", "Photosynthesis", "4.4.1", "Bioenergetics", "Paper 1"),
+                    TopicEntry("t-2", "Respiration", "4.4.2", "Bioenergetics", "Paper 1"),
+                ],
+            ),
+        )
+        embed_mock = MagicMock(return_value=[[3.0, 4.0], [0.0, 2.0]])
+
+        async def _embed(labels):
+            return embed_mock(labels)
+
+        monkeypatch.setattr(scope_inference, "embed_chunks", _embed)
+
+        index = await build_scope_index()
+
+        labels = embed_mock.call_args.args[0]
+        assert labels[0] == "Biology: Photosynthesis (Bioenergetics > Paper 1)"
+        assert index.topic_ids == ["t-1", "t-2"]
+        np.testing.assert_allclose(np.linalg.norm(index.matrix, axis=1), [1.0, 1.0], rtol=1e-6)
+
+    @pytest.mark.asyncio
+    async def test_no_subjects_returns_none(self, monkeypatch):
+        monkeypatch.setattr(scope_inference, "_index", None)
+        monkeypatch.setattr(scope_inference, "_ingested_subject_ids", lambda: [])
+        assert await build_scope_index() is None
+
+
+class TestIngestedSubjectIds:
+    def test_distinct_subjects_come_from_rpc(self, monkeypatch):
+        builder = MockQueryBuilder({"ingested_subject_ids": [
+            {"subject_id": "bio"}, {"subject_id": "chem"},
+        ]})
+        monkeypatch.setattr(scope_inference, "_get_supabase", lambda: builder)
+
+        assert scope_inference._ingested_subject_ids() == ["bio", "chem"]
+        assert builder.rpc_calls == [("ingested_subject_ids", {})]
@@ -0,0 +1,40 @@
+# ai-tutor-api/tests/test_serialization.py
+# Tests for the orjson serialisation helpers and pre-serialised event fragments.
+
+import json
+
+import pytest
+
+from src.serialization import (
+    FastJSONResponse,
+    dumpb,
+    dumps,
+    loads,
+    sources_event_data,
+    token_event_data,
+)
+
+
+@pytest.mark.parametrize("content", ["Hello", " world", "", 'quote " and \\ slash', "½ × π → C₆H₁₂O₆", "line\nbreak"])
+def test_token_fragment_matches_stdlib(content):
+    assert json.loads(token_event_data(content)) == {"content": content}
+
+
+def test_sources_fragment_matches_stdlib():
+    sources = [{"chunk_id": "c1", "similarity": 0.812, "year": None, "url": "https://s.test/a?x=1&y=2"}]
+
+    assert json.loads(sources_event_data(sources)) == {"sources": sources}
+    assert json.loads(sources_event_data([])) == {"sources": []}
+
+
+def test_dumps_is_compact_utf8():
+    assert dumps({"a": [1, "é"]}) == '{"a":[1,"é"]}'
+    assert dumpb({"a": 1}) == b'{"a":1}'
+    assert loads(dumpb({"k": ["v"]})) == {"k": ["v"]}
+
+
+def test_fast_json_response_renders_non_string_keys():
+    response = FastJSONResponse({"counts": {1: 2}})
+
+    assert response.body == b'{"counts":{"1":2}}'
+    assert response.media_type == "application/json"
@@ -0,0 +1,94 @@
+# ai-tutor-api/tests/test_signed_urls.py
+# Tests for batched, cached signed source URLs.
+
+import pytest
+
+from src.services import signed_urls as signed_urls_module
+from src.services.signed_urls import SignedUrlCache, signed_url_cache, signed_urls
+
+
+class FakeStorage:
+    """Records create_signed_urls batches; paths in `missing` come back with an error."""
+
+    def __init__(self, missing: tuple[str, ...] = (), fail: bool = False):
+        self.batches: list[list[str]] = []
+        self.missing = missing
+        self.fail = fail
+
+    def from_(self, bucket):
+        assert bucket == "exam-documents"
+        return self
+
+    def create_signed_urls(self, paths, expires_in):
+        if self.fail:
+            raise RuntimeError("storage down")
+        self.batches.append(list(paths))
+        return [
+            {"path": p, "error": "Object not found", "signedURL": None} if p in self.missing
+            else {"path": p, "error": None, "signedURL": f"https://s.test/{p}?exp={expires_in}"}
+            for p in paths
+        ]
+
+
+class FakeClient:
+    def __init__(self, storage: FakeStorage):
+        self.storage = storage
+
+
+@pytest.mark.asyncio
+async def test_distinct_keys_signed_in_one_batch():
+    storage = FakeStorage()
+
+    urls = await signed_urls(FakeClient(storage), ["a.pdf", None, "b.pdf", "a.pdf", ""])
+
+    assert storage.batches == [["a.pdf", "b.pdf"]]
+    assert set(urls) == {"a.pdf", "b.pdf"}
+
+
+@pytest.mark.asyncio
+async def test_cached_urls_are_not_signed_again():
+    storage = FakeStorage()
+    sb = FakeClient(storage)
+
+    first = await signed_urls(sb, ["a.pdf"])
+    second = await signed_urls(sb, ["a.pdf", "b.pdf"])
+
+    assert storage.batches == [["a.pdf"], ["b.pdf"]]
+    assert second["a.pdf"] == first["a.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_unsignable_keys_are_left_out():
+    urls = await signed_urls(FakeClient(FakeStorage(missing=("gone.pdf",))), ["a.pdf", "gone.pdf"])
+
+    assert list(urls) == ["a.pdf"]
+    assert signed_url_cache.get_many(["gone.pdf"]) == {}
+
+
+@pytest.mark.asyncio
+async def test_storage_failure_returns_cached_urls_only():
+    await signed_urls(FakeClient(FakeStorage()), ["a.pdf"])
+
+    urls = await signed_urls(FakeClient(FakeStorage(fail=True)), ["a.pdf", "b.pdf"])
+
+    assert list(urls) == ["a.pdf"]
+
+
+def test_urls_expire_from_cache_before_they_do(monkeypatch):
+    cache = SignedUrlCache(max_size=10, margin_seconds=300)
+    now = 1000.0
+    monkeypatch.setattr(signed_urls_module.time, "monotonic", lambda: now)
+
+    cache.put("a.pdf", "https://s.test/a", expires_at=now + 3600)
+    assert cache.get_many(["a.pdf"]) == {"a.pdf": "https://s.test/a"}
+
+    now += 3600 - 300  # inside the refresh margin
+    assert cache.get_many(["a.pdf"]) == {}
+
+
+def test_cache_is_bounded():
+    cache = SignedUrlCache(max_size=2, margin_seconds=0)
+    for key in ("a", "b", "c"):
+        cache.put(key, f"https://s.test/{key}", expires_at=float("inf"))
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"b", "c"}
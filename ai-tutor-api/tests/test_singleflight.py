@@ -0,0 +1,213 @@
+# tests/test_singleflight.py
+# Unit tests for coalescing identical in-flight work.
+
+import asyncio
+
+import pytest
+
+from src.services.singleflight import (
+    SingleFlight,
+    StreamCancelled,
+    StreamFanout,
+    coalesce_key,
+    messages_key,
+    normalise_message,
+)
+
+
+class TestNormaliseMessage:
+    def test_ignores_case_spacing_and_trailing_punctuation(self):
+        assert normalise_message("  What is   Osmosis?? ") == "what is osmosis"
+        assert coalesce_key("What is osmosis?", "sub-1") == coalesce_key("what is osmosis", "sub-1")
+
+    def test_scope_is_part_of_key(self):
+        assert coalesce_key("osmosis", "sub-1") != coalesce_key("osmosis", "sub-2")
+
+    def test_messages_key_is_stable(self):
+        msgs = [{"role": "user", "content": "hi"}]
+        assert messages_key("m", msgs) == messages_key("m", [dict(m) for m in msgs])
+        assert messages_key("m", msgs) != messages_key("other", msgs)
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        assert results == [1] * 5
+        assert calls == 1
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await flight.do("k", work) == 1
+        assert await flight.do("k", work) == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_all_waiters(self):
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(
+            flight.do("k", work), flight.do("k", work), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "done"
+
+
+async def _collect(iterator):
+    return [token async for token in iterator]
+
+
+class TestStreamFanout:
+    @pytest.mark.asyncio
+    async def test_subscribers_share_one_upstream_stream(self):
+        fanout = StreamFanout("test")
+        opened = 0
+
+        async def upstream():
+            nonlocal opened
+            opened += 1
+            for token in ["a", "b", "c"]:
+                await asyncio.sleep(0.005)
+                yield token
+
+        first = asyncio.create_task(_collect(fanout.subscribe("k", upstream)))
+        await asyncio.sleep(0.007)  # join mid-stream
+        second = asyncio.create_task(_collect(fanout.subscribe("k", upstream)))
+
+        assert await first == ["a", "b", "c"]
+        assert await second == ["a", "b", "c"]
+        assert opened == 1
+        assert len(fanout) == 0
+
+    @pytest.mark.asyncio
+    async def test_upstream_error_reaches_subscribers(self):
+        fanout = StreamFanout("test")
+
+        async def upstream():
+            yield "a"
+            raise RuntimeError("stream broke")
+
+        with pytest.raises(RuntimeError):
+            await _collect(fanout.subscribe("k", upstream))
+
+    @pytest.mark.asyncio
+    async def test_cancelled_upstream_is_an_error_for_subscribers(self):
+        fanout = StreamFanout("test")
+
+        async def upstream():
+            yield "a"
+            await asyncio.Event().wait()
+
+        fanout.start("k", upstream)
+        subscription = fanout.attach("k")
+        assert await subscription.__anext__() == "a"
+        fanout.cancel("k")
+
+        with pytest.raises(StreamCancelled):
+            await asyncio.wait_for(subscription.__anext__(), 1)
+
+    @pytest.mark.asyncio
+    async def test_failing_cleanup_still_releases_subscribers(self):
+        fanout = StreamFanout("test")
+
+        async def upstream():
+            try:
+                yield "a"
+                await asyncio.Event().wait()
+            finally:
+                raise RuntimeError("cleanup broke")
+
+        fanout.start("k", upstream)
+        subscription = fanout.attach("k")
+        assert await subscription.__anext__() == "a"
+        fanout.cancel("k")
+
+        with pytest.raises(RuntimeError, match="cleanup broke"):
+            await asyncio.wait_for(subscription.__anext__(), 1)
+
+    @pytest.mark.asyncio
+    async def test_stream_cancelled_before_its_first_step_releases_subscribers(self):
+        fanout = StreamFanout("test")
+
+        async def upstream():
+            yield "a"
+
+        fanout.start("k", upstream)
+        subscription = fanout.attach("k")
+        fanout.cancel("k")
+
+        with pytest.raises(StreamCancelled):
+            await asyncio.wait_for(_collect(subscription), 1)
+
+    @pytest.mark.asyncio
+    async def test_last_subscriber_leaving_cancels_upstream(self):
+        fanout = StreamFanout("test")
+        finished = False
+
+        async def upstream():
+            nonlocal finished
+            for token in ["a", "b", "c"]:
+                await asyncio.sleep(0.01)
+                yield token
+            finished = True
+
+        subscription = fanout.subscribe("k", upstream)
+        assert await subscription.__anext__() == "a"
+        await subscription.aclose()
+        await asyncio.sleep(0.05)
+        assert not finished
+
+    @pytest.mark.asyncio
+    async def test_linger_keeps_stream_for_reattach(self):
+        fanout = StreamFanout("test", linger_seconds=1.0, retain_seconds=1.0)
+
+        async def upstream():
+            for token in ["a", "b", "c"]:
+                await asyncio.sleep(0.005)
+                yield token
+
+        fanout.start("k", upstream)
+        first = fanout.attach("k")
+        assert await first.__anext__() == "a"
+        await first.aclose()
+
+        resumed = fanout.attach("k", start_at=1)
+        assert await _collect(resumed) == ["b", "c"]
+        # Finished streams stay attachable for retain_seconds
+        assert await _collect(fanout.attach("k")) == ["a", "b", "c"]
+        assert fanout.attach("missing") is None
@@ -0,0 +1,207 @@
+# tests/test_topic_packs.py
+# Unit tests for precomputed topic packs (ranking, key points, build, serve).
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services import topic_packs
+from src.services.topic_packs import (
+    build_topic_pack,
+    get_topic_pack,
+    is_generic_topic_query,
+    merge_key_points,
+    rank_pack_chunks,
+)
+
+
+def _row(idx, doc="d1", chunk_type="general", source_type="past_paper", year=None, key_points=None):
+    return {
+        "id": f"c{idx}",
+        "document_id": doc,
+        "chunk_index": idx,
+        "content": f"Chunk {idx}",
+        "metadata": {"chunk_type": chunk_type},
+        "subject_id": "sub-1",
+        "topic_id": "top-1",
+        "documents": {
+            "title": f"Doc {doc}",
+            "source_type": source_type,
+            "status": "completed",
+            "year": year,
+            "key_points": key_points,
+        },
+    }
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    topic_packs._cache.clear()
+    yield
+    topic_packs._cache.clear()
+
+
+class TestIsGenericTopicQuery:
+    @pytest.mark.parametrize(
+        "message",
+        ["Help me revise this", "Can you summarise the topic?", "quiz me", "Give me an overview"],
+    )
+    def test_generic(self, message):
+        assert is_generic_topic_query(message)
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "What is the function of ribosomes?",
+            "",
+            "Help me revise " + "really " * 20 + "carefully",
+        ],
+    )
+    def test_specific_or_long(self, message):
+        assert not is_generic_topic_query(message)
+
+
+class TestRankPackChunks:
+    def test_teaching_content_first(self):
+        rows = [
+            _row(1, doc="d1", chunk_type="question"),
+            _row(2, doc="d2", chunk_type="definition"),
+            _row(3, doc="d3", chunk_type="explanation"),
+        ]
+        picked = rank_pack_chunks(rows, limit=3)
+        assert [r["id"] for r in picked] == ["c2", "c3", "c1"]
+
+    def test_newer_papers_first(self):
+        rows = [_row(1, doc="d1", year=2019), _row(2, doc="d2", year=2023)]
+        assert [r["id"] for r in rank_pack_chunks(rows, limit=2)] == ["c2", "c1"]
+
+    def test_caps_chunks_per_document(self):
+        rows = [_row(i, doc="d1", chunk_type="definition") for i in range(5)]
+        rows.append(_row(9, doc="d2", chunk_type="answer"))
+        picked = rank_pack_chunks(rows, limit=8)
+        assert [r["document_id"] for r in picked] == ["d1", "d1", "d2"]
+
+
+class TestMergeKeyPoints:
+    def test_filters_by_topic_and_dedupes(self):
+        kp_cells = {"topic": "Cell biology", "point": "Ribosomes make proteins"}
+        kp_other = {"topic": "Ecology", "point": "Food chains"}
+        kp_plain = {"point": "Show your working"}
+        rows = [
+            _row(1, doc="d1", key_points=[kp_cells, kp_other]),
+            _row(2, doc="d1", key_points=[kp_cells]),
+            _row(3, doc="d2", key_points=[kp_cells, kp_plain, "bad"]),
+        ]
+        merged = merge_key_points(rows, "Cell biology")
+        assert merged == [kp_cells, kp_plain]
+
+
+def _mock_supabase(chunk_rows, existing_fingerprint=None):
+    sb = MagicMock()
+    tables: dict[str, MagicMock] = {}
+
+    def _table(name):
+        if name not in tables:
+            t = MagicMock()
+            for method in ("select", "eq", "order", "range", "delete", "upsert"):
+                getattr(t, method).return_value = t
+            data = {
+                "chunks": chunk_rows,
+                "topic_packs": (
+                    [{"fingerprint": existing_fingerprint}] if existing_fingerprint else []
+                ),
+                "topics": [{"topic_name": "Cell biology"}],
+            }[name]
+            t.execute.return_value = MagicMock(data=data)
+            tables[name] = t
+        return tables[name]
+
+    sb.table.side_effect = _table
+    sb.schema.return_value.table.side_effect = _table
+    return sb, tables
+
+
+class TestBuildTopicPack:
+    def test_builds_and_upserts(self, monkeypatch):
+        rows = [_row(1, chunk_type="definition"), _row(2, doc="d2")]
+        sb, tables = _mock_supabase(rows)
+        monkeypatch.setattr(topic_packs, "_get_supabase", lambda: sb)
+
+        assert build_topic_pack("top-1") is True
+
+        payload = tables["topic_packs"].upsert.call_args[0][0]
+        assert payload["chunk_ids"] == ["c1", "c2"]
+        assert payload["chunks"][0]["document_title"] == "Doc d1"
+        assert "Chunk 1" in payload["packed_context"]
+
+    def test_unchanged_fingerprint_skips_write(self, monkeypatch):
+        rows = [_row(1), _row(2)]
+        sb, tables = _mock_supabase(rows, existing_fingerprint=topic_packs._fingerprint(rows))
+        monkeypatch.setattr(topic_packs, "_get_supabase", lambda: sb)
+
+        assert build_topic_pack("top-1") is False
+        tables["topic_packs"].upsert.assert_not_called()
+
+    def test_pages_through_candidate_chunks(self, monkeypatch):
+        rows = [_row(1), _row(2, doc="d2"), _row(3, doc="d3")]
+        sb, tables = _mock_supabase(rows)
+        chunks = sb.schema.return_value.table("chunks")
+        chunks.execute.side_effect = [
+            MagicMock(data=rows[:2]), MagicMock(data=rows[2:]),
+        ]
+        monkeypatch.setattr(topic_packs, "_CHUNK_PAGE_SIZE", 2)
+        monkeypatch.setattr(topic_packs, "_get_supabase", lambda: sb)
+
+        assert build_topic_pack("top-1") is True
+
+        ranges = [c.args for c in chunks.range.call_args_list]
+        assert ranges == [(0, 1), (2, 3)]
+        payload = tables["topic_packs"].upsert.call_args[0][0]
+        assert sorted(payload["chunk_ids"]) == ["c1", "c2", "c3"]
+
+    def test_no_chunks_deletes_pack(self, monkeypatch):
+        sb, tables = _mock_supabase([])
+        monkeypatch.setattr(topic_packs, "_get_supabase", lambda: sb)
+
+        assert build_topic_pack("top-1") is True
+        tables["topic_packs"].delete.assert_called_once()
+
+
+class TestGetTopicPack:
+    @pytest.mark.anyio
+    async def test_reads_once_within_ttl(self, monkeypatch):
+        stored = {
+            "topic_id": "top-1",
+            "chunks": [{
+                "id": "c1", "document_id": "d1", "content": "x", "similarity": 1.0,
+                "document_title": "Doc", "source_type": "revision", "subject_id": None,
+                "topic_id": "top-1", "chunk_metadata": {}, "doc_metadata": {},
+            }],
+            "key_points": [],
+            "packed_context": "packed",
+        }
+        sb = MagicMock()
+        table = sb.schema.return_value.table.return_value
+        table.select.return_value = table
+        table.eq.return_value = table
+        table.execute.return_value = MagicMock(data=[stored])
+        monkeypatch.setattr(topic_packs, "_get_supabase", lambda: sb)
+
+        first = await get_topic_pack("top-1")
+        second = await get_topic_pack("top-1")
+
+        assert first is second
+        assert first.chunks[0].id == "c1"
+        assert first.packed_context == "packed"
+        assert table.execute.call_count == 1
+
+    @pytest.mark.anyio
+    async def test_missing_pack_returns_none(self, monkeypatch):
+        sb = MagicMock()
+        table = sb.schema.return_value.table.return_value
+        table.select.return_value = table
+        table.eq.return_value = table
+        table.execute.return_value = MagicMock(data=[])
+        monkeypatch.setattr(topic_packs, "_get_supabase", lambda: sb)
+
+        assert await get_topic_pack("top-1") is None
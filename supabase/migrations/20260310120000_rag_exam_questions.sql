@@ -0,0 +1,137 @@
+-- Exam question index: per-question rows expanded from documents.key_points
+-- Lets the AI Tutor answer "Q3b of June 2023 paper 2" with one indexed lookup
+-- instead of an embedding + vector search.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.exam_questions — one row per question in a paper or mark scheme
+-- =========================================================================
+
+CREATE TABLE IF NOT EXISTS rag.exam_questions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    document_id UUID NOT NULL REFERENCES rag.documents(id) ON DELETE CASCADE,
+    subject_id UUID REFERENCES public.subjects(id),
+    doc_type TEXT NOT NULL CHECK (doc_type IN ('qp', 'ms', 'sp')),
+    year INTEGER,
+    session TEXT CHECK (session IS NULL OR session IN ('jun', 'nov', 'mar', 'jan')),
+    paper_number TEXT,
+    question_ref TEXT NOT NULL,           -- normalised label, e.g. '3b', '3bii', '3.2' (from "03.2")
+    question_label TEXT NOT NULL,         -- label as written by the enricher, e.g. 'Q3b'
+    topic TEXT,
+    marks INTEGER,
+    command_word TEXT,
+    key_criteria TEXT,
+    chunk_start INTEGER,                  -- first rag.chunks.chunk_index for this question
+    chunk_end INTEGER,                    -- last chunk_index (inclusive)
+    details JSONB DEFAULT '{}'::jsonb,    -- remaining key_point fields
+    created_at TIMESTAMPTZ DEFAULT now(),
+    CONSTRAINT exam_questions_document_ref_unique UNIQUE (document_id, question_ref)
+);
+
+-- =========================================================================
+-- 2. Indexes — the lookup path filters on paper identity + question
+-- =========================================================================
+
+CREATE INDEX IF NOT EXISTS idx_exam_questions_lookup
+    ON rag.exam_questions(question_ref, year, session, paper_number);
+CREATE INDEX IF NOT EXISTS idx_exam_questions_subject
+    ON rag.exam_questions(subject_id);
+CREATE INDEX IF NOT EXISTS idx_exam_questions_document
+    ON rag.exam_questions(document_id);
+
+-- Chunk range joins: chunks by (document_id, chunk_index)
+CREATE INDEX IF NOT EXISTS idx_chunks_document_index
+    ON rag.chunks(document_id, chunk_index);
+
+-- =========================================================================
+-- 3. rag.lookup_exam_question() — direct lookup, search_chunks-shaped rows
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION rag.lookup_exam_question(
+    p_question_ref TEXT,
+    p_year INTEGER DEFAULT NULL,
+    p_session TEXT DEFAULT NULL,
+    p_paper_number TEXT DEFAULT NULL,
+    p_subject_id UUID DEFAULT NULL,
+    p_doc_type TEXT DEFAULT NULL,
+    match_count INTEGER DEFAULT 6
+) RETURNS TABLE (
+    id UUID,
+    document_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    document_title TEXT,
+    source_type TEXT,
+    subject_id UUID,
+    topic_id UUID,
+    chunk_metadata JSONB,
+    doc_metadata JSONB,
+    doc_year INTEGER,
+    doc_session TEXT,
+    doc_paper_number TEXT,
+    doc_type TEXT,
+    doc_file_key TEXT,
+    doc_exam_pathway_id UUID,
+    doc_summary TEXT,
+    doc_key_points JSONB
+)
+-- The reference must pin down a single paper (subject, year, session and
+-- paper number). When the question matches several papers — "paper 2
+-- question 3" with no year or subject — nothing is returned and the caller
+-- falls back to vector search rather than guessing. Within the paper the
+-- question paper is preferred to its mark scheme unless p_doc_type says
+-- otherwise, and only that one document's chunks are returned.
+LANGUAGE plpgsql SECURITY DEFINER AS $$
+BEGIN
+    RETURN QUERY
+    WITH matches AS (
+        SELECT q.*
+        FROM rag.exam_questions q
+        JOIN rag.documents d ON d.id = q.document_id
+        WHERE q.question_ref = p_question_ref
+          AND d.status = 'completed'
+          AND (p_year IS NULL OR q.year = p_year)
+          AND (p_session IS NULL OR q.session = p_session)
+          AND (p_paper_number IS NULL OR q.paper_number = p_paper_number)
+          AND (p_subject_id IS NULL OR q.subject_id = p_subject_id)
+          AND (p_doc_type IS NULL OR q.doc_type = p_doc_type)
+    ),
+    chosen AS (
+        SELECT m.*
+        FROM matches m
+        WHERE (SELECT count(DISTINCT (x.subject_id, x.year, x.session, x.paper_number))
+               FROM matches x) = 1
+        ORDER BY m.doc_type DESC, m.document_id
+        LIMIT 1
+    )
+    SELECT c.id, c.document_id, c.content,
+           1.0::FLOAT AS similarity,
+           d.title, d.source_type, c.subject_id, c.topic_id,
+           c.metadata, d.metadata,
+           d.year, d.session, d.paper_number, d.doc_type,
+           d.file_key, d.exam_pathway_id,
+           d.summary, jsonb_build_array(to_jsonb(q) - 'id' - 'document_id' - 'created_at')
+    FROM chosen q
+    JOIN rag.documents d ON d.id = q.document_id
+    JOIN rag.chunks c ON c.document_id = q.document_id
+        AND c.chunk_index BETWEEN q.chunk_start AND q.chunk_end
+    ORDER BY c.chunk_index
+    LIMIT match_count;
+END; $$;
+
+-- =========================================================================
+-- 4. RLS + permissions (same pattern as rag.documents)
+-- =========================================================================
+
+ALTER TABLE rag.exam_questions ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "exam_questions_read" ON rag.exam_questions FOR SELECT
+    USING (auth.role() = 'authenticated');
+CREATE POLICY "exam_questions_service" ON rag.exam_questions FOR ALL
+    USING (auth.role() = 'service_role');
+
+GRANT ALL ON rag.exam_questions TO service_role;
+GRANT SELECT ON rag.exam_questions TO authenticated;
+
+GRANT EXECUTE ON FUNCTION rag.lookup_exam_question TO authenticated;
+GRANT EXECUTE ON FUNCTION rag.lookup_exam_question TO service_role;
@@ -0,0 +1,36 @@
+-- Topic packs: precomputed retrieval results per curriculum topic
+-- Chats opened from a topic page with a generic request ("help me revise this")
+-- read one row instead of running a vector search inside the topic.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.topic_packs — one row per topic with classified chunks
+-- =========================================================================
+
+CREATE TABLE IF NOT EXISTS rag.topic_packs (
+    topic_id UUID PRIMARY KEY REFERENCES public.topics(id) ON DELETE CASCADE,
+    subject_id UUID REFERENCES public.subjects(id),
+    chunk_ids UUID[] NOT NULL DEFAULT '{}',     -- ranked, best first
+    chunks JSONB NOT NULL DEFAULT '[]'::jsonb,  -- RetrievedChunk fields for each chunk_id
+    key_points JSONB NOT NULL DEFAULT '[]'::jsonb,
+    packed_context TEXT NOT NULL DEFAULT '',    -- ready-to-send LLM system message
+    fingerprint TEXT NOT NULL,                  -- hash of candidate chunk IDs; skips no-op rebuilds
+    built_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_topic_packs_subject
+    ON rag.topic_packs(subject_id);
+
+-- =========================================================================
+-- 2. RLS + permissions (same pattern as rag.documents)
+-- =========================================================================
+
+ALTER TABLE rag.topic_packs ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "topic_packs_read" ON rag.topic_packs FOR SELECT
+    USING (auth.role() = 'authenticated');
+CREATE POLICY "topic_packs_service" ON rag.topic_packs FOR ALL
+    USING (auth.role() = 'service_role');
+
+GRANT ALL ON rag.topic_packs TO service_role;
+GRANT SELECT ON rag.topic_packs TO authenticated;
@@ -0,0 +1,11 @@
+-- Interrupted answers: assistant messages cut short by a client disconnect
+-- The partial answer is kept so the conversation reads correctly on reload.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.messages.interrupted
+-- =========================================================================
+
+ALTER TABLE rag.messages
+    ADD COLUMN IF NOT EXISTS interrupted BOOLEAN NOT NULL DEFAULT false;
@@ -0,0 +1,37 @@
+-- Start a conversation in one write: conversation row + first user message
+-- The API generates both IDs up front, so a new chat's first message costs
+-- one round trip that runs alongside embedding and retrieval.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.start_conversation — insert conversation + first message atomically
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION rag.start_conversation(
+    p_conversation_id UUID,
+    p_user_id UUID,
+    p_child_id UUID,
+    p_subject_id UUID,
+    p_message_id UUID,
+    p_content TEXT
+)
+RETURNS VOID
+LANGUAGE plpgsql SECURITY DEFINER AS $$
+BEGIN
+    INSERT INTO rag.conversations (
+        id, user_id, child_id, subject_id, message_count, created_at, last_active_at
+    )
+    VALUES (p_conversation_id, p_user_id, p_child_id, p_subject_id, 1, now(), now());
+
+    INSERT INTO rag.messages (id, conversation_id, role, content, created_at)
+    VALUES (p_message_id, p_conversation_id, 'user', p_content, now());
+END;
+$$;
+
+-- =========================================================================
+-- 2. Permissions — backend only (takes an arbitrary user_id)
+-- =========================================================================
+
+REVOKE EXECUTE ON FUNCTION rag.start_conversation(UUID, UUID, UUID, UUID, UUID, TEXT) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.start_conversation(UUID, UUID, UUID, UUID, UUID, TEXT) TO service_role;
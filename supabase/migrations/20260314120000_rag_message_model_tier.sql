@@ -0,0 +1,17 @@
+-- Model routing: record which tier answered each assistant message and why
+-- model_name already holds the concrete model; model_tier/routing make
+-- routing decisions queryable for cost and quality analysis.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.messages routing columns
+-- =========================================================================
+
+ALTER TABLE rag.messages
+    ADD COLUMN IF NOT EXISTS model_tier TEXT,
+    ADD COLUMN IF NOT EXISTS routing JSONB;    -- {"score": int, "reasons": [text]}
+
+CREATE INDEX IF NOT EXISTS idx_rag_messages_model_tier
+    ON rag.messages(model_tier)
+    WHERE model_tier IS NOT NULL;
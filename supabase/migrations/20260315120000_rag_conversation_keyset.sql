@@ -0,0 +1,65 @@
+-- Keyset pagination for the conversation sidebar
+-- Pages are read on (last_active_at, id) from a composite index instead of
+-- OFFSET, so every page costs the same however deep the user scrolls.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. last_active_at must be non-null for row-value comparisons
+-- =========================================================================
+
+UPDATE rag.conversations
+SET last_active_at = COALESCE(created_at, now())
+WHERE last_active_at IS NULL;
+
+ALTER TABLE rag.conversations
+    ALTER COLUMN last_active_at SET NOT NULL;
+
+-- =========================================================================
+-- 2. Composite index matching the sidebar query
+-- =========================================================================
+
+CREATE INDEX IF NOT EXISTS idx_rag_conversations_user_active
+    ON rag.conversations(user_id, last_active_at DESC, id DESC)
+    WHERE message_count > 0;
+
+-- =========================================================================
+-- 3. rag.list_conversations — one keyset page, newest first
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION rag.list_conversations(
+    p_user_id UUID,
+    p_limit INTEGER,
+    p_before_active_at TIMESTAMPTZ DEFAULT NULL,
+    p_before_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    title TEXT,
+    message_count INTEGER,
+    last_active_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ,
+    subject_id UUID
+)
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+BEGIN
+    RETURN QUERY
+    SELECT c.id, c.title, c.message_count, c.last_active_at, c.created_at, c.subject_id
+    FROM rag.conversations c
+    WHERE c.user_id = p_user_id
+      AND c.message_count > 0  -- hide rows pre-created by /chat/prefetch and never used
+      AND (
+          p_before_active_at IS NULL
+          OR (c.last_active_at, c.id) < (p_before_active_at, p_before_id)
+      )
+    ORDER BY c.last_active_at DESC, c.id DESC
+    LIMIT p_limit;
+END;
+$$;
+
+-- =========================================================================
+-- 4. Permissions — backend only (takes an arbitrary user_id)
+-- =========================================================================
+
+REVOKE EXECUTE ON FUNCTION rag.list_conversations(UUID, INTEGER, TIMESTAMPTZ, UUID) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.list_conversations(UUID, INTEGER, TIMESTAMPTZ, UUID) TO service_role;
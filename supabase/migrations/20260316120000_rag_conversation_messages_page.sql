@@ -0,0 +1,131 @@
+-- Paged, conditional message history
+-- One round trip checks ownership, answers If-None-Match and returns the
+-- newest page of messages before an optional cursor message.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. Index for tail-first paging within a conversation
+-- =========================================================================
+
+CREATE INDEX IF NOT EXISTS idx_rag_messages_conversation_created
+    ON rag.messages(conversation_id, created_at DESC, id DESC);
+
+-- =========================================================================
+-- 2. rag.messages_version — what the ETag covers
+-- =========================================================================
+-- Message count plus the newest created_at, read from
+-- idx_rag_messages_conversation_created. Any insert or delete changes it
+-- as soon as the row is written — unlike conversations.last_active_at,
+-- which is only bumped after an answer has streamed.
+
+CREATE OR REPLACE FUNCTION rag.messages_version(p_conversation_id UUID)
+RETURNS TEXT
+LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT concat_ws(':', count(*), max(created_at))
+    FROM rag.messages
+    WHERE conversation_id = p_conversation_id;
+$$;
+
+-- =========================================================================
+-- 3. rag.conversation_messages_page
+-- =========================================================================
+-- Returns NULL when the conversation does not exist, {"forbidden": true}
+-- when it belongs to someone else, {"etag", "not_modified": true} when one
+-- of p_if_none_match is still current, {"bad_cursor": true} when
+-- p_before_id is not a message of this conversation, and otherwise
+-- {"etag", "title", "last_active_at", "has_more", "messages": [...]} with
+-- messages oldest first. A NULL p_limit returns the whole conversation.
+-- The ETag covers rag.messages_version, the title and the page parameters.
+
+CREATE OR REPLACE FUNCTION rag.conversation_messages_page(
+    p_conversation_id UUID,
+    p_user_id UUID,
+    p_before_id UUID DEFAULT NULL,
+    p_limit INTEGER DEFAULT NULL,
+    p_if_none_match TEXT[] DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+DECLARE
+    v_conv rag.conversations%ROWTYPE;
+    v_version TEXT;
+    v_etag TEXT;
+    v_before_at TIMESTAMPTZ;
+    v_messages JSONB;
+    v_has_more BOOLEAN;
+BEGIN
+    SELECT * INTO v_conv FROM rag.conversations WHERE id = p_conversation_id;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    IF v_conv.user_id <> p_user_id THEN
+        RETURN jsonb_build_object('forbidden', true);
+    END IF;
+
+    v_version := rag.messages_version(p_conversation_id);
+    v_etag := md5(concat_ws(
+        '|', v_version, v_conv.title, p_before_id, p_limit
+    ));
+    IF v_etag = ANY(p_if_none_match) THEN
+        RETURN jsonb_build_object('etag', v_etag, 'not_modified', true);
+    END IF;
+
+    IF p_before_id IS NOT NULL THEN
+        SELECT created_at INTO v_before_at
+        FROM rag.messages
+        WHERE id = p_before_id AND conversation_id = p_conversation_id;
+        IF NOT FOUND THEN
+            RETURN jsonb_build_object('bad_cursor', true);
+        END IF;
+    END IF;
+
+    -- Read one extra row (newest first) to know whether older messages exist
+    SELECT
+        COALESCE(bool_or(p.rn > p_limit), false),
+        COALESCE(
+            jsonb_agg(
+                jsonb_build_object(
+                    'id', p.id,
+                    'role', p.role,
+                    'content', p.content,
+                    'created_at', p.created_at,
+                    'interrupted', p.interrupted
+                )
+                ORDER BY p.created_at, p.id
+            ) FILTER (WHERE p_limit IS NULL OR p.rn <= p_limit),
+            '[]'::jsonb
+        )
+    INTO v_has_more, v_messages
+    FROM (
+        SELECT m.*, row_number() OVER (ORDER BY m.created_at DESC, m.id DESC) AS rn
+        FROM (
+            SELECT id, role, content, created_at, interrupted
+            FROM rag.messages
+            WHERE conversation_id = p_conversation_id
+              AND role <> 'system'
+              AND (v_before_at IS NULL OR (created_at, id) < (v_before_at, p_before_id))
+            ORDER BY created_at DESC, id DESC
+            LIMIT p_limit + 1
+        ) m
+    ) p;
+
+    RETURN jsonb_build_object(
+        'etag', v_etag,
+        'title', v_conv.title,
+        'last_active_at', v_conv.last_active_at,
+        'has_more', v_has_more,
+        'messages', v_messages
+    );
+END;
+$$;
+
+-- =========================================================================
+-- 4. Permissions — backend only (takes an arbitrary user_id)
+-- =========================================================================
+
+REVOKE EXECUTE ON FUNCTION rag.messages_version(UUID) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.messages_version(UUID) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION rag.conversation_messages_page(UUID, UUID, UUID, INTEGER, TEXT[]) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.conversation_messages_page(UUID, UUID, UUID, INTEGER, TEXT[]) TO service_role;
@@ -0,0 +1,117 @@
+-- Bulk conversation delete/archive in one transaction
+-- Clearing history used to take an ownership check plus two deletes per
+-- conversation; one statement now checks ownership and deletes (messages
+-- cascade) or archives a whole list, so row locks are held only briefly.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.conversations.archived_at
+-- =========================================================================
+
+ALTER TABLE rag.conversations
+    ADD COLUMN IF NOT EXISTS archived_at TIMESTAMPTZ;
+
+-- =========================================================================
+-- 2. rag.bulk_conversation_action
+-- =========================================================================
+-- Returns {"affected": [...], "forbidden": [...], "not_found": [...]}.
+-- Conversations owned by someone else are left untouched.
+
+CREATE OR REPLACE FUNCTION rag.bulk_conversation_action(
+    p_user_id UUID,
+    p_conversation_ids UUID[],
+    p_action TEXT
+)
+RETURNS JSONB
+LANGUAGE plpgsql SECURITY DEFINER AS $$
+DECLARE
+    v_affected UUID[];
+    v_forbidden UUID[];
+    v_not_found UUID[];
+BEGIN
+    IF p_action NOT IN ('delete', 'archive') THEN
+        RAISE EXCEPTION 'Unknown action %', p_action;
+    END IF;
+
+    IF p_action = 'delete' THEN
+        -- rag.messages rows go with their conversation (ON DELETE CASCADE)
+        WITH deleted AS (
+            DELETE FROM rag.conversations
+            WHERE id = ANY(p_conversation_ids) AND user_id = p_user_id
+            RETURNING id
+        )
+        SELECT COALESCE(array_agg(id), '{}') INTO v_affected FROM deleted;
+    ELSE
+        WITH archived AS (
+            UPDATE rag.conversations
+            SET archived_at = COALESCE(archived_at, now())
+            WHERE id = ANY(p_conversation_ids) AND user_id = p_user_id
+            RETURNING id
+        )
+        SELECT COALESCE(array_agg(id), '{}') INTO v_affected FROM archived;
+    END IF;
+
+    SELECT COALESCE(array_agg(c.id), '{}') INTO v_forbidden
+    FROM rag.conversations c
+    WHERE c.id = ANY(p_conversation_ids) AND c.user_id <> p_user_id;
+
+    SELECT COALESCE(array_agg(DISTINCT requested.id), '{}') INTO v_not_found
+    FROM unnest(p_conversation_ids) AS requested(id)
+    WHERE requested.id <> ALL(v_affected) AND requested.id <> ALL(v_forbidden);
+
+    RETURN jsonb_build_object(
+        'affected', to_jsonb(v_affected),
+        'forbidden', to_jsonb(v_forbidden),
+        'not_found', to_jsonb(v_not_found)
+    );
+END;
+$$;
+
+-- =========================================================================
+-- 3. rag.list_conversations — exclude (or list only) archived conversations
+-- =========================================================================
+
+DROP FUNCTION IF EXISTS rag.list_conversations(UUID, INTEGER, TIMESTAMPTZ, UUID);
+
+CREATE OR REPLACE FUNCTION rag.list_conversations(
+    p_user_id UUID,
+    p_limit INTEGER,
+    p_before_active_at TIMESTAMPTZ DEFAULT NULL,
+    p_before_id UUID DEFAULT NULL,
+    p_archived BOOLEAN DEFAULT false
+)
+RETURNS TABLE (
+    id UUID,
+    title TEXT,
+    message_count INTEGER,
+    last_active_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ,
+    subject_id UUID
+)
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+BEGIN
+    RETURN QUERY
+    SELECT c.id, c.title, c.message_count, c.last_active_at, c.created_at, c.subject_id
+    FROM rag.conversations c
+    WHERE c.user_id = p_user_id
+      AND c.message_count > 0  -- hide rows pre-created by /chat/prefetch and never used
+      AND (c.archived_at IS NOT NULL) = p_archived
+      AND (
+          p_before_active_at IS NULL
+          OR (c.last_active_at, c.id) < (p_before_active_at, p_before_id)
+      )
+    ORDER BY c.last_active_at DESC, c.id DESC
+    LIMIT p_limit;
+END;
+$$;
+
+-- =========================================================================
+-- 4. Permissions — backend only (take an arbitrary user_id)
+-- =========================================================================
+
+REVOKE EXECUTE ON FUNCTION rag.bulk_conversation_action(UUID, UUID[], TEXT) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.bulk_conversation_action(UUID, UUID[], TEXT) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION rag.list_conversations(UUID, INTEGER, TIMESTAMPTZ, UUID, BOOLEAN) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.list_conversations(UUID, INTEGER, TIMESTAMPTZ, UUID, BOOLEAN) TO service_role;
@@ -0,0 +1,74 @@
+-- Full-text search over a user's conversation history
+-- A stored tsvector on rag.messages with a GIN index; one RPC ranks the
+-- user's matching messages and builds snippets for the requested page only.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.messages.content_tsv + GIN index
+-- =========================================================================
+
+ALTER TABLE rag.messages
+    ADD COLUMN IF NOT EXISTS content_tsv TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('english', content)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_rag_messages_content_tsv
+    ON rag.messages USING GIN (content_tsv);
+
+-- =========================================================================
+-- 2. rag.search_messages — ranked, paged, user-scoped
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION rag.search_messages(
+    p_user_id UUID,
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    message_id UUID,
+    conversation_id UUID,
+    conversation_title TEXT,
+    role TEXT,
+    created_at TIMESTAMPTZ,
+    rank REAL,
+    snippet TEXT
+)
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+DECLARE
+    v_query TSQUERY := websearch_to_tsquery('english', p_query);
+BEGIN
+    RETURN QUERY
+    SELECT
+        hits.id,
+        hits.conversation_id,
+        hits.title,
+        hits.role,
+        hits.created_at,
+        hits.rank,
+        -- Headlines are costly: build them only for the page being returned
+        ts_headline(
+            'english', hits.content, v_query,
+            'StartSel=**, StopSel=**, MaxWords=30, MinWords=12, MaxFragments=2'
+        )
+    FROM (
+        SELECT m.id, m.conversation_id, c.title, m.role, m.created_at, m.content,
+               ts_rank_cd(m.content_tsv, v_query) AS rank
+        FROM rag.messages m
+        JOIN rag.conversations c ON c.id = m.conversation_id
+        WHERE c.user_id = p_user_id
+          AND m.role <> 'system'
+          AND m.content_tsv @@ v_query
+        ORDER BY rank DESC, m.created_at DESC, m.id
+        LIMIT p_limit OFFSET p_offset
+    ) hits
+    ORDER BY hits.rank DESC, hits.created_at DESC, hits.id;
+END;
+$$;
+
+-- =========================================================================
+-- 3. Permissions — backend only (takes an arbitrary user_id)
+-- =========================================================================
+
+REVOKE EXECUTE ON FUNCTION rag.search_messages(UUID, TEXT, INTEGER, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.search_messages(UUID, TEXT, INTEGER, INTEGER) TO service_role;
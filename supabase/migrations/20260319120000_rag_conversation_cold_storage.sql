@@ -0,0 +1,254 @@
+-- Cold storage for inactive conversations
+-- Conversations idle for N days have their messages packed into one
+-- zstd-compressed blob (compressed by the API's archival job) and removed
+-- from rag.messages, keeping the hot table and its indexes small. Opening
+-- the conversation again restores the rows.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.conversation_cold_storage + marker on rag.conversations
+-- =========================================================================
+
+CREATE TABLE IF NOT EXISTS rag.conversation_cold_storage (
+    conversation_id UUID PRIMARY KEY REFERENCES rag.conversations(id) ON DELETE CASCADE,
+    codec TEXT NOT NULL DEFAULT 'zstd+json',
+    payload BYTEA NOT NULL,               -- compressed JSON array of message rows
+    message_count INTEGER NOT NULL,
+    raw_bytes INTEGER NOT NULL,           -- uncompressed size, for monitoring
+    messages_version TEXT NOT NULL,       -- rag.messages_version at freeze time
+    stored_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE rag.conversation_cold_storage ENABLE ROW LEVEL SECURITY;
+-- No policies: only the backend (service_role) reads or writes cold storage
+
+ALTER TABLE rag.conversations
+    ADD COLUMN IF NOT EXISTS cold_stored_at TIMESTAMPTZ;
+
+-- Candidate scan for the archival job
+CREATE INDEX IF NOT EXISTS idx_rag_conversations_hot_last_active
+    ON rag.conversations(last_active_at)
+    WHERE cold_stored_at IS NULL;
+
+-- =========================================================================
+-- 2. rag.freeze_conversation — move packed messages to cold storage
+-- =========================================================================
+-- Atomic: stores the blob, deletes exactly the packed messages and marks
+-- the conversation. Returns false (and changes nothing) if the
+-- conversation became active again or gained messages since it was read.
+
+CREATE OR REPLACE FUNCTION rag.freeze_conversation(
+    p_conversation_id UUID,
+    p_last_active_at TIMESTAMPTZ,
+    p_message_ids UUID[],
+    p_payload_b64 TEXT,
+    p_raw_bytes INTEGER,
+    p_codec TEXT DEFAULT 'zstd+json'
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql SECURITY DEFINER AS $$
+DECLARE
+    v_deleted INTEGER;
+BEGIN
+    PERFORM 1 FROM rag.conversations
+    WHERE id = p_conversation_id
+      AND last_active_at = p_last_active_at
+      AND cold_stored_at IS NULL
+    FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN false;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM rag.messages
+        WHERE conversation_id = p_conversation_id AND id <> ALL(p_message_ids)
+    ) THEN
+        RETURN false;
+    END IF;
+
+    INSERT INTO rag.conversation_cold_storage (
+        conversation_id, codec, payload, message_count, raw_bytes, messages_version
+    )
+    VALUES (
+        p_conversation_id, p_codec, decode(p_payload_b64, 'base64'),
+        cardinality(p_message_ids), p_raw_bytes, rag.messages_version(p_conversation_id)
+    );
+
+    DELETE FROM rag.messages
+    WHERE conversation_id = p_conversation_id AND id = ANY(p_message_ids);
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    IF v_deleted <> cardinality(p_message_ids) THEN
+        RAISE EXCEPTION 'Packed % messages but deleted %', cardinality(p_message_ids), v_deleted;
+    END IF;
+
+    UPDATE rag.conversations SET cold_stored_at = now() WHERE id = p_conversation_id;
+    RETURN true;
+END;
+$$;
+
+-- =========================================================================
+-- 3. rag.cold_storage_payload / rag.thaw_conversation — rehydrate
+-- =========================================================================
+
+CREATE OR REPLACE FUNCTION rag.cold_storage_payload(p_conversation_id UUID)
+RETURNS JSONB
+LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT jsonb_build_object(
+        'codec', codec,
+        'payload_b64', encode(payload, 'base64'),
+        'message_count', message_count
+    )
+    FROM rag.conversation_cold_storage
+    WHERE conversation_id = p_conversation_id;
+$$;
+
+-- Restores the unpacked rows (as JSON) and drops the blob in one transaction.
+-- ON CONFLICT makes a concurrent or repeated thaw harmless.
+CREATE OR REPLACE FUNCTION rag.thaw_conversation(
+    p_conversation_id UUID,
+    p_messages JSONB
+)
+RETURNS INTEGER
+LANGUAGE plpgsql SECURITY DEFINER AS $$
+DECLARE
+    v_restored INTEGER;
+BEGIN
+    PERFORM 1 FROM rag.conversation_cold_storage
+    WHERE conversation_id = p_conversation_id
+    FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN 0;
+    END IF;
+
+    INSERT INTO rag.messages (
+        id, conversation_id, role, content, sources, token_count, model_name,
+        latency_ms, created_at, interrupted, model_tier, routing
+    )
+    SELECT
+        m.id, p_conversation_id, m.role, m.content, COALESCE(m.sources, '[]'::jsonb),
+        m.token_count, m.model_name, m.latency_ms, m.created_at,
+        COALESCE(m.interrupted, false), m.model_tier, m.routing
+    FROM jsonb_populate_recordset(NULL::rag.messages, p_messages) AS m
+    ON CONFLICT (id) DO NOTHING;
+    GET DIAGNOSTICS v_restored = ROW_COUNT;
+
+    DELETE FROM rag.conversation_cold_storage WHERE conversation_id = p_conversation_id;
+    UPDATE rag.conversations SET cold_stored_at = NULL WHERE id = p_conversation_id;
+    RETURN v_restored;
+END;
+$$;
+
+-- =========================================================================
+-- 4. rag.conversation_messages_page — report cold conversations
+-- =========================================================================
+-- Same as before, plus {"etag", "cold": true} when the messages are in cold
+-- storage. Freezing doesn't change the content, so a cold conversation
+-- answers with the version stored when it was frozen — the ETag it had
+-- while hot — and a thaw restores the same rows and the same version.
+
+CREATE OR REPLACE FUNCTION rag.conversation_messages_page(
+    p_conversation_id UUID,
+    p_user_id UUID,
+    p_before_id UUID DEFAULT NULL,
+    p_limit INTEGER DEFAULT NULL,
+    p_if_none_match TEXT[] DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+DECLARE
+    v_conv rag.conversations%ROWTYPE;
+    v_version TEXT;
+    v_etag TEXT;
+    v_before_at TIMESTAMPTZ;
+    v_messages JSONB;
+    v_has_more BOOLEAN;
+BEGIN
+    SELECT * INTO v_conv FROM rag.conversations WHERE id = p_conversation_id;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    IF v_conv.user_id <> p_user_id THEN
+        RETURN jsonb_build_object('forbidden', true);
+    END IF;
+
+    IF v_conv.cold_stored_at IS NOT NULL THEN
+        SELECT cs.messages_version INTO v_version
+        FROM rag.conversation_cold_storage cs
+        WHERE cs.conversation_id = p_conversation_id;
+    ELSE
+        v_version := rag.messages_version(p_conversation_id);
+    END IF;
+
+    v_etag := md5(concat_ws(
+        '|', v_version, v_conv.title, p_before_id, p_limit
+    ));
+    IF v_etag = ANY(p_if_none_match) THEN
+        RETURN jsonb_build_object('etag', v_etag, 'not_modified', true);
+    END IF;
+
+    IF v_conv.cold_stored_at IS NOT NULL THEN
+        RETURN jsonb_build_object('etag', v_etag, 'cold', true);
+    END IF;
+
+    IF p_before_id IS NOT NULL THEN
+        SELECT created_at INTO v_before_at
+        FROM rag.messages
+        WHERE id = p_before_id AND conversation_id = p_conversation_id;
+        IF NOT FOUND THEN
+            RETURN jsonb_build_object('bad_cursor', true);
+        END IF;
+    END IF;
+
+    -- Read one extra row (newest first) to know whether older messages exist
+    SELECT
+        COALESCE(bool_or(p.rn > p_limit), false),
+        COALESCE(
+            jsonb_agg(
+                jsonb_build_object(
+                    'id', p.id,
+                    'role', p.role,
+                    'content', p.content,
+                    'created_at', p.created_at,
+                    'interrupted', p.interrupted
+                )
+                ORDER BY p.created_at, p.id
+            ) FILTER (WHERE p_limit IS NULL OR p.rn <= p_limit),
+            '[]'::jsonb
+        )
+    INTO v_has_more, v_messages
+    FROM (
+        SELECT m.*, row_number() OVER (ORDER BY m.created_at DESC, m.id DESC) AS rn
+        FROM (
+            SELECT id, role, content, created_at, interrupted
+            FROM rag.messages
+            WHERE conversation_id = p_conversation_id
+              AND role <> 'system'
+              AND (v_before_at IS NULL OR (created_at, id) < (v_before_at, p_before_id))
+            ORDER BY created_at DESC, id DESC
+            LIMIT p_limit + 1
+        ) m
+    ) p;
+
+    RETURN jsonb_build_object(
+        'etag', v_etag,
+        'title', v_conv.title,
+        'last_active_at', v_conv.last_active_at,
+        'has_more', v_has_more,
+        'messages', v_messages
+    );
+END;
+$$;
+
+-- =========================================================================
+-- 5. Permissions — backend only
+-- =========================================================================
+
+REVOKE EXECUTE ON FUNCTION rag.freeze_conversation(UUID, TIMESTAMPTZ, UUID[], TEXT, INTEGER, TEXT) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.freeze_conversation(UUID, TIMESTAMPTZ, UUID[], TEXT, INTEGER, TEXT) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION rag.cold_storage_payload(UUID) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.cold_storage_payload(UUID) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION rag.thaw_conversation(UUID, JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.thaw_conversation(UUID, JSONB) TO service_role;
@@ -0,0 +1,190 @@
+-- Streaming export of a user's conversations
+-- GET /conversations/export walks two keyset streams in conversation-id
+-- order — conversations, and every hot message of the user ordered by
+-- (conversation_id, created_at, id) — and reads cold blobs in slices, so
+-- the API never holds more than one batch of rows in memory and makes no
+-- query per conversation.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. Index for walking a user's conversations by id
+-- =========================================================================
+
+CREATE INDEX IF NOT EXISTS idx_rag_conversations_user_id_id
+    ON rag.conversations(user_id, id);
+
+-- =========================================================================
+-- 2. rag.export_conversations
+-- =========================================================================
+-- Next p_limit conversations of p_user_id after p_after_id, in id order
+-- (the order of rag.export_user_messages). Includes archived and
+-- cold-stored conversations; skips ones without messages (pre-created by
+-- /chat/prefetch and never used). Checks for messages directly rather
+-- than trusting message_count, which is updated after the turn.
+
+CREATE OR REPLACE FUNCTION rag.export_conversations(
+    p_user_id UUID,
+    p_limit INTEGER,
+    p_after_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    title TEXT,
+    subject_id UUID,
+    message_count INTEGER,
+    created_at TIMESTAMPTZ,
+    last_active_at TIMESTAMPTZ,
+    archived_at TIMESTAMPTZ,
+    cold_stored_at TIMESTAMPTZ
+)
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+BEGIN
+    RETURN QUERY
+    SELECT c.id, c.title, c.subject_id, c.message_count, c.created_at,
+           c.last_active_at, c.archived_at, c.cold_stored_at
+    FROM rag.conversations c
+    WHERE c.user_id = p_user_id
+      AND (p_after_id IS NULL OR c.id > p_after_id)
+      AND (
+          c.cold_stored_at IS NOT NULL
+          OR EXISTS (SELECT 1 FROM rag.messages m WHERE m.conversation_id = c.id)
+      )
+    ORDER BY c.id
+    LIMIT p_limit;
+END;
+$$;
+
+-- =========================================================================
+-- 3. rag.export_user_messages — one keyset across all conversations
+-- =========================================================================
+-- Next p_limit hot messages of any of p_user_id's conversations after
+-- (p_after_conversation_id, p_after_created_at, p_after_id). A nested loop
+-- over idx_rag_conversations_user_id_id and
+-- idx_rag_messages_conversation_created, stopped by the LIMIT.
+
+CREATE OR REPLACE FUNCTION rag.export_user_messages(
+    p_user_id UUID,
+    p_limit INTEGER,
+    p_after_conversation_id UUID DEFAULT NULL,
+    p_after_created_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    conversation_id UUID,
+    id UUID,
+    role TEXT,
+    content TEXT,
+    sources JSONB,
+    created_at TIMESTAMPTZ,
+    interrupted BOOLEAN,
+    model_name TEXT
+)
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+BEGIN
+    RETURN QUERY
+    SELECT m.conversation_id, m.id, m.role, m.content, m.sources, m.created_at,
+           m.interrupted, m.model_name
+    FROM rag.conversations c
+    JOIN rag.messages m ON m.conversation_id = c.id
+    WHERE c.user_id = p_user_id
+      AND (p_after_conversation_id IS NULL OR c.id >= p_after_conversation_id)
+      AND (
+          p_after_conversation_id IS NULL
+          OR (m.conversation_id, m.created_at, m.id)
+             > (p_after_conversation_id, p_after_created_at, p_after_id)
+      )
+    ORDER BY m.conversation_id, m.created_at, m.id
+    LIMIT p_limit;
+END;
+$$;
+
+-- =========================================================================
+-- 4. rag.export_messages
+-- =========================================================================
+-- Next p_limit messages of one of p_user_id's conversations after
+-- (p_after_created_at, p_after_id), oldest first. Returns nothing for a
+-- conversation the user does not own. Only used for a conversation thawed
+-- between being listed and being read. Served by
+-- idx_rag_messages_conversation_created (scanned backwards).
+
+CREATE OR REPLACE FUNCTION rag.export_messages(
+    p_user_id UUID,
+    p_conversation_id UUID,
+    p_limit INTEGER,
+    p_after_created_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    role TEXT,
+    content TEXT,
+    sources JSONB,
+    created_at TIMESTAMPTZ,
+    interrupted BOOLEAN,
+    model_name TEXT
+)
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM rag.conversations c
+        WHERE c.id = p_conversation_id AND c.user_id = p_user_id
+    ) THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT m.id, m.role, m.content, m.sources, m.created_at, m.interrupted, m.model_name
+    FROM rag.messages m
+    WHERE m.conversation_id = p_conversation_id
+      AND (
+          p_after_created_at IS NULL
+          OR (m.created_at, m.id) > (p_after_created_at, p_after_id)
+      )
+    ORDER BY m.created_at, m.id
+    LIMIT p_limit;
+END;
+$$;
+
+-- =========================================================================
+-- 5. rag.cold_storage_chunk — read an archive in slices
+-- =========================================================================
+-- p_length bytes of the compressed payload from p_offset, with the codec
+-- and total size; NULL when the conversation is not cold. The payload is
+-- already zstd-compressed, so it is stored uncompressed (EXTERNAL) and
+-- Postgres reads only the TOAST chunks of each slice.
+
+ALTER TABLE rag.conversation_cold_storage
+    ALTER COLUMN payload SET STORAGE EXTERNAL;
+
+CREATE OR REPLACE FUNCTION rag.cold_storage_chunk(
+    p_conversation_id UUID,
+    p_offset INTEGER,
+    p_length INTEGER
+)
+RETURNS JSONB
+LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT jsonb_build_object(
+        'codec', codec,
+        'size', octet_length(payload),
+        'chunk_b64', encode(substring(payload FROM p_offset + 1 FOR p_length), 'base64')
+    )
+    FROM rag.conversation_cold_storage
+    WHERE conversation_id = p_conversation_id;
+$$;
+
+-- =========================================================================
+-- 6. Permissions — backend only (take an arbitrary user_id)
+-- =========================================================================
+
+REVOKE EXECUTE ON FUNCTION rag.export_conversations(UUID, INTEGER, UUID) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.export_conversations(UUID, INTEGER, UUID) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION rag.export_user_messages(UUID, INTEGER, UUID, TIMESTAMPTZ, UUID) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.export_user_messages(UUID, INTEGER, UUID, TIMESTAMPTZ, UUID) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION rag.export_messages(UUID, UUID, INTEGER, TIMESTAMPTZ, UUID) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.export_messages(UUID, UUID, INTEGER, TIMESTAMPTZ, UUID) TO service_role;
+
+REVOKE EXECUTE ON FUNCTION rag.cold_storage_chunk(UUID, INTEGER, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.cold_storage_chunk(UUID, INTEGER, INTEGER) TO service_role;
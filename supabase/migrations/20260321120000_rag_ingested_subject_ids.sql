@@ -0,0 +1,29 @@
+-- Distinct subjects with completed documents, for the scope-inference index
+-- The API used to scan every completed rag.documents row to find them.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.ingested_subject_ids
+-- =========================================================================
+-- Served from idx_documents_subject; one row per subject.
+
+CREATE OR REPLACE FUNCTION rag.ingested_subject_ids()
+RETURNS TABLE (subject_id UUID)
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+BEGIN
+    RETURN QUERY
+    SELECT DISTINCT d.subject_id
+    FROM rag.documents d
+    WHERE d.status = 'completed'
+      AND d.subject_id IS NOT NULL
+    ORDER BY d.subject_id;
+END;
+$$;
+
+-- =========================================================================
+-- 2. Permissions — backend only
+-- =========================================================================
+
+REVOKE EXECUTE ON FUNCTION rag.ingested_subject_ids() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.ingested_subject_ids() TO service_role;
@@ -0,0 +1,64 @@
+-- Chunks by id, scored against a new query
+-- Lets the chat API rebuild the previous turn from an assistant message's
+-- persisted sources when its per-process turn cache misses (another worker
+-- served that turn, or the process restarted), so follow-up reuse does not
+-- depend on which worker answers.
+
+SET search_path TO rag, public, extensions;
+
+-- =========================================================================
+-- 1. rag.fetch_chunks
+-- =========================================================================
+-- search_chunks-shaped rows for p_chunk_ids, in array order, with
+-- similarity measured against query_embedding. Primary-key lookups only —
+-- no vector scan and no similarity threshold. Chunks that were deleted or
+-- whose document is no longer completed are left out.
+
+CREATE OR REPLACE FUNCTION rag.fetch_chunks(
+    p_chunk_ids UUID[],
+    query_embedding vector(2000)
+) RETURNS TABLE (
+    id UUID,
+    document_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    document_title TEXT,
+    source_type TEXT,
+    subject_id UUID,
+    topic_id UUID,
+    chunk_metadata JSONB,
+    doc_metadata JSONB,
+    doc_year INTEGER,
+    doc_session TEXT,
+    doc_paper_number TEXT,
+    doc_type TEXT,
+    doc_file_key TEXT,
+    doc_exam_pathway_id UUID,
+    doc_summary TEXT,
+    doc_key_points JSONB
+)
+LANGUAGE plpgsql STABLE SECURITY DEFINER AS $$
+BEGIN
+    RETURN QUERY
+    SELECT c.id, c.document_id, c.content,
+           (1 - (c.embedding <=> query_embedding))::FLOAT AS similarity,
+           d.title, d.source_type, c.subject_id, c.topic_id,
+           c.metadata, d.metadata,
+           d.year, d.session, d.paper_number, d.doc_type,
+           d.file_key, d.exam_pathway_id,
+           d.summary, d.key_points
+    FROM rag.chunks c
+    JOIN rag.documents d ON d.id = c.document_id
+    WHERE c.id = ANY(p_chunk_ids)
+      AND c.embedding IS NOT NULL
+      AND d.status = 'completed'
+    ORDER BY array_position(p_chunk_ids, c.id);
+END;
+$$;
+
+-- =========================================================================
+-- 2. Permissions — backend only
+-- =========================================================================
+
+REVOKE EXECUTE ON FUNCTION rag.fetch_chunks(UUID[], vector(2000)) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION rag.fetch_chunks(UUID[], vector(2000)) TO service_role;